@@ -0,0 +1,289 @@
+"""Benchmark suite of the placement and replica decisions.
+
+Times the decisions on synthetic problems of increasing size, separating
+the time spent building the model from the time spent solving it:
+
+- placement: `decide_placement` on a graph of N services and a fleet of M
+  clusters. "cold" is the first decision, building the model; "warm" is the
+  next re-placement of the same graph, updating it.
+- replicas: the exact engine of `decide_replicas` on a cluster of N
+  services, cold and warm as above. "default" is the total time of the
+  default engine, which only uses the exact engine when its fast path is
+  not conclusive.
+
+Results are written as JSON. When a baseline is given, the cold and warm
+totals are compared with it, and the suite exits with status 1 if any of
+them regressed.
+
+Each run also times a fixed calibration workload, and the timings of the
+baseline are scaled by the ratio of the calibrations before being
+compared, so that the committed baseline can be compared on any machine.
+Only a baseline recorded with another backend is not comparable: it is
+reported with a warning and not compared.
+
+Usage:
+    python benchmarks/suite.py [--backend auto|gurobi|python]
+        [--output benchmarks/results.json] [--baseline benchmarks/baseline.json]
+        [--tolerance 0.5] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import operator
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from synthetic import (drift_placement_problem, drift_replica_problem,
+                       placement_problem, replica_problem)
+
+from smo.utils.placement import create_placement_solver
+from smo.utils.replica_engine import exact_engine
+from smo.utils.scaling import decide_replicas
+from smo.utils.solver_backend import resolve_backend
+
+# (services, clusters) of the placement problems
+PLACEMENT_SIZES = [(3, 2), (10, 3), (25, 5), (50, 10), (100, 15), (500, 50)]
+# Services of the replica problems
+REPLICA_SIZES = [3, 10, 30, 100]
+
+# Regressions smaller than this are noise
+MIN_DELTA = 0.001
+# What a baseline must have been recorded with to be compared
+COMPARABLE_META = ("backend",)
+# Iterations of the calibration workload
+CALIBRATION_SIZE = 200_000
+
+_key = operator.itemgetter("problem", "services", "clusters")
+
+BENCHMARKS_DIR = Path(__file__).parent
+
+
+def run_placement(backend, num_services, num_clusters, repeat):
+    """Returns the median timings of the placement decisions of one size."""
+
+    cold = {"build": [], "solve": []}
+    warm = {"build": [], "solve": []}
+    feasible = 0
+    for seed in range(repeat):
+        problem = placement_problem(num_services, num_clusters, seed)
+        solver = create_placement_solver(backend)
+        feasible += _solve_placement(solver, problem, initial_placement=True)
+        _record(cold, solver.timings)
+        feasible += _solve_placement(
+            solver, drift_placement_problem(problem, seed), initial_placement=False
+        )
+        _record(warm, solver.timings)
+
+    return {
+        "problem": "placement",
+        "services": num_services,
+        "clusters": num_clusters,
+        **_medians("cold", cold),
+        **_medians("warm", warm),
+        "decisions": 2 * repeat,
+        "feasible": feasible,
+    }
+
+
+def run_replicas(backend, num_services, repeat):
+    """Returns the median timings of the replica decisions of one size."""
+
+    cold = {"build": [], "solve": []}
+    warm = {"build": [], "solve": []}
+    default = []
+    feasible = 0
+    for seed in range(repeat):
+        problem = replica_problem(num_services, seed)
+        engine = exact_engine(backend)
+        feasible += engine.decide(problem) is not None
+        _record(cold, engine.timings)
+        next_problem = drift_replica_problem(problem, seed)
+        feasible += engine.decide(next_problem) is not None
+        _record(warm, engine.timings)
+
+        start = time.perf_counter()
+        decide_replicas(
+            next_problem.request_rates,
+            next_problem.previous_replicas,
+            next_problem.cpu_limits,
+            next_problem.acceleration,
+            next_problem.alpha,
+            next_problem.beta,
+            next_problem.cluster_capacity,
+            next_problem.cluster_acceleration,
+            next_problem.maximum_replicas,
+            engine,
+        )
+        default.append(time.perf_counter() - start)
+
+    return {
+        "problem": "replicas",
+        "services": num_services,
+        "clusters": 1,
+        **_medians("cold", cold),
+        **_medians("warm", warm),
+        "default_total": statistics.median(default),
+        "decisions": 2 * repeat,
+        "feasible": feasible,
+    }
+
+
+def calibrate(repeat):
+    """Returns the median time of a fixed pure Python workload, the speed
+    of the machine the timings are relative to."""
+
+    timings = []
+    for _ in range(max(repeat, 3)):
+        start = time.perf_counter()
+        total = 0
+        for i in range(CALIBRATION_SIZE):
+            total += i * i % 97
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def results_meta(backend, repeat, calibration):
+    """Returns the description of a run, stored with its results."""
+
+    return {
+        "backend": backend,
+        "repeat": repeat,
+        "calibration": calibration,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def baseline_mismatches(results, baseline):
+    """Returns why the results cannot be compared with the baseline, as
+    messages: the timings of another backend are not comparable."""
+
+    return [
+        f"baseline {field} {baseline['meta'].get(field)} differs from "
+        f"{results['meta'][field]}"
+        for field in COMPARABLE_META
+        if baseline["meta"].get(field) != results["meta"][field]
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """Returns the regressions of the results against the baseline, as
+    messages.
+
+    The timings of the baseline are first scaled to the speed of the
+    machine of the results, measured by their calibrations.
+    """
+
+    speed = results["meta"]["calibration"] / baseline["meta"]["calibration"]
+    previous = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        reference = previous.get(_key(result))
+        if reference is None:
+            continue
+        for metric in ("cold_total", "warm_total"):
+            expected = reference[metric] * speed
+            delta = result[metric] - expected
+            if delta > MIN_DELTA and result[metric] > expected * (1 + tolerance):
+                regressions.append(
+                    f"{result['problem']} {result['services']}x{result['clusters']} "
+                    f"{metric}: {expected * 1000:.2f} ms (scaled) -> "
+                    f"{result[metric] * 1000:.2f} ms"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=BENCHMARKS_DIR / "results.json")
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed slowdown relative to the baseline (0.5 is 50%%)",
+    )
+    args = parser.parse_args(argv)
+
+    backend = resolve_backend(args.backend)
+    if backend == "gurobi":
+        import gurobipy
+
+        # Keep the solver logs out of the report
+        gurobipy.setParam("OutputFlag", 0)
+
+    calibration = calibrate(args.repeat)
+    rows = []
+    for num_services, num_clusters in PLACEMENT_SIZES:
+        rows.append(run_placement(backend, num_services, num_clusters, args.repeat))
+        _print_row(rows[-1])
+    for num_services in REPLICA_SIZES:
+        rows.append(run_replicas(backend, num_services, args.repeat))
+        _print_row(rows[-1])
+
+    results = {
+        "meta": results_meta(backend, args.repeat, calibration),
+        "results": rows,
+    }
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results written to {args.output}")
+
+    if args.baseline is None:
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    mismatches = baseline_mismatches(results, baseline)
+    if mismatches:
+        for mismatch in mismatches:
+            print(f"WARNING {mismatch}")
+        print("Baseline not compared, run with the backend of the baseline")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+def _solve_placement(solver, problem, initial_placement):
+    try:
+        solver.solve(**problem, initial_placement=initial_placement)
+    except ValueError:
+        return False
+    return True
+
+
+def _record(timings, last):
+    for phase in ("build", "solve"):
+        timings[phase].append(last[phase])
+
+
+def _medians(prefix, timings):
+    build = statistics.median(timings["build"])
+    solve = statistics.median(timings["solve"])
+    return {
+        f"{prefix}_build": build,
+        f"{prefix}_solve": solve,
+        f"{prefix}_total": build + solve,
+    }
+
+
+def _print_row(result):
+    print(
+        f"{result['problem']:<10} {result['services']:>4}x{result['clusters']:<3} "
+        f"cold {result['cold_build'] * 1000:8.2f} + {result['cold_solve'] * 1000:8.2f} ms"
+        f"   warm {result['warm_build'] * 1000:8.2f} + "
+        f"{result['warm_solve'] * 1000:8.2f} ms"
+        f"   feasible {result['feasible']}/{result['decisions']}"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
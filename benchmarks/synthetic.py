@@ -0,0 +1,147 @@
+"""Synthetic placement and replica problems of arbitrary size.
+
+The generated problems are feasible by construction: the current placement
+is a first-fit of the services on clusters with spare capacity, and the
+cluster budget of replica problems is a little above the replicas the request
+rates need, so that it binds on some of them.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import replace
+
+from smo.utils.replica_engine import ReplicaProblem
+
+CPU_LIMITS = [0.25, 0.5, 1, 2]
+# Share of accelerated services and clusters
+ACCELERATED_SERVICES = 0.1
+ACCELERATED_CLUSTERS = 0.3
+# Share of services depending on the previous one
+DEPENDENT_SERVICES = 0.1
+# Total cluster capacity, relative to the CPU used by the services
+CAPACITY_HEADROOM = 1.5
+
+
+def placement_problem(num_services, num_clusters, seed=0):
+    """Returns the keyword arguments of `decide_placement` for a synthetic
+    graph and cluster fleet."""
+
+    rng = random.Random(seed)
+    cluster_acceleration = [
+        1 if e == 1 or rng.random() < ACCELERATED_CLUSTERS else 0
+        for e in range(num_clusters)
+    ]
+    cpu_limits = [rng.choice(CPU_LIMITS) for _ in range(num_services)]
+    replicas = [rng.randint(1, 3) for _ in range(num_services)]
+    acceleration = [
+        1 if s > 0 and rng.random() < ACCELERATED_SERVICES else 0
+        for s in range(num_services)
+    ]
+    if num_clusters == 1:
+        acceleration = [0] * num_services
+
+    loads = [cpu_limits[s] * replicas[s] for s in range(num_services)]
+    capacity = CAPACITY_HEADROOM * sum(loads[1:]) / num_clusters
+    largest = max(loads)
+    cluster_capacities = [
+        max(capacity * rng.uniform(0.8, 1.2), largest) for _ in range(num_clusters)
+    ]
+
+    # First-fit of the services, s0 being on the first cluster
+    remaining = list(cluster_capacities)
+    choices = [0]
+    dependencies = []
+    for s in range(1, num_services):
+        allowed = [
+            e
+            for e in range(num_clusters)
+            if acceleration[s] <= cluster_acceleration[e] and loads[s] <= remaining[e]
+        ]
+        if not allowed:
+            # Grow the compatible cluster with the most spare capacity
+            cluster = max(
+                (
+                    e
+                    for e in range(num_clusters)
+                    if acceleration[s] <= cluster_acceleration[e]
+                ),
+                key=lambda e: remaining[e],
+            )
+            cluster_capacities[cluster] += loads[s] - remaining[cluster]
+            remaining[cluster] = loads[s]
+            allowed = [cluster]
+        previous = choices[-1]
+        if rng.random() < DEPENDENT_SERVICES and previous in allowed:
+            dependencies.append(1)
+            cluster = previous
+        else:
+            dependencies.append(0)
+            cluster = rng.choice(allowed)
+        remaining[cluster] -= loads[s]
+        choices.append(cluster)
+
+    current_placement = [[0] * num_clusters for _ in range(num_services)]
+    for s, e in enumerate(choices):
+        current_placement[s][e] = 1
+
+    return {
+        "cluster_capacities": cluster_capacities,
+        "cluster_acceleration": cluster_acceleration,
+        "cpu_limits": cpu_limits,
+        "acceleration": acceleration,
+        "replicas": replicas,
+        "current_placement": current_placement,
+        "dependencies": dependencies,
+    }
+
+
+def drift_placement_problem(problem, seed=0):
+    """Returns the problem with changed replicas, as seen on the next
+    re-placement of the same graph."""
+
+    rng = random.Random(seed)
+    replicas = [max(1, r + rng.choice([-1, 0, 0, 1])) for r in problem["replicas"]]
+    return {**problem, "replicas": replicas}
+
+
+def replica_problem(num_services, seed=0):
+    """Returns a synthetic `ReplicaProblem` of the services of a cluster."""
+
+    rng = random.Random(seed)
+    cpu_limits = [rng.choice(CPU_LIMITS) for _ in range(num_services)]
+    maximum_replicas = [rng.randint(3, 10) for _ in range(num_services)]
+    alpha = [rng.uniform(0.5, 40) for _ in range(num_services)]
+    beta = [-rng.uniform(0, 1) for _ in range(num_services)]
+    # Rates needing between 1 and the maximum replicas, with room for the
+    # drift of the next tick
+    needed = [rng.randint(1, maximum - 1) for maximum in maximum_replicas]
+    request_rates = [
+        alpha[s] * (needed[s] - rng.random()) + beta[s] for s in range(num_services)
+    ]
+    cluster_capacity = rng.uniform(1.2, 1.5) * sum(
+        cpu_limits[s] * needed[s] for s in range(num_services)
+    )
+
+    return ReplicaProblem(
+        request_rates=request_rates,
+        previous_replicas=[rng.randint(1, m) for m in maximum_replicas],
+        cpu_limits=cpu_limits,
+        acceleration=[0] * num_services,
+        alpha=alpha,
+        beta=beta,
+        cluster_capacity=cluster_capacity,
+        cluster_acceleration=0,
+        maximum_replicas=maximum_replicas,
+    )
+
+
+def drift_replica_problem(problem, seed=0):
+    """Returns the problem of the next scaling tick, with changed request
+    rates."""
+
+    rng = random.Random(seed)
+    return replace(
+        problem,
+        request_rates=[rate * rng.uniform(0.9, 1.1) for rate in problem.request_rates],
+    )
@@ -6,10 +6,19 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from smo.config import Config
+from smo.models import Graph
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# Migrate the database of the application, unless given one
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option(
+        "sqlalchemy.url", Config().SQLALCHEMY_DATABASE_URI.replace("%", "%%")
+    )
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -19,7 +28,8 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = None
+# The tables of all the models
+target_metadata = Graph.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
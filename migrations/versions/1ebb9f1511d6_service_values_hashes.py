@@ -0,0 +1,53 @@
+"""Hashes of the values a service should be and was last deployed with
+
+The schema was so far created by `db.create_all()`, which never alters an
+existing table, so the columns are only added if missing. Services of an
+existing database have no applied hash, and are applied again on their
+next Helm operation.
+
+Revision ID: 1ebb9f1511d6
+Revises:
+Create Date: 2026-10-17 09:41:07.265319
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import context, op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "1ebb9f1511d6"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+COLUMNS = [
+    sa.Column("values_hash", sa.String(64)),
+    sa.Column("applied_hash", sa.String(64)),
+]
+
+
+def upgrade() -> None:
+    existing = _columns("service")
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column("service", column.copy())
+
+
+def downgrade() -> None:
+    for column in COLUMNS:
+        op.drop_column("service", column.name)
+
+
+def _columns(table):
+    """Returns the names of the columns of a table, none in offline mode
+    (--sql) where the database cannot be inspected."""
+    if context.is_offline_mode():
+        return set()
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
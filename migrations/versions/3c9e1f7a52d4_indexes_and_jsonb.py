@@ -0,0 +1,98 @@
+"""Indexes for the graph and service lookups, JSONB documents on PostgreSQL
+
+Adds the indexes of the pages of the graphs of a project, and of the
+lookups of the services by graph, cluster and artifact. On PostgreSQL, the
+JSON documents become JSONB, with GIN indexes for containment queries.
+
+The indexes are only created if missing, since `db.create_all()` creates
+them on new databases. In offline mode (--sql), the database cannot be
+inspected and they are assumed to be missing.
+
+Revision ID: 3c9e1f7a52d4
+Revises: df8bb422d0b5
+Create Date: 2026-10-17 10:12:31.418207
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import context, op
+from sqlalchemy.dialects import postgresql
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9e1f7a52d4"
+down_revision: str | None = "df8bb422d0b5"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+INDEXES = [
+    ("ix_graph_project_id", "graph", ["project", "id"]),
+    ("ix_service_graph_id", "service", ["graph_id"]),
+    ("ix_service_cluster_affinity", "service", ["cluster_affinity"]),
+    ("ix_service_artifact_ref", "service", ["artifact_ref"]),
+]
+
+JSON_COLUMNS = [
+    ("ix_graph_descriptor", "graph", "graph_descriptor"),
+    ("ix_service_values_overwrite", "service", "values_overwrite"),
+    ("ix_service_resources", "service", "resources"),
+]
+
+
+def upgrade() -> None:
+    inspector = _inspector()
+
+    for name, table, columns in INDEXES:
+        if not _has_index(inspector, table, name):
+            op.create_index(name, table, columns)
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name, table, column in JSON_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=postgresql.JSONB(),
+            postgresql_using=f"{column}::jsonb",
+        )
+        if not _has_index(inspector, table, name):
+            op.create_index(name, table, [column], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    inspector = _inspector()
+
+    if op.get_bind().dialect.name == "postgresql":
+        for name, table, column in JSON_COLUMNS:
+            if _has_index(inspector, table, name, offline=True):
+                op.drop_index(name, table_name=table)
+            op.alter_column(
+                table,
+                column,
+                type_=sa.JSON(),
+                postgresql_using=f"{column}::json",
+            )
+
+    for name, table, _ in INDEXES:
+        if _has_index(inspector, table, name, offline=True):
+            op.drop_index(name, table_name=table)
+
+
+def _inspector():
+    if context.is_offline_mode():
+        return None
+    return sa.inspect(op.get_bind())
+
+
+def _has_index(inspector, table, name, offline=False):
+    """Returns whether an index exists, or `offline` if the database cannot
+    be inspected."""
+    if inspector is None:
+        return offline
+    return any(index["name"] == name for index in inspector.get_indexes(table))
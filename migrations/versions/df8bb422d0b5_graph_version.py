@@ -0,0 +1,52 @@
+"""Version and modification time of the graphs, for their entity tags
+
+The schema was so far created by `db.create_all()`, which never alters an
+existing table, so the columns are only added if missing. Existing graphs
+start at version 1, with no modification time until their next change.
+
+Revision ID: df8bb422d0b5
+Revises: 1ebb9f1511d6
+Create Date: 2026-10-17 10:03:52.781946
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import context, op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "df8bb422d0b5"
+down_revision: str | None = "1ebb9f1511d6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+COLUMNS = [
+    sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    sa.Column("updated_at", sa.DateTime(timezone=True)),
+]
+
+
+def upgrade() -> None:
+    existing = _columns("graph")
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column("graph", column.copy())
+
+
+def downgrade() -> None:
+    for column in COLUMNS:
+        op.drop_column("graph", column.name)
+
+
+def _columns(table):
+    """Returns the names of the columns of a table, none in offline mode
+    (--sql) where the database cannot be inspected."""
+    if context.is_offline_mode():
+        return set()
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -23,6 +24,32 @@ class Config:
         KARMADA_KUBECONFIG (str): The file path to the Kubernetes configuration, constructed from
             the environment variable KARMADA_KUBECONFIG. Defaults to 'karmada-apiserver.config' if
             the variable is not set.
+        PROMETHEUS_POOL_SIZE (int): Maximum number of keep-alive connections shared by all
+            Prometheus queries of the process, from the environment variable
+            PROMETHEUS_POOL_SIZE. Defaults to 10.
+        HELM_MAX_WORKERS (int): Maximum number of Helm commands run concurrently by the
+            process, from the environment variable HELM_MAX_WORKERS. Defaults to 4.
+        JOB_MAX_WORKERS (int): Maximum number of graph operations (deploy, placement,
+            start, stop) run concurrently in the background, from the environment variable
+            JOB_MAX_WORKERS. Defaults to 4.
+        REPLACEMENT_DEBOUNCE (float): Seconds a re-placement requested by a scaling loop waits
+            for the requests of the other clusters of the graph, which are coalesced into it,
+            from the environment variable REPLACEMENT_DEBOUNCE. Defaults to 1.
+        SOLVER_BACKEND (str): Solver of the placement and replica decisions: 'gurobi',
+            'python' (dependency-free) or 'auto' (Gurobi if installed), from the environment
+            variable SOLVER_BACKEND. Defaults to 'auto'.
+        FORECASTER (str): Forecast of the request rates the replicas are decided for:
+            'none' (the last measured rates), 'ewma', 'holt' (level and trend) or 'linear',
+            from the environment variable FORECASTER. Defaults to 'none'.
+        ARTIFACT_CACHE_DIR (str): Directory of the cache of the pulled HDAR artifacts, from the
+            environment variable ARTIFACT_CACHE_DIR. Defaults to 'smo-artifacts' in the
+            temporary directory.
+        ARTIFACT_CACHE_MAX_BYTES (int): Size of the artifact cache above which the least
+            recently used artifacts are evicted, from the environment variable
+            ARTIFACT_CACHE_MAX_BYTES. Defaults to 1 GiB.
+        ARTIFACT_CACHE_MAX_AGE (float | None): Seconds after which an artifact tag (a
+            reference not pinned by digest) is pulled again, from the environment variable
+            ARTIFACT_CACHE_MAX_AGE. Defaults to None: tags are kept until refreshed.
     """
 
     @property
@@ -42,6 +69,30 @@ class Config:
         os.getenv("KARMADA_KUBECONFIG", "karmada-apiserver.config")
     )
 
+    PROMETHEUS_POOL_SIZE = int(os.getenv("PROMETHEUS_POOL_SIZE", "10"))
+
+    HELM_MAX_WORKERS = int(os.getenv("HELM_MAX_WORKERS", "4"))
+
+    JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+
+    REPLACEMENT_DEBOUNCE = float(os.getenv("REPLACEMENT_DEBOUNCE", "1"))
+
+    SOLVER_BACKEND = os.getenv("SOLVER_BACKEND", "auto")
+
+    FORECASTER = os.getenv("FORECASTER", "none")
+
+    ARTIFACT_CACHE_DIR = os.getenv(
+        "ARTIFACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "smo-artifacts")
+    )
+
+    ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(1 << 30)))
+
+    ARTIFACT_CACHE_MAX_AGE = (
+        float(os.environ["ARTIFACT_CACHE_MAX_AGE"])
+        if "ARTIFACT_CACHE_MAX_AGE" in os.environ
+        else None
+    )
+
 
 class ProdConfig(Config):
     """Production settings configuration class.
@@ -11,9 +11,20 @@ from flask import Flask
 
 from smo.config import configs
 from smo.extensions import db
+from smo.services.graph_service import (configure_artifact_cache,
+                                        configure_helm_executor,
+                                        configure_replacement_queue)
+from smo.services.job_service import configure_job_manager
+from smo.utils.artifact_cache import DEFAULT_DIRECTORY, DEFAULT_MAX_BYTES
+from smo.utils.helm_executor import DEFAULT_MAX_WORKERS as DEFAULT_HELM_MAX_WORKERS
+from smo.utils.jobs import DEFAULT_MAX_WORKERS as DEFAULT_JOB_MAX_WORKERS
+from smo.utils.prometheus_helper import DEFAULT_POOL_SIZE, PrometheusHelper
+from smo.utils.replacement import DEFAULT_DEBOUNCE
 
 from . import error_handlers
 from .routes.graph import graph
+from .routes.jobs import jobs
+from .routes.stats import stats
 
 env = os.environ.get("FLASK_ENV", "development")
 
@@ -55,6 +66,34 @@ def create_app(app_name="smo", *, config=None) -> Flask:
         app.config.from_object(configs[env]())
 
     app.register_blueprint(graph)
+    app.register_blueprint(jobs)
+    app.register_blueprint(stats)
+
+    # Size the connection pool shared by all the scaling loops
+    PrometheusHelper.configure_pool(
+        app.config.get("PROMETHEUS_POOL_SIZE", DEFAULT_POOL_SIZE)
+    )
+
+    # Bound the Helm commands run concurrently by all requests
+    configure_helm_executor(
+        app.config.get("HELM_MAX_WORKERS", DEFAULT_HELM_MAX_WORKERS)
+    )
+
+    # Run the graph operations requested through the API in the background
+    configure_job_manager(app.config.get("JOB_MAX_WORKERS", DEFAULT_JOB_MAX_WORKERS))
+
+    # Re-place the graphs whose services do not fit anymore, as requested by
+    # their scaling loops, in-process
+    configure_replacement_queue(
+        app, app.config.get("REPLACEMENT_DEBOUNCE", DEFAULT_DEBOUNCE)
+    )
+
+    # Cache the artifacts pulled on deployment
+    configure_artifact_cache(
+        app.config.get("ARTIFACT_CACHE_DIR", DEFAULT_DIRECTORY),
+        app.config.get("ARTIFACT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+        app.config.get("ARTIFACT_CACHE_MAX_AGE"),
+    )
 
     # Register error handlers for specific exceptions
     app.register_error_handler(
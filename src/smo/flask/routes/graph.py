@@ -2,15 +2,25 @@
 
 from __future__ import annotations
 
+import json
+from datetime import timezone
+
 import yaml
 from flasgger import swag_from
-from flask import Blueprint, request
+from flask import Blueprint, make_response, request, url_for
+from werkzeug.exceptions import BadRequest
 
-from smo.services.graph_service import (deploy_graph, fetch_graph,
+from smo.services.graph_service import (DEFAULT_PAGE_SIZE,
+                                        check_graph_operation, deploy_artifact,
+                                        deploy_graph, fetch_graph,
+                                        fetch_graph_validators,
                                         fetch_project_graphs,
-                                        get_descriptor_from_artifact,
-                                        remove_graph, start_graph, stop_graph,
+                                        fetch_project_graphs_validators,
+                                        find_graphs_using_artifact,
+                                        find_services, remove_graph,
+                                        start_graph, stop_graph,
                                         trigger_placement)
+from smo.services.job_service import submit_job
 
 graph = Blueprint("graph", __name__)
 
@@ -18,9 +28,80 @@ graph = Blueprint("graph", __name__)
 @graph.route("/graph/project/<project>", methods=["GET"])
 @swag_from("swagger/get_all_graphs.yaml")
 def get_all_graphs(project):
-    """Fetches all graphs under a project."""
+    """Fetches a page of the graphs under a project.
+
+    Query parameters: "limit" (the page size), "after" (the cursor of the
+    page) and "view" ("full" or "summary"). The URL of the next page, if
+    any, is given in the Link header.
+
+    The page has an ETag, changing when any of its graphs is modified: a
+    request whose If-None-Match matches it gets a 304 without the graphs
+    being loaded.
+    """
 
-    return fetch_project_graphs(project), 200
+    limit = int_arg("limit", DEFAULT_PAGE_SIZE)
+    after = int_arg("after")
+    view = request.args.get("view", "full")
+    # Validators first, which also validate the query: a graph modified
+    # meanwhile is only sent again
+    etag, last_modified = fetch_project_graphs_validators(
+        project, after, limit, view
+    )
+    if is_fresh(etag, last_modified):
+        return with_validators(make_response("", 304), etag, last_modified)
+
+    graphs, next_cursor = fetch_project_graphs(
+        project, after=after, limit=limit, view=view
+    )
+
+    headers = {}
+    if next_cursor is not None:
+        next_url = url_for(
+            "graph.get_all_graphs",
+            project=project,
+            after=next_cursor,
+            limit=limit,
+            view=view,
+        )
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return with_validators(make_response(graphs, 200, headers), etag, last_modified)
+
+
+@graph.route("/graphs", methods=["GET"])
+@swag_from("swagger/find_graphs.yaml")
+def get_graphs_by_artifact():
+    """Finds the graphs with a service deployed from the artifact given by
+    the "artifact" query parameter."""
+
+    artifact_ref = request.args.get("artifact")
+    if not artifact_ref:
+        msg = "Query parameter artifact is required"
+        raise BadRequest(msg)
+
+    return find_graphs_using_artifact(artifact_ref), 200
+
+
+@graph.route("/services", methods=["GET"])
+@swag_from("swagger/find_services.yaml")
+def get_services():
+    """Finds the services by cluster ("cluster" query parameter), artifact
+    ("artifact") and values overwrite ("values", a JSON object the values
+    must contain)."""
+
+    values = request.args.get("values")
+    if values is not None:
+        try:
+            values = json.loads(values)
+        except ValueError:
+            msg = "Query parameter values must be JSON"
+            raise BadRequest(msg) from None
+
+    services = find_services(
+        cluster=request.args.get("cluster"),
+        artifact_ref=request.args.get("artifact"),
+        values=values,
+    )
+    return services, 200
 
 
 @graph.route("/graph/project/<project>", methods=["POST"])
@@ -30,29 +111,55 @@ def deploy(project):
 
     The input can either be an artifact URL that gets unpacked, read and
     deployed or it can directly be a desciptor file in JSON format.
+    Artifacts are cached; set "refresh" to true to pull the artifact again.
+
+    The services are deployed in the background: the response is the job of
+    the deployment, whose progress is reported by `GET /jobs/<id>`. An
+    artifact is pulled by the job too, whose target is the artifact.
     """
 
     request_data = request.get_json()
     if isinstance(request_data, dict) and "artifact" in request_data:
+        # The artifact is pulled by the job, which runs on its reference
+        # until the name of its graph is known
         artifact_ref = request_data["artifact"]
-        descriptor = get_descriptor_from_artifact(project, artifact_ref)
-    else:
-        descriptor = yaml.safe_load(request_data)
+        if not isinstance(artifact_ref, str) or not artifact_ref:
+            msg = "Artifact must be a non-empty string"
+            raise BadRequest(msg)
+        refresh = bool(request_data.get("refresh", False))
+        return accepted(
+            submit_job(
+                "deploy", artifact_ref, deploy_artifact, project, artifact_ref, refresh
+            )
+        )
+
+    descriptor = yaml.safe_load(request_data)
     graph_descriptor = descriptor["hdaGraph"]
-    deploy_graph(project, graph_descriptor)
+    name = graph_descriptor["id"]
+    check_graph_operation("deploy", name)
 
-    return "Graph deployment successful\n", 200
+    return accepted(submit_job("deploy", name, deploy_graph, project, graph_descriptor))
 
 
 @graph.route("/graph/<name>", methods=["GET"])
 @swag_from("swagger/get_graph.yaml")
 def get_graph(name):
-    """Retrieves an application graph descriptor."""
+    """Retrieves an application graph descriptor.
+
+    The response has an ETag and a Last-Modified date, so that a client
+    whose copy is current gets a 304 without the graph being loaded.
+    """
+
+    validators = fetch_graph_validators(name)
+    if validators is None:
+        return f"Graph with name {name} not found\n", 404
+    if is_fresh(*validators):
+        return with_validators(make_response("", 304), *validators)
 
     graph = fetch_graph(name)
 
     if graph is not None:
-        return graph.to_dict(), 200
+        return with_validators(make_response(graph.to_dict(), 200), *validators)
     else:
         return f"Graph with name {name} not found\n", 404
 
@@ -60,31 +167,32 @@ def get_graph(name):
 @graph.route("/graph/<name>/placement", methods=["GET"])
 @swag_from("swagger/placement.yaml")
 def placement(name):
-    """Runs the placement algorithm on the graph."""
+    """Runs the placement algorithm on the graph, in the background."""
 
-    trigger_placement(name)
+    check_graph_operation("placement", name)
 
-    return f"Placement of graph {name} triggered\n", 200
+    return accepted(submit_job("placement", name, trigger_placement, name))
 
 
 @graph.route("/graph/<name>/start", methods=["GET"])
 @swag_from("swagger/start.yaml")
 def start(name):
-    """Starts a stopped graph."""
+    """Starts a stopped graph, in the background."""
 
-    start_graph(name)
+    check_graph_operation("start", name)
 
-    return "Graph stopped\n", 200
+    return accepted(submit_job("start", name, start_graph, name))
 
 
 @graph.route("/graph/<name>/stop", methods=["GET"])
 @swag_from("swagger/stop.yaml")
 def stop(name):
-    """Uninstalls graphs artifacts without erasing from the database."""
+    """Uninstalls graphs artifacts without erasing from the database, in the
+    background."""
 
-    stop_graph(name)
+    check_graph_operation("stop", name)
 
-    return "Graph stopped\n", 200
+    return accepted(submit_job("stop", name, stop_graph, name))
 
 
 @graph.route("/graph/<name>", methods=["DELETE"])
@@ -95,3 +203,53 @@ def remove(name):
     remove_graph(name)
 
     return "Removal successful\n", 200
+
+
+def accepted(job):
+    """Returns the 202 response of a job, pointing to its status."""
+
+    return job.to_dict(), 202, {"Location": url_for("jobs.get_job", job_id=job.id)}
+
+
+def int_arg(name, default=None):
+    """Returns an integer query parameter.
+
+    Raises:
+    - BadRequest: If the parameter is not an integer.
+    """
+
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"Query parameter {name} must be an integer") from None
+
+
+def is_fresh(etag, last_modified):
+    """Returns True if the copy of the client, as told by the If-None-Match
+    or, failing that, the If-Modified-Since header, is current."""
+
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return _http_date(last_modified) <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified):
+    """Sets the ETag and Last-Modified headers of a response."""
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_date(last_modified)
+    return response
+
+
+def _http_date(moment):
+    # SQLite returns naive datetimes, stored in UTC; HTTP dates have no
+    # fraction of second
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.replace(microsecond=0)
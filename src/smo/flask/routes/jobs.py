@@ -0,0 +1,27 @@
+"""Background job Blueprints."""
+
+from __future__ import annotations
+
+from flasgger import swag_from
+from flask import Blueprint, request
+
+from smo.services.job_service import fetch_job, fetch_jobs
+
+jobs = Blueprint("jobs", __name__)
+
+
+@jobs.route("/jobs", methods=["GET"])
+@swag_from("swagger/get_jobs.yaml")
+def get_jobs():
+    """Lists the recent jobs, optionally only those of a graph."""
+
+    return [job.to_dict() for job in fetch_jobs(request.args.get("graph"))], 200
+
+
+@jobs.route("/jobs/<job_id>", methods=["GET"])
+@swag_from("swagger/get_job.yaml")
+def get_job(job_id):
+    """Reports the status of a job, and the progress of each of its
+    services."""
+
+    return fetch_job(job_id).to_dict(), 200
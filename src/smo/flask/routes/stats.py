@@ -0,0 +1,18 @@
+"""Operational statistics Blueprints."""
+
+from __future__ import annotations
+
+from flasgger import swag_from
+from flask import Blueprint
+
+from smo.services.stats_service import fetch_stats
+
+stats = Blueprint("stats", __name__)
+
+
+@stats.route("/stats", methods=["GET"])
+@swag_from("swagger/get_stats.yaml")
+def get_stats():
+    """Reports the counters of the components shared by all graphs."""
+
+    return fetch_stats(), 200
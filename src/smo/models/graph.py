@@ -2,11 +2,28 @@
 
 from __future__ import annotations
 
+from datetime import datetime, timezone
 from enum import Enum
+from itertools import chain
 
-from sqlalchemy import JSON
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 from smo.extensions import db
+from smo.models.service import Service
+from smo.models.types import JSONDocument
+
+
+def graph_etag(graph_id, version) -> str:
+    """Returns the entity tag of a version of a graph."""
+
+    return f"graph-{graph_id}-v{version}"
+
+
+def utcnow() -> datetime:
+    """Returns the current time, in UTC."""
+
+    return datetime.now(timezone.utc)
 
 
 class GraphStatus(Enum):
@@ -34,11 +51,23 @@ class Graph(db.Model):
         status (str): Status of the graph, should ideally be an enum.
         project (str): Associated project with the graph.
         grafana (str): Grafana dashboard information linked with the graph.
-        graph_descriptor (JSON): Descriptor in JSON format for additional graph details.
+        graph_descriptor (JSON): Descriptor in JSON format for additional graph details,
+            JSONB with a GIN index on PostgreSQL.
+        version (int): Incremented each time the graph or one of its services is
+            modified, see `touch`.
+        updated_at (datetime): Time of the last modification of the graph or of
+            one of its services.
         services (list): List of Service objects related to this graph, with cascading delete.
     """
 
     __tablename__ = "graph"
+    __table_args__ = (
+        # The pages of the graphs of a project, see `fetch_project_graphs`
+        db.Index("ix_graph_project_id", "project", "id"),
+        db.Index(
+            "ix_graph_descriptor", "graph_descriptor", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), unique=True, nullable=False)
@@ -47,10 +76,18 @@ class Graph(db.Model):
     project = db.Column(db.String(255))
     grafana = db.Column(db.String(255))
 
-    graph_descriptor = db.Column(JSON)
+    graph_descriptor = db.Column(JSONDocument)
+
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime(timezone=True), default=utcnow)
 
     services = db.relationship("Service", back_populates="graph", cascade="all,delete")
 
+    def touch(self):
+        """Records a modification of the graph."""
+        self.version = (self.version or 0) + 1
+        self.updated_at = utcnow()
+
     def start(self):
         """Start the graph."""
         self.status = "Running"
@@ -59,6 +96,18 @@ class Graph(db.Model):
         """Stop the graph."""
         self.status = "Stopped"
 
+    def to_summary_dict(self):
+        """Return a dictionary representation of the class, without the
+        descriptor and with only the status of the services."""
+
+        return {
+            "name": self.name,
+            "status": self.status,
+            "project": self.project,
+            "grafana": self.grafana,
+            "services": [service.to_summary_dict() for service in self.services],
+        }
+
     def to_dict(self):
         """Return a dictionary representation of the class."""
 
@@ -72,3 +121,27 @@ class Graph(db.Model):
         }
 
         return instance_dict
+
+
+@event.listens_for(Session, "before_flush")
+def touch_modified_graphs(session, flush_context, instances):
+    """Bumps the version of the graphs modified by a flush, directly or
+    through their services, whatever the code path modifying them."""
+
+    graphs = set()
+    for instance in chain(session.dirty, session.new, session.deleted):
+        if isinstance(instance, Service):
+            graph = instance.graph
+            if graph is not None and (
+                instance in session.new
+                or instance in session.deleted
+                or session.is_modified(instance)
+            ):
+                graphs.add(graph)
+        elif isinstance(instance, Graph) and session.is_modified(instance):
+            graphs.add(instance)
+
+    for graph in graphs:
+        # New graphs start at version 1, deleted ones have no version to bump
+        if graph not in session.new and graph not in session.deleted:
+            graph.touch()
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 from enum import Enum
 
-from sqlalchemy import JSON
-
 from smo.extensions import db
+from smo.models.types import JSONDocument
 
 
 class ServiceStatus(Enum):
@@ -38,13 +39,33 @@ class Service(db.Model):
         artifact_ref (str): The reference to the service's artifact.
         artifact_type (str): The type of artifact.
         artifact_implementer (str): The implementer of the artifact.
-        resources (JSON): JSON object containing resource specifications.
-        values_overwrite (JSON): JSON object for value overwrites.
+        resources (JSON): JSON object containing resource specifications, JSONB
+            with a GIN index on PostgreSQL.
+        values_overwrite (JSON): JSON object for value overwrites, JSONB with a
+            GIN index on PostgreSQL.
+        values_hash (str): Hash of the chart reference and values the service
+            should be deployed with, see `values_hash`.
+        applied_hash (str): Hash of the chart reference and values of the last
+            successful Helm install or upgrade, None if it is not deployed.
         graph (Graph): A relationship to the Graph model this service is associated with.
         graph_id (int): Foreign key linking to the associated Graph model.
     """
 
     __tablename__ = "service"
+    __table_args__ = (
+        # Lookups by graph, cluster and artifact, see `graph_service.find_*`
+        db.Index("ix_service_graph_id", "graph_id"),
+        db.Index("ix_service_cluster_affinity", "cluster_affinity"),
+        db.Index("ix_service_artifact_ref", "artifact_ref"),
+        db.Index(
+            "ix_service_values_overwrite",
+            "values_overwrite",
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_service_resources", "resources", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), unique=True, nullable=False)
@@ -56,19 +77,43 @@ class Service(db.Model):
     artifact_type = db.Column(db.String(255))
     artifact_implementer = db.Column(db.String(255))
 
-    resources = db.Column(JSON)
-    values_overwrite = db.Column(JSON)
+    resources = db.Column(JSONDocument)
+    values_overwrite = db.Column(JSONDocument)
+    values_hash = db.Column(db.String(64))
+    applied_hash = db.Column(db.String(64))
 
     graph = db.relationship("Graph", back_populates="services")
     graph_id = db.Column(db.Integer, db.ForeignKey("graph.id"), nullable=False)
 
+    def set_values(self, values_overwrite):
+        """Sets the values to deploy the service with, and their hash."""
+        self.values_overwrite = values_overwrite
+        self.values_hash = values_hash(self.artifact_ref, values_overwrite)
+
+    @property
+    def needs_apply(self) -> bool:
+        """True if the chart or values of the service differ from those of
+        its last Helm install or upgrade."""
+        return self.values_hash is None or self.values_hash != self.applied_hash
+
     def deploy(self):
-        """Deploys the service."""
+        """Deploys the service, with its current chart and values."""
         self.status = "Deployed"
+        self.applied_hash = self.values_hash
 
     def undeploy(self):
         """Undeploys the service."""
         self.status = "Not deployed"
+        self.applied_hash = None
+
+    def to_summary_dict(self):
+        """Returns the name, status and cluster of the service."""
+
+        return {
+            "name": self.name,
+            "status": self.status,
+            "cluster_affinity": self.cluster_affinity,
+        }
 
     def to_dict(self):
         """Returns a dictionary representation of the class."""
@@ -86,3 +131,23 @@ class Service(db.Model):
         }
 
         return instance_dict
+
+
+def values_hash(artifact_ref, values_overwrite) -> str:
+    """Returns a stable hash of a chart reference and of the values it is
+    rendered with, independent of the order of their keys.
+
+    Example:
+        >>> values_hash("oci://chart", {"a": 1, "b": [2]}) == values_hash(
+        ...     "oci://chart", {"b": [2], "a": 1}
+        ... )
+        True
+    """
+
+    document = json.dumps(
+        {"artifact_ref": artifact_ref, "values": values_overwrite},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(document.encode()).hexdigest()
@@ -0,0 +1,10 @@
+"""Column types shared by the models."""
+
+from __future__ import annotations
+
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+# JSON documents, stored as JSONB on PostgreSQL so that they can be indexed
+# (GIN) and queried by containment
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
@@ -2,79 +2,290 @@
 
 from __future__ import annotations
 
+import copy
+import hashlib
+import logging
 import subprocess
 import tempfile
-import threading
-from os import path, walk
 from typing import TYPE_CHECKING
 
 import yaml
 from flask import current_app
-from werkzeug.exceptions import BadRequest, NotFound
+from sqlalchemy import type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import defer, selectinload
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound
 
 from smo.extensions import db
 from smo.models import Graph, Service
+from smo.models.graph import graph_etag
+from smo.services.job_service import submit_job
+from smo.utils.actuation import Cooldown
+from smo.utils.artifact_cache import ArtifactCache
 # TODO: replace constant values
-from smo.utils.constant import (ACCELERATION, ACCELERATION_LIST, ALPHA, BETA,
+from smo.utils.constant import (ACCELERATION, ALPHA, BETA,
                                 CLUSTER_ACCELERATION,
                                 CLUSTER_ACCELERATION_LIST, CLUSTER_CAPACITY,
-                                CLUSTER_CAPACITY_LIST, CLUSTERS,
-                                CPU_LIMITS_LIST, DECISION_INTERVAL,
-                                GRAPH_GRAFANA, INITIAL_PLACEMENT,
-                                MAXIMUM_REPLICAS, PROMETHEUS_HOST,
-                                REPLICAS_LIST, RESOURCES, SERVICES,
-                                SERVICES_GRAFANA)
-from smo.utils.kube_helper import KubeHelper
-from smo.utils.placement import (convert_placement, decide_placement,
+                                CLUSTER_CAPACITY_LIST, CLUSTERS, CPU_LIMITS,
+                                DECISION_INTERVAL, GRAPH_GRAFANA,
+                                INITIAL_PLACEMENT, MAXIMUM_REPLICAS,
+                                PROMETHEUS_HOST, REPLICAS, RESOURCES,
+                                SCALE_DOWN_COOLDOWN, SCALE_UP_COOLDOWN,
+                                SERVICES_GRAFANA, STARTUP_DELAY)
+from smo.utils.controller import ScalingController
+from smo.utils.forecast import NONE, create_forecaster
+from smo.utils.graph_index import GraphIndex
+from smo.utils.helm_executor import HelmExecutor, HelmOperation
+from smo.utils.kube_helper import get_kube_helper
+from smo.utils.parallel import run_in_dependency_order
+from smo.utils.placement import (convert_placement, create_placement_solver,
                                  swap_placement)
-from smo.utils.scaling import scaling_loop
+from smo.utils.replacement import DEFAULT_DEBOUNCE, ReplacementQueue
+from smo.utils.replica_engine import create_replica_engine
+from smo.utils.scaling import ClusterScaler
+from smo.utils.solver_backend import AUTO
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
+    from datetime import datetime
 
-background_scaling_threads = [None, None]
-stop_events = [threading.Event(), threading.Event()]
+    from flask import Flask
 
+    from smo.utils.placement import PlacementSolver
 
-def fetch_project_graphs(project: str) -> list[dict]:
-    """Retrieves all the descriptors of a project.
+logger = logging.getLogger(__name__)
+
+# Runs the scaling loops of all the graphs of the process
+scaling_controller = ScalingController()
+
+# Placement models of the graphs, kept between re-placements
+placement_solvers: dict[str, PlacementSolver] = {}
+
+# Placement matrix of each graph, the starting point of its re-placement
+graph_placements: dict[str, list[list[int]]] = {}
+
+# Pulled artifacts, set up by `configure_artifact_cache`
+artifact_cache: ArtifactCache | None = None
+
+# Re-placements requested by the scaling loops, set up by
+# `configure_replacement_queue`
+replacement_queue: ReplacementQueue | None = None
+
+# Pagination of the graphs of a project
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+GRAPH_VIEWS = ("full", "summary")
+
+# Runs the Helm commands of all the graphs of the process
+helm_executor = HelmExecutor()
+
+
+class HelmInstallError(Exception):
+    """Raised when the Helm install of some services of a graph failed.
+
+    Attributes:
+        graph_name (str): The name of the graph being deployed.
+        errors (dict): The exception raised for each failed service.
+    """
+
+    def __init__(self, graph_name: str, errors: dict[str, BaseException]):
+        self.graph_name = graph_name
+        self.errors = errors
+        super().__init__(
+            f"Deployment of graph {graph_name} failed for services: "
+            + ", ".join(sorted(errors))
+        )
+
+
+def fetch_project_graphs(
+    project: str,
+    after: int | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    view: str = "full",
+) -> tuple[list[dict], int | None]:
+    """Retrieves a page of the descriptors of a project.
+
+    Graphs are ordered by id, and paginated by keyset: the next page starts
+    after the last graph of the previous one. A page takes two queries, one
+    for the graphs and one for all their services, whatever its size.
 
     Input:
     - project: The project instance or ID for which graphs are retrieved.
+    - after: The cursor returned with the previous page, None for the first.
+    - limit: The maximum number of graphs of the page.
+    - view: "full" for the descriptors, "summary" for the name and status of
+      the graphs and of their services only.
 
     Returns:
     - A list of dictionaries where each dictionary represents a graph descriptor.
+    - The cursor of the next page, or None if this is the last one.
+
+    Raises:
+    - BadRequest: If the limit is out of range or the view is unknown.
+    """
+
+    _check_view(view)
+    query = _project_graphs_query(Graph, project, after, limit)
+    if view == "summary":
+        # Neither the descriptors nor the service values are loaded
+        query = query.options(
+            defer(Graph.graph_descriptor),
+            selectinload(Graph.services).load_only(
+                Service.name, Service.status, Service.cluster_affinity
+            ),
+        )
+    else:
+        query = query.options(selectinload(Graph.services))
+    graphs = query.all()
+
+    next_cursor = graphs[limit - 1].id if len(graphs) > limit else None
+    if view == "summary":
+        return [graph.to_summary_dict() for graph in graphs[:limit]], next_cursor
+    return [graph.to_dict() for graph in graphs[:limit]], next_cursor
+
+
+def fetch_project_graphs_validators(
+    project: str,
+    after: int | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    view: str = "full",
+) -> tuple[str, datetime | None]:
+    """Returns the entity tag and the last modification time of a page of the
+    graphs of a project, see `fetch_project_graphs`.
+
+    Only the ids and versions of the graphs are queried, so that a client
+    whose copy of the page is current can be answered without loading it.
+    The entity tag also depends on the view and the page parameters, which
+    change the representation of the same graphs.
+
+    Raises:
+    - BadRequest: If the limit is out of range or the view is unknown.
     """
-    # Query the database for all Graph instances related to the given project
-    graphs = db.session.query(Graph).filter_by(project=project).all()
 
-    # Convert each graph to a dictionary
-    project_graphs = [graph.to_dict() for graph in graphs]
+    _check_view(view)
+    rows = _project_graphs_query(
+        (Graph.id, Graph.version, Graph.updated_at), project, after, limit
+    ).all()
+    page = rows[:limit]
+    # Whether there is a next page is part of the response, as well as the
+    # parameters of the link to it
+    key = (
+        f"{view}:{after}:{limit}|"
+        + ",".join(f"{row.id}:{row.version}" for row in page)
+        + f"+{len(rows) > limit}"
+    )
+    last_modified = max((row.updated_at for row in page if row.updated_at), default=None)
+    return f"project-{hashlib.sha256(key.encode()).hexdigest()[:32]}", last_modified
 
-    return project_graphs
+
+def fetch_graph_validators(name: str) -> tuple[str, datetime | None] | None:
+    """Returns the entity tag and the last modification time of a graph,
+    without loading it, or None if it does not exist."""
+
+    row = (
+        db.session.query(Graph.id, Graph.version, Graph.updated_at)
+        .filter_by(name=name)
+        .first()
+    )
+    if row is None:
+        return None
+    return graph_etag(row.id, row.version), row.updated_at
 
 
-def deploy_graph(project: str, graph_descriptor) -> None:
+def _check_view(view: str) -> None:
+    if view not in GRAPH_VIEWS:
+        raise BadRequest(f"Unknown view {view}, expected one of {GRAPH_VIEWS}")
+
+
+def _project_graphs_query(entities, project, after, limit):
+    """Returns the query of a page of the graphs of a project, plus the
+    first graph of the next page, if any.
+
+    Raises:
+    - BadRequest: If the limit is out of range.
+    """
+
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"Page limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    if not isinstance(entities, tuple):
+        entities = (entities,)
+    query = db.session.query(*entities).filter(Graph.project == project)
+    if after is not None:
+        query = query.filter(Graph.id > after)
+    # One more row tells whether there is a next page
+    return query.order_by(Graph.id).limit(limit + 1)
+
+
+def check_graph_operation(operation: str, name: str) -> Graph | None:
+    """Checks that an operation can be run on a graph, before running it or
+    queuing it as a job.
+
+    Input:
+    - operation: "deploy", "placement", "start" or "stop".
+    - name: The name of the graph.
+
+    Returns:
+    - The graph, or None for a deployment.
+
+    Raises:
+    - BadRequest: If the graph to deploy already exists, if the graph to start
+      is already running, if the graph to stop is already stopped or if the
+      graph to re-place is not running.
+    - NotFound: If the graph to re-place, start or stop does not exist.
+    """
+
+    graph = db.session.query(Graph).filter_by(name=name).first()
+    if operation == "deploy":
+        if graph is not None:
+            raise BadRequest(f"Graph with name {name} already exists")
+        return None
+
+    if graph is None:
+        raise NotFound(f"Graph with name {name} not found")
+    if operation == "start" and graph.status == "Running":
+        raise BadRequest(f"Graph with name {name} is already running")
+    if operation == "stop" and graph.status == "Stopped":
+        raise BadRequest(f"Graph with name {name} is already stopped")
+    # Re-placement upgrades the installed services, a stopped graph has none
+    if operation == "placement" and graph.status != "Running":
+        raise BadRequest(f"Graph with name {name} is not running")
+    return graph
+
+
+def deploy_graph(project: str, graph_descriptor, progress=None) -> list[str]:
     """Instantiates an application graph by using Helm to deploy each service's
     artifact.
 
+    The graph and its services are staged in memory while Helm runs, each
+    service being marked as deployed when its install finishes, and they
+    are all persisted with a single commit. If an install fails, nothing is
+    written to the database and the services that were installed are
+    uninstalled.
+
     Args:
         project (str): The project name under which the graph is to be deployed.
         graph_descriptor (dict): The descriptor of the graph, containing details
             such as graph id and services configuration.
-    """
+        progress (callable): Optional callback, called with the name and the
+            new status of each service as the deployment progresses.
 
-    global graph_placement
+    Returns:
+        list[str]: The names of the services installed with Helm, in
+            installation order.
+
+    Raises:
+        BadRequest: If a graph with the same name already exists.
+        HelmInstallError: If the install of some services failed.
+    """
 
     hdag_config = graph_descriptor
     name = hdag_config["id"]
 
-    # Query the database to check if a graph with the same name already exists
-    graph = db.session.query(Graph).filter_by(name=name).first()
-    if graph is not None:
-        raise BadRequest(f"Graph with name {name} already exists")
+    # Check that no graph with the same name already exists
+    check_graph_operation("deploy", name)
 
-    # Create a new Graph object and add it to the database
+    # Create a new Graph object, only added to the database once deployed
     graph = Graph(
         name=name,
         graph_descriptor=graph_descriptor,
@@ -82,29 +293,33 @@ def deploy_graph(project: str, graph_descriptor) -> None:
         status="Running",
         grafana=GRAPH_GRAFANA,
     )
-    db.session.add(graph)
-    db.session.commit()
 
     services = hdag_config["services"]
+    index = GraphIndex(services)
 
     # Decide the initial placement of services across clusters
-    placement = decide_placement(
+    solver = placement_solvers[name] = create_placement_solver(solver_backend())
+    placement = solver.solve(
         CLUSTER_CAPACITY_LIST,
         CLUSTER_ACCELERATION_LIST,
-        CPU_LIMITS_LIST,
-        ACCELERATION_LIST,
-        REPLICAS_LIST,
+        index.column(CPU_LIMITS),
+        index.column(ACCELERATION),
+        index.column(REPLICAS),
         INITIAL_PLACEMENT,
         initial_placement=True,
+        dependencies=index.placement_dependencies(),
     )
-    graph_placement = placement
 
     # Convert the placement to service-specific placement
     service_placement = convert_placement(placement, services, CLUSTERS)
     cluster_placement = swap_placement(service_placement)
 
     # Create service import clusters for cross-cluster communication
-    import_clusters = create_service_imports(services, service_placement)
+    import_clusters = create_service_imports(services, service_placement, index)
+
+    kubeconfig = current_app.config["KARMADA_KUBECONFIG"]
+    service_rows = {}
+    installs = {}
 
     for service in services:
         name = service["id"]
@@ -125,12 +340,11 @@ def deploy_graph(project: str, graph_descriptor) -> None:
         placement_dict["clustersAffinity"] = [service_placement[name]]
         placement_dict["serviceImportClusters"] = import_clusters[name]
 
-        # Create and add a Service object to the database
+        # Create a Service object, attached to the graph so that all the
+        # services are inserted together with it
         svc = Service(
             name=name,
-            values_overwrite=values_overwrite,
-            graph_id=graph.id,
-            status="Deployed",
+            status="Not deployed",
             cluster_affinity=service_placement[name],
             artifact_ref=artifact_ref,
             artifact_type=artifact_type,
@@ -138,15 +352,53 @@ def deploy_graph(project: str, graph_descriptor) -> None:
             resources=RESOURCES[name],
             grafana=SERVICES_GRAFANA[name],
         )
-        db.session.add(svc)
-        db.session.commit()
+        svc.set_values(values_overwrite)
+        graph.services.append(svc)
+        service_rows[name] = svc
 
-        # Deploy the artifact using Helm
-        helm_install_artifact(name, artifact_ref, values_overwrite, "install")
+        # Deploy the artifact using Helm, once the services it connects to
+        # are installed
+        installs[name] = HelmOperation(
+            name,
+            "install",
+            helm_install_artifact,
+            (name, artifact_ref, values_overwrite, "install"),
+            {"kubeconfig": kubeconfig},
+        )
+
+    def record_install(name, error):
+        # Status transition of the staged service, as its install finishes
+        if error is None:
+            service_rows[name].deploy()
+        report(name, "installed" if error is None else "failed")
+
+    report = _progress_reporter(progress, service_rows)
+
+    errors = run_in_dependency_order(
+        {name: installs[name] for name in index.dependency_order()},
+        index.dependencies(),
+        helm_executor,
+        on_done=record_install,
+    )
+
+    if errors:
+        # Leave neither rows nor releases behind
+        helm_uninstall_graph(
+            svc for svc in service_rows.values() if svc.status == "Deployed"
+        )
+        placement_solvers.pop(graph.name, None)
+        raise HelmInstallError(graph.name, errors)
+
+    # Persist the graph and all its services in a single transaction
+    db.session.add(graph)
+    db.session.commit()
+    graph_placements[graph.name] = placement
 
     # Spawn processes for scaling the deployed services
     spawn_scaling_processes(graph.name, cluster_placement)
 
+    return index.dependency_order()
+
 
 def fetch_graph(name: str) -> Graph:
     """Retrieves the descriptor of an application graph.
@@ -166,49 +418,179 @@ def fetch_graph(name: str) -> Graph:
     return graph
 
 
-def trigger_placement(name: str) -> None:
+def find_graphs_using_artifact(artifact_ref: str) -> list[dict]:
+    """Returns the graphs with a service deployed from an artifact.
+
+    The graphs are found through the index on the artifacts of the
+    services, in a single query, plus one for their services.
+
+    Input:
+    - artifact_ref: The reference of the artifact, e.g. an OCI image.
+
+    Returns:
+    - The summaries of the graphs, ordered by name.
+    """
+
+    graphs = (
+        db.session.query(Graph)
+        .filter(Graph.services.any(Service.artifact_ref == artifact_ref))
+        .options(
+            defer(Graph.graph_descriptor),
+            selectinload(Graph.services).load_only(
+                Service.name, Service.status, Service.cluster_affinity
+            ),
+        )
+        .order_by(Graph.name)
+        .all()
+    )
+    return [graph.to_summary_dict() for graph in graphs]
+
+
+def find_services(
+    cluster: str | None = None,
+    artifact_ref: str | None = None,
+    values: dict | None = None,
+) -> list[dict]:
+    """Returns the services matching all the given criteria, each one
+    answered from an index.
+
+    Input:
+    - cluster: The cluster the services are placed on.
+    - artifact_ref: The artifact the services are deployed from.
+    - values: Values the values overwrite of the services contain, e.g.
+      {"image": {"tag": "1.2"}}. PostgreSQL only, where the JSONB documents
+      have GIN indexes.
+
+    Returns:
+    - The services, with the name of their graph, ordered by name.
+
+    Raises:
+    - BadRequest: If values are given and the database is not PostgreSQL.
+    """
+
+    query = db.session.query(Service, Graph.name).join(Service.graph)
+    if cluster is not None:
+        query = query.filter(Service.cluster_affinity == cluster)
+    if artifact_ref is not None:
+        query = query.filter(Service.artifact_ref == artifact_ref)
+    if values is not None:
+        if db.session.get_bind().dialect.name != "postgresql":
+            msg = "Querying the values of the services requires PostgreSQL"
+            raise BadRequest(msg)
+        query = query.filter(
+            type_coerce(Service.values_overwrite, JSONB).contains(values)
+        )
+
+    return [
+        {**service.to_dict(), "graph": graph_name}
+        for service, graph_name in query.order_by(Service.name)
+    ]
+
+
+def trigger_placement(name: str, progress=None) -> list[str]:
     """Triggers the placement algorithm for the given graph.
 
+    Only the services whose values changed with the new placement are
+    upgraded with Helm.
+
     Input:
     - name (str): The name of the graph for which the placement algorithm is to be triggered.
-    """
+    - progress (callable): Optional callback, called with the name and the new
+      status of each service as the re-placement progresses.
 
-    global graph_placement
+    Returns:
+    - The names of the services upgraded with Helm.
+    """
 
     # Query the graph object from the database using the provided name
-    graph = db.session.query(Graph).filter_by(name=name).first()
-    if graph is None:
-        raise NotFound(f"Graph with name {name} not found")
-
-    # Stop all currently running placement processes
-    for stop_event in stop_events:
-        stop_event.set()
+    graph = check_graph_operation("placement", name)
 
-    # Initialize KubeHelper with the current configuration for Karmada
-    kube_helper = KubeHelper(current_app.config["KARMADA_KUBECONFIG"])
-    # Retrieve the current number of replicas for each service
-    current_replicas = [kube_helper.get_replicas(service) for service in SERVICES]
+    # Extract services from the graph descriptor
+    descriptor_services = graph.graph_descriptor["services"]
+    index = GraphIndex(descriptor_services)
+
+    # Reuse the informer-backed KubeHelper shared with the scaling loops
+    kube_helper = get_kube_helper(current_app.config["KARMADA_KUBECONFIG"])
+    # Retrieve the current number of replicas for each service, none for
+    # the deployments missing or without available replicas
+    snapshot = kube_helper.snapshot(index.ids)
+    current_replicas = [
+        (snapshot[service].available_replicas or 0) if service in snapshot else 0
+        for service in index.ids
+    ]
     # Decide on a new placement for the services based on various parameters
-    placement = decide_placement(
+    solver = placement_solvers.get(name)
+    if solver is None:
+        solver = placement_solvers[name] = create_placement_solver(solver_backend())
+    placement = solver.solve(
         CLUSTER_CAPACITY_LIST,
         CLUSTER_ACCELERATION_LIST,
-        CPU_LIMITS_LIST,
-        ACCELERATION_LIST,
+        index.column(CPU_LIMITS),
+        index.column(ACCELERATION),
         current_replicas,
-        graph_placement,
+        graph_placements.get(name) or _recorded_placement(graph, index),
         initial_placement=False,
+        dependencies=index.placement_dependencies(),
     )
-    # Extract services from the graph descriptor and update global placement
-    descriptor_services = graph.graph_descriptor["services"]
-    graph_placement = placement
     # Convert placement data into a format suitable for services and clusters
     service_placement = convert_placement(placement, descriptor_services, CLUSTERS)
     cluster_placement = swap_placement(service_placement)
-    import_clusters = create_service_imports(descriptor_services, service_placement)
+    import_clusters = create_service_imports(
+        descriptor_services, service_placement, index
+    )
+
+    # Stop the scaling loops of the graph while its services are upgraded,
+    # now that a new placement exists
+    scaling_controller.stop(name)
+    try:
+        upgraded = _apply_placement(
+            graph, service_placement, import_clusters, progress
+        )
+    except Exception:
+        # Scale the services where they are, some of them being upgraded
+        db.session.rollback()
+        graph_placements.pop(name, None)
+        spawn_scaling_processes(
+            name,
+            swap_placement(
+                {service.name: service.cluster_affinity for service in graph.services}
+            ),
+        )
+        raise
+
+    graph_placements[name] = placement
+
+    # Spawn scaling processes for the services based on the new cluster placement
+    spawn_scaling_processes(name, cluster_placement)
+
+    return upgraded
+
+
+def _recorded_placement(graph, index):
+    """Returns the placement matrix of the services of a graph from their
+    cluster affinities, e.g. for a graph deployed before a restart."""
 
+    affinities = {service.name: service.cluster_affinity for service in graph.services}
+    return [
+        [int(affinities.get(service) == cluster) for cluster in CLUSTERS]
+        for service in index.ids
+    ]
+
+
+def _apply_placement(graph, service_placement, import_clusters, progress):
+    """Sets the placement of each service of a graph in its values, and
+    upgrades those whose values changed with Helm, each upgrade being
+    recorded as soon as it is applied.
+
+    Returns:
+    - The names of the services upgraded with Helm.
+    """
+
+    upgraded = []
+    report = _progress_reporter(progress, (service.name for service in graph.services))
     for service in graph.services:
         # Update service's JSON fields; requires creating a new dictionary
-        values_overwrite = dict(service.values_overwrite)
+        values_overwrite = copy.deepcopy(service.values_overwrite)
         placement_dict = values_overwrite
 
         # Adjust placement dictionary for services implemented with "WOT"
@@ -217,77 +599,88 @@ def trigger_placement(name: str) -> None:
                 values_overwrite["voChartOverwrite"] = {}
             placement_dict = values_overwrite["voChartOverwrite"]
 
-        # Update the service placement if it has changed and apply the changes
-        if placement_dict["clustersAffinity"][0] != service_placement[service.name]:
-            placement_dict["clustersAffinity"] = [service_placement[service.name]]
-            placement_dict["serviceImportClusters"] = import_clusters[service.name]
-            service.values_overwrite = values_overwrite
-            db.session.commit()
-
-            # Install or upgrade the service using Helm
-            helm_install_artifact(
-                service.name, service.artifact_ref, values_overwrite, "upgrade"
-            )
+        placement_dict["clustersAffinity"] = [service_placement[service.name]]
+        placement_dict["serviceImportClusters"] = import_clusters[service.name]
+        service.cluster_affinity = service_placement[service.name]
+        service.set_values(values_overwrite)
 
-    # Spawn scaling processes for the services based on the new cluster placement
-    spawn_scaling_processes(name, cluster_placement)
+        if apply_service(service):
+            upgraded.append(service.name)
+            db.session.commit()
+            report(service.name, "upgraded")
+        else:
+            report(service.name, "unchanged")
+    db.session.commit()
+    return upgraded
 
 
-def start_graph(name: str) -> None:
+def start_graph(name: str, progress=None) -> list[str]:
     """Starts a stopped graph.
 
+    Each service is recorded as deployed as soon as it is installed, so
+    that starting the graph again after a failure only installs the
+    remaining services.
+
     Input:
         name (str): The name of the graph to be started.
+        progress (callable): Optional callback, called with the name and the
+            new status of each service as the graph starts.
+
+    Returns:
+        list[str]: The names of the services installed or upgraded with Helm.
 
     Raises:
         NotFound: If the graph with the given name is not found in the database.
         BadRequest: If the graph is already running.
     """
 
-    # Query the database to find the graph by name.
-    # TODO: use a get method instead of query
-    graph = db.session.query(Graph).filter_by(name=name).first()
-
-    # Raise an exception if the graph does not exist.
-    if graph is None:
-        raise NotFound(f"Graph with name {name} not found")
-
-    # The graph should not be already running.
-    if graph.status == "Running":
-        raise BadRequest(f"Graph with name {name} is already running")
-
-    graph.start()
+    # The graph should exist, and not be already running.
+    graph = check_graph_operation("start", name)
 
     # Iterate through each service in the graph to deploy them.
+    applied = []
+    report = _progress_reporter(progress, (service.name for service in graph.services))
     for service in graph.services:
         # Install the service using helm, updating its status.
-        helm_install_artifact(
-            service.name, service.artifact_ref, service.values_overwrite, "install"
-        )
-        service.deploy()
+        try:
+            command = apply_service(service)
+        except Exception:
+            report(service.name, "failed")
+            raise
+        if command is None:
+            report(service.name, "unchanged")
+        else:
+            applied.append(service.name)
+            db.session.commit()
+            report(service.name, "installed" if command == "install" else "upgraded")
 
+    graph.start()
     db.session.commit()
 
+    return applied
+
 
-def stop_graph(name: str) -> None:
+def stop_graph(name: str, progress=None) -> None:
     """Stops a running graph by removing its artifacts and updating its status.
 
     Input:
     - name (str): The name of the graph to stop.
+    - progress (callable): Optional callback, called with the name and the new
+      status of each service as the graph stops.
     """
 
-    graph: Graph = db.session.query(Graph).filter_by(name=name).first()
-    if graph is None:
-        raise NotFound(f"Graph with name {name} not found")
-    if graph.status == "Stopped":
-        raise BadRequest(f"Graph with name {name} is already stopped")
+    graph = check_graph_operation("stop", name)
 
-    # Uninstall all services associated with the graph using Helm
+    # Stop scaling the graph and uninstall all its services using Helm
+    scaling_controller.stop(name)
+    placement_solvers.pop(name, None)
+    report = _progress_reporter(progress, (service.name for service in graph.services))
     helm_uninstall_graph(graph.services)
 
     graph.status = "Stopped"
     for service in graph.services:
         service.undeploy()
+        report(service.name, "uninstalled")
 
     db.session.commit()
 
@@ -306,7 +699,10 @@ def remove_graph(name: str) -> None:
     if graph is None:
         raise NotFound(f"Graph with name {name} not found")
 
-    # Uninstall services associated with the graph
+    # Stop scaling the graph and uninstall its services
+    scaling_controller.stop(name)
+    placement_solvers.pop(name, None)
+    graph_placements.pop(name, None)
     helm_uninstall_graph(graph.services)
 
     # Delete the graph object from the database
@@ -315,7 +711,7 @@ def remove_graph(name: str) -> None:
     db.session.commit()
 
 
-def create_service_imports(services, service_placement):
+def create_service_imports(services, service_placement, index=None):
     """Determine which other services each service connects to and return a
     dictionary with service names as keys and a list of cluster names where the
     service needs to be imported as values.
@@ -325,6 +721,7 @@ def create_service_imports(services, service_placement):
       and "deployment", which further contains "intent" and "connectionPoints".
     - service_placement: A dictionary mapping each service "id" to a cluster
       name where the service is placed.
+    - index: The `GraphIndex` of the services, if already built.
 
     Returns:
     - A dictionary with keys as service IDs and values as lists of cluster
@@ -335,31 +732,38 @@ def create_service_imports(services, service_placement):
       if a service ID is not found in the `service_placement` dictionary.
     """
 
-    # Initialize a dictionary with service IDs as keys and empty lists as values
-    # for storing clusters where the service will be imported.
-    service_import_clusters = {service["id"]: [] for service in services}
+    if index is None:
+        index = GraphIndex(services)
+    return index.import_clusters(service_placement)
+
+
+def _progress_reporter(progress, names):
+    """Returns a function reporting the status of a service to the progress
+    callback, if any, after reporting all the services as pending."""
+
+    if progress is None:
+        return lambda name, status: None
+    for name in names:
+        progress(name, "pending")
+    return progress
 
-    for service in services:
-        # Retrieve the connection points for each service
-        connection_points = service["deployment"]["intent"]["connectionPoints"]
-        for other_service in services:
-            # Check if another service is in the connection points of the current service
-            if other_service["id"] in connection_points:
-                # Extend the list of clusters for the connected service
-                service_import_clusters[other_service["id"]].extend(
-                    [service_placement[service["id"]]]
-                )
 
-    return service_import_clusters
+def configure_artifact_cache(directory, max_bytes, max_age=None):
+    """Replaces the cache of the artifacts pulled by
+    `get_descriptor_from_artifact`, see `smo.utils.artifact_cache`."""
 
+    global artifact_cache
+    artifact_cache = ArtifactCache(directory, max_bytes, max_age=max_age)
 
-def get_descriptor_from_artifact(project, artifact_ref):
-    """Calls the hdarctl cli to pull an artifact and deploys the descriptor
-    inside after untaring the artifact.
+
+def get_descriptor_from_artifact(project, artifact_ref, refresh=False):
+    """Returns the descriptor of an artifact, pulling and untaring it with
+    the hdarctl cli unless it is already cached.
 
     Inputs:
         project: The project associated with the artifact. (Unused in the function)
         artifact_ref: A string reference to the artifact to be pulled.
+        refresh: Pull the artifact even if it is cached.
 
     Returns:
         A Python object representing the YAML descriptor contained within the artifact.
@@ -370,31 +774,88 @@ def get_descriptor_from_artifact(project, artifact_ref):
         subprocess.CalledProcessError: If the hdarctl command fails.
     """
 
-    with tempfile.TemporaryDirectory() as dirpath:
-        # Run the hdarctl command to pull and untar the artifact to a temporary directory
-        subprocess.run(
-            [
-                "hdarctl",
-                "pull",
-                artifact_ref,
-                "--untar",
-                "--destination",
-                dirpath,
-            ]
-        )
+    global artifact_cache
+    if artifact_cache is None:
+        artifact_cache = ArtifactCache()
+    return artifact_cache.descriptor(artifact_ref, refresh=refresh)
+
 
-        # Search for YAML files in the directory tree
-        # TODO: refact using pathlib
-        for root, dirs, files in walk(dirpath):
-            for file in files:
-                if file.endswith(".yaml") or file.endswith(".yml"):
-                    # Open and parse the first YAML file found
-                    with open(path.join(root, file)) as yaml_file:
-                        data = yaml.safe_load(yaml_file)
-                        return data
+def deploy_artifact(project, artifact_ref, refresh=False, progress=None) -> list[str]:
+    """Deploys the graph of an artifact, see `deploy_graph`.
 
+    The artifact is pulled unless it is cached, so this runs as a job rather
+    than while handling the request.
+
+    Inputs:
+        project: The project under which the graph is deployed.
+        artifact_ref: A string reference to the artifact to be pulled.
+        refresh: Pull the artifact even if it is cached.
+        progress: Optional callback, see `deploy_graph`.
 
-def helm_install_artifact(name, artifact_ref, values_overwrite, command):
+    Returns:
+        The names of the services installed with Helm, in installation order.
+
+    Raises:
+        BadRequest: If a graph with the same name already exists.
+        HelmInstallError: If the install of some services failed.
+        subprocess.CalledProcessError: If the hdarctl command fails.
+    """
+
+    descriptor = get_descriptor_from_artifact(project, artifact_ref, refresh=refresh)
+    return deploy_graph(project, descriptor["hdaGraph"], progress=progress)
+
+
+def solver_backend() -> str:
+    """Returns the configured solver backend of the placement and replica
+    decisions, see `smo.utils.solver_backend`."""
+
+    return current_app.config.get("SOLVER_BACKEND", AUTO)
+
+
+def apply_service(service: Service, kubeconfig=None) -> str | None:
+    """Installs or upgrades the Helm release of a service, unless it is
+    already deployed with the same chart and values.
+
+    The command runs on the Helm executor, after the other operations
+    queued for the release.
+
+    Input:
+    - service: The service, with the values to deploy it with.
+    - kubeconfig: Path of the Karmada kubeconfig, see `helm_install_artifact`.
+
+    Returns:
+    - The Helm command run, "install" or "upgrade", or None if the release
+      was already up to date.
+
+    Raises:
+    - subprocess.CalledProcessError: If the Helm command fails.
+    """
+
+    # Services stored before values were hashed
+    if service.values_hash is None:
+        service.set_values(service.values_overwrite)
+
+    deployed = service.status == "Deployed"
+    if deployed and not service.needs_apply:
+        return None
+
+    command = "upgrade" if deployed else "install"
+    operation = HelmOperation(
+        service.name,
+        command,
+        helm_install_artifact,
+        (service.name, service.artifact_ref, service.values_overwrite, command),
+        # Resolved here, as Helm runs outside of the application context
+        {"kubeconfig": kubeconfig or current_app.config["KARMADA_KUBECONFIG"]},
+    )
+    helm_executor.submit(operation).result()
+    service.deploy()
+    return command
+
+
+def helm_install_artifact(
+    name, artifact_ref, values_overwrite, command, kubeconfig=None
+):
     """Executes a Helm command (install/upgrade) for a given artifact.
 
     Args:
@@ -402,6 +863,8 @@ def helm_install_artifact(name, artifact_ref, values_overwrite, command):
         artifact_ref (str): The reference to the Helm chart or artifact.
         values_overwrite (dict): A dictionary of values to overwrite in the Helm chart.
         command (str): The command to execute, either "install" or "upgrade".
+        kubeconfig (str): Path of the Karmada kubeconfig. Defaults to the one of
+            the application config, which must then be available.
 
     Returns:
         None
@@ -424,8 +887,8 @@ def helm_install_artifact(name, artifact_ref, values_overwrite, command):
             "--values",
             values_file.name,
             "--kubeconfig",
-            # Kubeconfig file path from the application config
-            current_app.config["KARMADA_KUBECONFIG"],
+            # Kubeconfig file path, from the application config by default
+            kubeconfig or current_app.config["KARMADA_KUBECONFIG"],
         ]
         if command == "upgrade":
             # Reuse values from the previous release if upgrading
@@ -436,7 +899,7 @@ def helm_install_artifact(name, artifact_ref, values_overwrite, command):
 
 
 def helm_uninstall_graph(services: Iterable[Service]) -> None:
-    """Uninstalls all service artifacts.
+    """Uninstalls all service artifacts, concurrently on the Helm executor.
 
     Input:
     - services: A list of service objects, each containing a 'name' attribute
@@ -447,29 +910,59 @@ def helm_uninstall_graph(services: Iterable[Service]) -> None:
     """
     # TODO: raise a domain exception (GraphServiceException) instead of the built-in exceptions
 
-    for service in services:
-        # Construct the command to uninstall the service using helm
-        cmd = [
-            "helm",
-            "uninstall",
-            service.name,
-            "--kubeconfig",
-            current_app.config["KARMADA_KUBECONFIG"],
-        ]
-        # Execute the command and uninstall the service
-        subprocess.run(cmd)
+    kubeconfig = current_app.config["KARMADA_KUBECONFIG"]
+    futures = [
+        helm_executor.submit(
+            HelmOperation(
+                service.name,
+                "uninstall",
+                helm_uninstall_release,
+                (service.name, kubeconfig),
+            )
+        )
+        for service in services
+    ]
+    for future in futures:
+        future.result()
+
+
+def helm_uninstall_release(name, kubeconfig):
+    """Uninstalls a Helm release.
+
+    Args:
+        name (str): The name of the release.
+        kubeconfig (str): Path of the Karmada kubeconfig.
+    """
+
+    # Construct the command to uninstall the service using helm
+    cmd = [
+        "helm",
+        "uninstall",
+        name,
+        "--kubeconfig",
+        kubeconfig,
+    ]
+    # Execute the command and uninstall the service
+    subprocess.run(cmd)
+
+
+def configure_helm_executor(max_workers):
+    """Replaces the executor of the Helm commands. The operations queued on
+    the previous one still run."""
 
-    for stop_event in stop_events:
-        # Set each stop event to signal stopping of a service
-        stop_event.set()
+    global helm_executor
+    previous = helm_executor
+    helm_executor = HelmExecutor(max_workers)
+    previous.shutdown(wait=False)
 
 
 def spawn_scaling_processes(graph_name, cluster_placement) -> None:
-    """Spawns background threads that periodically run the scaling algorithm.
+    """Starts the scaling loops of a graph on the scaling controller.
 
-    Iterates over predefined clusters, spawning a thread for each
-    cluster that is included in the provided cluster placement. Each thread runs
-    a scaling loop with parameters specific to the services managed by that cluster.
+    Iterates over predefined clusters, creating a scaler for each cluster that
+    is included in the provided cluster placement. The scaling controller
+    registers them by (graph, cluster) and schedules their decision ticks,
+    replacing the previous scalers of the graph, if any.
 
     Input:
         graph_name (str): The name of the graph used in the scaling algorithm.
@@ -482,39 +975,79 @@ def spawn_scaling_processes(graph_name, cluster_placement) -> None:
                   or CLUSTER_ACCELERATION.
     """
 
-    for cluster_index, cluster in enumerate(CLUSTERS):
+    scalers = []
+    for cluster in CLUSTERS:
         if cluster not in cluster_placement.keys():
-            break
+            continue
         # Fetch cluster specific values
         managed_services = cluster_placement[cluster]
-        # Get acceleration factors for all managed services
-        acceleration = [ACCELERATION[service] for service in managed_services]
-        # Get alpha values for all managed services
-        alpha = [ALPHA[service] for service in managed_services]
-        # Get beta values for all managed services
-        beta = [BETA[service] for service in managed_services]
-        # Get maximum replica numbers for all managed services
-        maximum_replicas = [MAXIMUM_REPLICAS[service] for service in managed_services]
-
-        stop_events[cluster_index].clear()
-        # Create a new thread for the scaling loop with all necessary arguments
-        background_scaling_threads[cluster_index] = threading.Thread(
-            target=scaling_loop,
-            args=(
+        scalers.append(
+            ClusterScaler(
                 graph_name,
-                acceleration,
-                alpha,
-                beta,
+                cluster,
+                # Acceleration factors, alpha and beta values, and maximum
+                # replica numbers of all managed services
+                [ACCELERATION[service] for service in managed_services],
+                [ALPHA[service] for service in managed_services],
+                [BETA[service] for service in managed_services],
                 CLUSTER_CAPACITY[cluster],
                 CLUSTER_ACCELERATION[cluster],
-                maximum_replicas,
+                [MAXIMUM_REPLICAS[service] for service in managed_services],
                 managed_services,
                 DECISION_INTERVAL,
                 current_app.config["KARMADA_KUBECONFIG"],
                 PROMETHEUS_HOST,
-                stop_events[cluster_index],
-            ),
+                engine=create_replica_engine(solver_backend()),
+                forecaster=create_forecaster(current_app.config.get("FORECASTER", NONE)),
+                startup_delay=STARTUP_DELAY,
+                cooldowns={
+                    service: Cooldown(SCALE_UP_COOLDOWN, SCALE_DOWN_COOLDOWN)
+                    for service in managed_services
+                },
+                request_placement=request_replacement,
+            )
         )
-        background_scaling_threads[cluster_index].daemon = True
-        # Start the thread
-        background_scaling_threads[cluster_index].start()
+
+    scaling_controller.schedule(graph_name, scalers)
+
+
+def configure_replacement_queue(app: Flask, debounce=DEFAULT_DEBOUNCE):
+    """Replaces the queue of the re-placements requested by the scaling
+    loops, see `smo.utils.replacement`.
+
+    Each re-placement runs as a "placement" job, after the operations
+    already queued on the graph, and the queue waits for it to finish so
+    that the requests of the replaced scalers are coalesced into it.
+    """
+
+    global replacement_queue
+
+    def replace(name):
+        with app.app_context():
+            # Skips the graphs stopped or removed since the request
+            try:
+                check_graph_operation("placement", name)
+            except HTTPException as exception:
+                logger.info("Re-placement of %s skipped: %s", name, exception)
+                return
+            job = submit_job("placement", name, trigger_placement, name)
+        job.wait()
+
+    previous = replacement_queue
+    replacement_queue = ReplacementQueue(replace, debounce)
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def request_replacement(graph_name: str) -> bool:
+    """Requests the re-placement of a graph whose services do not fit
+    anymore, without blocking.
+
+    Returns:
+    - True if a re-placement was queued, False if the request was coalesced
+      into a pending one, or if no queue is configured.
+    """
+
+    if replacement_queue is None:
+        return False
+    return replacement_queue.request(graph_name)
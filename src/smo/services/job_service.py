@@ -0,0 +1,74 @@
+"""Background execution of the graph operations requested through the API."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from flask import current_app
+from werkzeug.exceptions import NotFound
+
+from smo.utils.jobs import JobManager
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from smo.utils.jobs import Job
+
+# Runs the graph operations of all the requests of the process
+job_manager = JobManager()
+
+
+def configure_job_manager(max_workers):
+    """Replaces the job manager. The jobs queued on the previous one still
+    run."""
+
+    global job_manager
+    previous = job_manager
+    job_manager = JobManager(max_workers)
+    previous.shutdown(wait=False)
+
+
+def submit_job(kind: str, graph_name: str, fn: Callable, *args) -> Job:
+    """Runs a graph operation in the background, within the application
+    context of the request.
+
+    Operations on the same graph run one at a time, in submission order.
+
+    Input:
+    - kind: The kind of operation, e.g. "deploy".
+    - graph_name: The name of the graph the operation works on.
+    - fn: The operation, accepting a `progress` keyword argument.
+    - args: The arguments of the operation.
+
+    Returns:
+    - The job of the operation, pending.
+    """
+
+    # Pushed by the worker thread running the job
+    app_context = current_app.app_context()
+
+    def run(*args, progress):
+        with app_context:
+            return fn(*args, progress=progress)
+
+    return job_manager.submit(kind, graph_name, run, *args)
+
+
+def fetch_job(job_id: str) -> Job:
+    """Returns a job by id.
+
+    Raises:
+    - NotFound: If the job is unknown, or finished long ago.
+    """
+
+    job = job_manager.get(job_id)
+    if job is None:
+        raise NotFound(f"Job with id {job_id} not found")
+    return job
+
+
+def fetch_jobs(graph_name: str | None = None) -> list[Job]:
+    """Returns the recent jobs, most recent first, optionally only those of a
+    graph."""
+
+    return job_manager.jobs(graph_name)
@@ -0,0 +1,33 @@
+"""Operational counters of the components shared by the graph operations
+and the scaling loops."""
+
+from __future__ import annotations
+
+from smo.services import graph_service
+from smo.utils.prometheus_helper import PrometheusHelper
+
+
+def fetch_stats() -> dict[str, dict]:
+    """Returns the counters of the shared components, since the process
+    started.
+
+    Returns:
+    - prometheus: The requests and connections of the Prometheus pool.
+    - helm: For each kind of Helm operation, the operations run, failed and
+      coalesced, and their durations.
+    - replacement: The re-placements requested and run, None if the
+      re-placement queue is not configured.
+    - scaling: The stats of the scaling loop of each graph on each
+      cluster, see `ClusterScaler.stats`.
+    """
+
+    # Looked up on each call, the components being replaced when configured
+    replacement_queue = graph_service.replacement_queue
+    return {
+        "prometheus": PrometheusHelper.connection_stats(),
+        "helm": graph_service.helm_executor.stats(),
+        "replacement": (
+            replacement_queue.stats() if replacement_queue is not None else None
+        ),
+        "scaling": graph_service.scaling_controller.status(),
+    }
@@ -0,0 +1,206 @@
+"""Actuation of the replica decisions.
+
+The scaling decision of a tick gives the replicas of every service of a
+cluster, most of them unchanged. `ReplicaActuator` compares them with the
+replicas observed in the deployment specs and only patches those that
+differ, concurrently. Per service cooldowns add hysteresis: a service is not
+scaled again until some time has passed since its last change, with separate
+delays for scaling up and down. Holding back a scale down can leave too
+little CPU for the scale ups decided with it, which are then trimmed to fit
+the capacity of the cluster. A stopped actuator makes no more patches, e.g.
+while the services are moved to other clusters.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# Slack of the CPU budget, for the rounding of the CPU limits
+FEASIBILITY_TOLERANCE = 1e-6
+
+
+@dataclass(frozen=True)
+class Cooldown:
+    """Seconds a service must stay unchanged before being scaled.
+
+    Attributes:
+        up: Before a scale up.
+        down: Before a scale down, usually longer, so that a transient dip
+            in the load does not remove replicas that are needed again at
+            the next tick.
+    """
+
+    up: float = 0.0
+    down: float = 0.0
+
+
+class ReplicaActuator:
+    """Applies replica decisions, patching only the deployments whose
+    replicas change.
+
+    Input:
+    - scale: Sets the replicas of a deployment, e.g.
+      `KubeHelper.scale_deployment`. Called in the default executor.
+    - observe: Returns the replicas of the deployment specs of some services,
+      e.g. from `KubeHelper.snapshot`. Called in the default executor.
+    - cooldowns: The cooldown of each service; services left out have none.
+    - clock: The time source of the cooldowns.
+    - cpu_limits: The CPU limit of each service, in cores.
+    - capacity: The CPU capacity of the cluster, in cores, that the
+      replicas of the services with a CPU limit must fit in. Not checked
+      if None.
+    """
+
+    def __init__(
+        self,
+        scale: Callable[[str, int], object],
+        observe: Callable[[list[str]], dict[str, int]],
+        cooldowns: dict[str, Cooldown] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        cpu_limits: dict[str, float] | None = None,
+        capacity: float | None = None,
+    ):
+        self.scale = scale
+        self.observe = observe
+        self.cooldowns = cooldowns or {}
+        self.clock = clock
+        self.cpu_limits = cpu_limits or {}
+        self.capacity = capacity
+        # Time of the last change of each service
+        self._changed_at: dict[str, float] = {}
+        self._stats = {
+            "patched": 0,
+            "unchanged": 0,
+            "cooling_down": 0,
+            "trimmed": 0,
+            "failed": 0,
+            "stopped": 0,
+        }
+        # Checked by the executor threads before each patch
+        self._stopped = threading.Event()
+
+    async def apply(self, desired: dict[str, int]) -> dict[str, int]:
+        """Scales the services whose observed replicas differ from the
+        desired ones, unless they are cooling down. If the scale downs held
+        back leave too little CPU for the scale ups, the scale ups are
+        trimmed, one replica at a time in turn, until the replicas fit the
+        capacity.
+
+        Returns:
+        - The replicas of each service after actuation: the desired ones
+          for the services patched, the observed ones for the others. A
+          service that could not be observed is patched. A failed patch is
+          logged and leaves the observed replicas, as does a patch skipped
+          because the actuator was stopped.
+        """
+
+        observed = await asyncio.to_thread(self.observe, list(desired))
+        now = self.clock()
+
+        replicas = {}
+        changes = {}
+        for name, target in desired.items():
+            current = observed.get(name)
+            if current == target:
+                self._stats["unchanged"] += 1
+                replicas[name] = current
+            elif current is not None and self._cooling_down(name, current, target, now):
+                self._stats["cooling_down"] += 1
+                replicas[name] = current
+            else:
+                changes[name] = target
+                replicas[name] = target
+        if self.capacity is not None:
+            self._trim_scale_ups(replicas, changes, observed)
+
+        results = await asyncio.gather(
+            *(
+                asyncio.to_thread(self._scale, name, target)
+                for name, target in changes.items()
+            ),
+            return_exceptions=True,
+        )
+        for (name, target), result in zip(changes.items(), results, strict=True):
+            if isinstance(result, Exception):
+                logger.error("Scaling %s failed: %s", name, result)
+                self._stats["failed"] += 1
+                replicas[name] = observed.get(name, target)
+            elif not result:
+                self._stats["stopped"] += 1
+                replicas[name] = observed.get(name, target)
+            else:
+                self._stats["patched"] += 1
+                self._changed_at[name] = now
+        return replicas
+
+    def _trim_scale_ups(
+        self, replicas: dict[str, int], changes: dict[str, int], observed: dict
+    ) -> None:
+        """Lowers the scale ups in `changes` and `replicas` until the
+        replicas fit the capacity, or the scale ups are all cancelled."""
+
+        used = sum(
+            count * self.cpu_limits.get(name, 0) for name, count in replicas.items()
+        )
+        scale_ups = [
+            name
+            for name, target in changes.items()
+            if observed.get(name) is not None
+            and target > observed[name]
+            and self.cpu_limits.get(name, 0) > 0
+        ]
+        trimmed = set()
+        while scale_ups and used > self.capacity + FEASIBILITY_TOLERANCE:
+            for name in list(scale_ups):
+                changes[name] -= 1
+                replicas[name] -= 1
+                used -= self.cpu_limits[name]
+                trimmed.add(name)
+                if changes[name] == observed[name]:
+                    # Nothing left to scale up
+                    del changes[name]
+                    scale_ups.remove(name)
+                if used <= self.capacity + FEASIBILITY_TOLERANCE:
+                    break
+        self._stats["trimmed"] += len(trimmed)
+
+    def stop(self) -> None:
+        """Skips the patches not started yet, and all the later ones. Can be
+        called from any thread."""
+
+        self._stopped.set()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of services patched, left unchanged, held back
+        by their cooldown, whose scale up was trimmed to fit the capacity,
+        whose patch failed, and whose patch was skipped because the actuator
+        was stopped."""
+
+        return dict(self._stats)
+
+    def _scale(self, name: str, replicas: int) -> bool:
+        """Patches a deployment unless the actuator is stopped, and returns
+        whether it did. Runs in the executor."""
+
+        if self._stopped.is_set():
+            return False
+        self.scale(name, replicas)
+        return True
+
+    def _cooling_down(self, name: str, current: int, target: int, now: float) -> bool:
+        changed_at = self._changed_at.get(name)
+        if changed_at is None:
+            return False
+        cooldown = self.cooldowns.get(name, Cooldown())
+        wait = cooldown.up if target > current else cooldown.down
+        return now - changed_at < wait
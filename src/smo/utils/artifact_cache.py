@@ -0,0 +1,314 @@
+"""On-disk cache of the HDAR artifacts pulled with hdarctl.
+
+Artifacts are stored by content: each pull is unpacked, hashed, and kept
+under the digest of its files, together with its parsed descriptor. A
+small reference file maps each artifact reference to the digest it last
+resolved to, so that references pulling the same content share one copy.
+
+Layout of the cache directory:
+
+    refs/<sha256 of the reference>.json   {"artifact_ref": ..., "digest": ...}
+    blobs/<digest>/chart/                 the unpacked artifact
+    blobs/<digest>/descriptor.json        its parsed YAML descriptor
+    tmp/                                  pulls in progress
+
+The cache is bounded in bytes: the least recently used blobs are evicted
+when a new one does not fit. References pinned by digest
+(`name@sha256:...`) are immutable; tags are served from the cache until
+they are refreshed, or after `max_age` seconds when it is set.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import yaml
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+DEFAULT_DIRECTORY = Path(tempfile.gettempdir()) / "smo-artifacts"
+DEFAULT_MAX_BYTES = 1 << 30
+
+DESCRIPTOR_FILE = "descriptor.json"
+CHART_DIR = "chart"
+
+
+@dataclass(frozen=True)
+class CachedArtifact:
+    """An artifact of the cache.
+
+    Attributes:
+        artifact_ref: The reference it was pulled with.
+        digest: The SHA-256 of its unpacked files.
+        descriptor: Its parsed YAML descriptor.
+        chart_path: The directory of its unpacked files.
+    """
+
+    artifact_ref: str
+    digest: str
+    descriptor: dict
+    chart_path: Path
+
+
+def pull_artifact(artifact_ref: str, destination: Path) -> None:
+    """Pulls and untars an artifact with the hdarctl cli.
+
+    Raises:
+    - subprocess.CalledProcessError: If the hdarctl command fails.
+    """
+
+    subprocess.run(
+        [
+            "hdarctl",
+            "pull",
+            artifact_ref,
+            "--untar",
+            "--destination",
+            str(destination),
+        ],
+        check=True,
+    )
+
+
+def find_descriptor(directory: Path) -> dict:
+    """Returns the parsed content of the first YAML file of a directory tree.
+
+    Raises:
+    - FileNotFoundError: If the directory has no YAML file.
+    - yaml.YAMLError: If the YAML file cannot be parsed.
+    """
+
+    for root, dirs, files in os.walk(directory):
+        # Walk in a stable order, whatever the file system
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith((".yaml", ".yml")):
+                with Path(root, file).open() as yaml_file:
+                    return yaml.safe_load(yaml_file)
+
+    msg = f"No YAML descriptor found in {directory}"
+    raise FileNotFoundError(msg)
+
+
+def directory_digest(directory: Path) -> str:
+    """Returns the SHA-256 of the relative paths and contents of the files
+    of a directory tree."""
+
+    digest = hashlib.sha256()
+    for file in sorted(p for p in directory.rglob("*") if p.is_file()):
+        digest.update(file.relative_to(directory).as_posix().encode())
+        digest.update(b"\0")
+        with file.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def is_pinned(artifact_ref: str) -> bool:
+    """Returns True if the reference designates its content by digest."""
+
+    return "@sha256:" in artifact_ref
+
+
+class ArtifactCache:
+    """Size-bounded, content-addressed cache of pulled artifacts.
+
+    The cache is safe to use from several threads. Concurrent misses of the
+    same reference may pull it more than once, but only one copy is kept.
+
+    Attributes:
+        directory: The root directory of the cache.
+        max_bytes: The size above which the least recently used blobs are
+            evicted.
+        max_age: Seconds after which a reference that is not pinned by digest
+            is pulled again, or None to keep it until it is refreshed.
+        stats: Hit, miss and eviction counters.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = DEFAULT_DIRECTORY,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        *,
+        max_age: float | None = None,
+        pull: Callable[[str, Path], None] = pull_artifact,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.pull = pull
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        self._lock = threading.Lock()
+        # Size of each blob, least recently used first
+        self._blobs: OrderedDict[str, int] = OrderedDict()
+
+        for name in ("refs", "blobs", "tmp"):
+            (self.directory / name).mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    @property
+    def size(self) -> int:
+        """The total size of the cached blobs, in bytes."""
+
+        with self._lock:
+            return sum(self._blobs.values())
+
+    def get(self, artifact_ref: str, *, refresh: bool = False) -> CachedArtifact:
+        """Returns the cached artifact of a reference, pulling it on a miss.
+
+        Input:
+        - artifact_ref: The reference of the artifact, as given to hdarctl.
+        - refresh: Pull the artifact even if it is cached.
+
+        Raises:
+        - subprocess.CalledProcessError: If the hdarctl command fails.
+        - FileNotFoundError: If the artifact has no YAML descriptor.
+        - yaml.YAMLError: If its descriptor cannot be parsed.
+        """
+
+        if not refresh:
+            cached = self._lookup(artifact_ref)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return self._fetch(artifact_ref)
+
+    def descriptor(self, artifact_ref: str, *, refresh: bool = False) -> dict:
+        """Returns the parsed descriptor of an artifact, see `get`."""
+
+        return self.get(artifact_ref, refresh=refresh).descriptor
+
+    def clear(self) -> None:
+        """Removes all the cached artifacts."""
+
+        with self._lock:
+            for digest in list(self._blobs):
+                self._remove_blob(digest)
+            for ref_file in (self.directory / "refs").glob("*.json"):
+                ref_file.unlink(missing_ok=True)
+
+    def _lookup(self, artifact_ref: str) -> CachedArtifact | None:
+        ref_file = self._ref_file(artifact_ref)
+        with self._lock:
+            try:
+                entry = json.loads(ref_file.read_text())
+            except (OSError, ValueError):
+                return None
+            digest = entry.get("digest")
+            if digest not in self._blobs or self._expired(artifact_ref, entry):
+                return None
+
+            blob = self._blob_dir(digest)
+            try:
+                descriptor = json.loads((blob / DESCRIPTOR_FILE).read_text())
+            except (OSError, ValueError):
+                # Damaged blob, pull it again
+                self._remove_blob(digest)
+                return None
+
+            self._blobs.move_to_end(digest)
+            os.utime(blob / DESCRIPTOR_FILE)
+            self.stats["hits"] += 1
+            return CachedArtifact(artifact_ref, digest, descriptor, blob / CHART_DIR)
+
+    def _fetch(self, artifact_ref: str) -> CachedArtifact:
+        staging = Path(tempfile.mkdtemp(dir=self.directory / "tmp"))
+        try:
+            chart = staging / CHART_DIR
+            chart.mkdir()
+            self.pull(artifact_ref, chart)
+            descriptor = find_descriptor(chart)
+            digest = directory_digest(chart)
+            (staging / DESCRIPTOR_FILE).write_text(json.dumps(descriptor))
+
+            with self._lock:
+                blob = self._blob_dir(digest)
+                if digest in self._blobs:
+                    self._blobs.move_to_end(digest)
+                    os.utime(blob / DESCRIPTOR_FILE)
+                else:
+                    staging.rename(blob)
+                    self._blobs[digest] = _tree_size(blob)
+                self._write_ref(artifact_ref, digest)
+                self._evict(keep=digest)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        return CachedArtifact(artifact_ref, digest, descriptor, blob / CHART_DIR)
+
+    def _load(self) -> None:
+        """Indexes the blobs already on disk, and drops unfinished pulls."""
+
+        for leftover in (self.directory / "tmp").iterdir():
+            shutil.rmtree(leftover, ignore_errors=True)
+
+        blobs = []
+        for blob in (self.directory / "blobs").iterdir():
+            try:
+                used = (blob / DESCRIPTOR_FILE).stat().st_mtime
+            except OSError:
+                shutil.rmtree(blob, ignore_errors=True)
+                continue
+            blobs.append((used, blob.name, _tree_size(blob)))
+
+        for _, digest, size in sorted(blobs):
+            self._blobs[digest] = size
+        self._evict()
+
+    def _evict(self, keep: str | None = None) -> None:
+        total = sum(self._blobs.values())
+        for digest in list(self._blobs):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            total -= self._blobs[digest]
+            self._remove_blob(digest)
+            self.stats["evictions"] += 1
+
+    def _remove_blob(self, digest: str) -> None:
+        # References to the blob become misses
+        self._blobs.pop(digest, None)
+        shutil.rmtree(self._blob_dir(digest), ignore_errors=True)
+
+    def _expired(self, artifact_ref: str, entry: dict) -> bool:
+        if self.max_age is None or is_pinned(artifact_ref):
+            return False
+        return time.time() - entry.get("pulled_at", 0) > self.max_age
+
+    def _write_ref(self, artifact_ref: str, digest: str) -> None:
+        ref_file = self._ref_file(artifact_ref)
+        staging = ref_file.with_suffix(".tmp")
+        staging.write_text(
+            json.dumps(
+                {"artifact_ref": artifact_ref, "digest": digest, "pulled_at": time.time()}
+            )
+        )
+        staging.replace(ref_file)
+
+    def _ref_file(self, artifact_ref: str) -> Path:
+        name = hashlib.sha256(artifact_ref.encode()).hexdigest()
+        return self.directory / "refs" / f"{name}.json"
+
+    def _blob_dir(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest
+
+
+def _tree_size(directory: Path) -> int:
+    return sum(p.stat().st_size for p in directory.rglob("*") if p.is_file())
@@ -36,6 +36,11 @@ BETA = {
     "image-detection": -0.01,
 }
 DECISION_INTERVAL = 30
+# Seconds for new replicas to become ready, the horizon of the rate forecasts
+STARTUP_DELAY = 20
+# Seconds a service stays unchanged before being scaled up or down again
+SCALE_UP_COOLDOWN = 0
+SCALE_DOWN_COOLDOWN = 60
 PROMETHEUS_HOST = "http://host.docker.internal:30347"
 GRAPH_GRAFANA = "http://10.0.2.114:30150/d/edgr2834xi2v4f/image-detection-graph?from=now-5m&to=now&orgId=1&var-service=All"
 SERVICES_GRAFANA = {
@@ -0,0 +1,296 @@
+"""Asyncio controller running the scaling decisions of all graphs."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .scaling import ClusterScaler
+
+logger = logging.getLogger(__name__)
+
+# Threads used for the blocking Kubernetes, Prometheus and solver calls
+DEFAULT_MAX_WORKERS = 32
+# Decision ticks running at the same time, over all graphs
+DEFAULT_MAX_CONCURRENT_TICKS = 16
+# Relative spread of the decision intervals, so that the ticks of graphs
+# scheduled together do not stay synchronized
+DEFAULT_JITTER = 0.1
+# Delay before retrying a failed initialization, doubled at each failure up
+# to the maximum
+DEFAULT_RETRY_DELAY = 1.0
+DEFAULT_MAX_RETRY_DELAY = 60.0
+
+
+@dataclass(eq=False)
+class _Registration:
+    """A scaler registered on the controller, and its pending work."""
+
+    scaler: ClusterScaler
+    # Identifies the heap entries of this registration, see `_push`
+    generation: int
+    # The initialization or tick running, if any
+    task: asyncio.Task | None = None
+    # Whether `task` is a tick
+    ticking: bool = False
+
+
+class ScalingController:
+    """Runs the scaling decisions of all graphs on a single event loop.
+
+    Scalers are registered by (graph, cluster). Their decision ticks are
+    kept in a heap of deadlines, consumed by a single scheduler task which
+    runs the due ticks, at most `max_concurrent_ticks` at a time. The ticks
+    of a scaler never overlap: its next tick is scheduled when the previous
+    one ends, `decision_interval` seconds later, give or take `jitter`.
+
+    Registering, stopping or rescheduling a scaler costs O(log n) for n
+    registered scalers: stopped scalers leave their heap entries behind,
+    discarded when they come due. A stopped scaler is told to stop, its
+    initialization is cancelled, and its running tick, whose blocking calls
+    cannot be cancelled, is waited for.
+
+    The event loop lives in a daemon thread started on first use. Blocking
+    calls made by the scalers run on a bounded thread pool shared by all
+    graphs. The public methods are thread-safe and can be called from Flask
+    request handlers.
+
+    Input:
+    - max_workers: Size of the thread pool used for blocking calls.
+    - max_concurrent_ticks: Maximum number of ticks running at the same time.
+    - jitter: Relative random spread of the decision intervals, e.g. 0.1 for
+      +/-10%.
+    - retry_delay: Seconds before retrying the failed initialization of a
+      scaler, doubled at each new failure.
+    - max_retry_delay: The maximum delay between two initialization attempts.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_concurrent_ticks: int = DEFAULT_MAX_CONCURRENT_TICKS,
+        jitter: float = DEFAULT_JITTER,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        max_retry_delay: float = DEFAULT_MAX_RETRY_DELAY,
+    ):
+        self.max_workers = max_workers
+        self.max_concurrent_ticks = max_concurrent_ticks
+        self.jitter = jitter
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+        # Only accessed from the event loop
+        self._registrations: dict[tuple[str, str], _Registration] = {}
+        # Registered clusters of each graph
+        self._graphs: dict[str, set[str]] = {}
+        # (deadline, sequence, key, generation) of the next tick of each
+        # scaler, plus the stale entries of stopped or rescheduled ones
+        self._heap: list[tuple[float, int, tuple[str, str], int]] = []
+        self._sequence = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._scheduler: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Starts the event loop thread, if not already running."""
+
+        with self._lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(
+                ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="smo-scaling"
+                )
+            )
+            self._thread = threading.Thread(
+                target=loop.run_forever, name="smo-scaling-controller", daemon=True
+            )
+            self._thread.start()
+            self._loop = loop
+            asyncio.run_coroutine_threadsafe(self._start_scheduler(), loop).result()
+
+    def schedule(self, graph_name: str, scalers: Iterable[ClusterScaler]) -> None:
+        """Replaces the scalers of a graph."""
+
+        self._call(self._schedule(graph_name, list(scalers)))
+
+    def stop(self, graph_name: str) -> None:
+        """Stops the scalers of a graph, waiting for their running ticks to
+        end."""
+
+        self._call(self._stop(graph_name))
+
+    def status(self) -> dict[str, dict[str, dict]]:
+        """Returns the stats of the registered scalers, by graph and
+        cluster, see `ClusterScaler.stats`."""
+
+        if self._loop is None:
+            # Not started, no scaler to report
+            return {}
+        return self._call(self._status())
+
+    def running(self, graph_name: str) -> int:
+        """Returns the number of scalers currently registered for a graph."""
+
+        return self._call(self._running(graph_name))
+
+    def shutdown(self) -> None:
+        """Cancels all the scalers and stops the event loop."""
+
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._stop_all(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+    def _call(self, coroutine):
+        """Runs a coroutine on the event loop and waits for its result."""
+
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _start_scheduler(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrent_ticks)
+        self._scheduler = asyncio.create_task(
+            self._run_scheduler(), name="scaling-scheduler"
+        )
+
+    async def _schedule(self, graph_name: str, scalers: list[ClusterScaler]) -> None:
+        await self._stop(graph_name)
+        for scaler in scalers:
+            key = (graph_name, scaler.cluster)
+            registration = _Registration(scaler, next(self._sequence))
+            self._registrations[key] = registration
+            self._graphs.setdefault(graph_name, set()).add(scaler.cluster)
+            registration.task = asyncio.create_task(
+                self._initialize(key, registration),
+                name=f"scaling-init-{graph_name}-{scaler.cluster}",
+            )
+
+    async def _stop(self, graph_name: str) -> None:
+        tasks = []
+        for cluster in self._graphs.pop(graph_name, ()):
+            registration = self._registrations.pop((graph_name, cluster))
+            registration.scaler.stop()
+            if registration.task is not None:
+                # Cancelling a tick would leave its Kubernetes patches running
+                # in the executor: it ends early instead, once stopped
+                if not registration.ticking:
+                    registration.task.cancel()
+                tasks.append(registration.task)
+        # Wait for the ticks to end, so that the scalers do not scale
+        # anything anymore when the caller gets control back
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _stop_all(self) -> None:
+        for graph_name in list(self._graphs):
+            await self._stop(graph_name)
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+
+    async def _status(self) -> dict[str, dict[str, dict]]:
+        status = {}
+        for (graph_name, cluster), registration in self._registrations.items():
+            status.setdefault(graph_name, {})[cluster] = registration.scaler.stats()
+        return status
+
+    async def _running(self, graph_name: str) -> int:
+        return len(self._graphs.get(graph_name, ()))
+
+    def _push(self, key: tuple[str, str], registration: _Registration, delay: float):
+        """Schedules the next tick of a scaler, `delay` seconds from now."""
+
+        deadline = asyncio.get_running_loop().time() + delay
+        entry = (deadline, next(self._sequence), key, registration.generation)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            # Earlier than what the scheduler is sleeping for
+            self._wakeup.set()
+
+    def _interval(self, scaler: ClusterScaler) -> float:
+        spread = random.uniform(-self.jitter, self.jitter)
+        return max(0.0, scaler.decision_interval * (1 + spread))
+
+    async def _run_scheduler(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key, generation = heapq.heappop(self._heap)
+                registration = self._registrations.get(key)
+                if registration is None or registration.generation != generation:
+                    # Stopped or rescheduled since
+                    continue
+                registration.task = asyncio.create_task(
+                    self._tick(key, registration), name=f"scaling-{key[0]}-{key[1]}"
+                )
+                registration.ticking = True
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    async def _initialize(self, key: tuple[str, str], registration: _Registration):
+        scaler = registration.scaler
+        # Not bounded by the tick slots: initialization mostly waits for the
+        # deployments to be ready. Retried until it succeeds or the scaler
+        # is stopped, so that a registered scaler always ends up ticking.
+        delay = self.retry_delay
+        while True:
+            try:
+                await scaler.initialize()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Scaling of graph %s on cluster %s failed to initialize, "
+                    "retrying in %.0fs",
+                    *key,
+                    delay,
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+        registration.task = None
+        # Spread the first ticks of the scalers registered together
+        delay = random.uniform(0, self.jitter) * scaler.decision_interval
+        self._push(key, registration, delay)
+
+    async def _tick(self, key: tuple[str, str], registration: _Registration):
+        scaler = registration.scaler
+        try:
+            async with self._slots:
+                await scaler.tick()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # E.g. Prometheus being unreachable: retried at the next tick
+            logger.exception("Scaling tick of graph %s on cluster %s failed", *key)
+        registration.task = None
+        registration.ticking = False
+        self._push(key, registration, self._interval(scaler))
@@ -0,0 +1,214 @@
+"""Request rate forecasters.
+
+A forecaster observes the request rate of each service at every decision
+tick and predicts its value at a future time, so that the replicas decided
+now are sized for the load at the time the new pods are ready, rather than
+for the load measured over the last interval.
+
+`LastValueForecaster` predicts the last observed rate, which is the
+reactive behaviour; `HoltForecaster` follows the level and trend of the
+rates (EWMA when its trend smoothing is 0); `LinearForecaster` fits a
+least-squares line to the recent rates.
+
+Each forecaster tracks the error of its predictions: when the rate is
+observed at or after the time a prediction was made for, the absolute
+difference is recorded, and reported by `stats`.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+
+from smo.utils.metric_buffer import MetricRing
+
+NONE = "none"
+EWMA = "ewma"
+HOLT = "holt"
+LINEAR = "linear"
+FORECASTERS = (NONE, EWMA, HOLT, LINEAR)
+
+# Smoothing of the level and of the trend of the Holt forecaster
+DEFAULT_ALPHA = 0.5
+DEFAULT_BETA = 0.3
+# Samples fitted by the linear forecaster
+DEFAULT_LINEAR_SAMPLES = 10
+# Predictions awaiting their observation, per service
+MAX_PENDING = 16
+
+
+@dataclass
+class ForecastError:
+    """Errors of the predictions of a service, once observed."""
+
+    count: int = 0
+    total_absolute: float = 0.0
+    last: float = 0.0
+
+    @property
+    def mean_absolute(self) -> float:
+        return self.total_absolute / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_absolute_error": self.mean_absolute,
+            "last_error": self.last,
+        }
+
+
+class RateForecaster(ABC):
+    """Base class of the forecasters.
+
+    Subclasses implement `_update` and `_predict`; `observe` and `forecast`
+    add the tracking of the forecast error.
+    """
+
+    def __init__(self):
+        # (target time, predicted value) of each service, oldest first
+        self._pending: dict[str, deque[tuple[float, float]]] = {}
+        self._errors: dict[str, ForecastError] = {}
+
+    def observe(self, name: str, timestamp: float, value: float) -> None:
+        """Records the rate of a service at a time, in increasing time
+        order."""
+
+        pending = self._pending.get(name)
+        while pending and pending[0][0] <= timestamp:
+            _, predicted = pending.popleft()
+            error = self._errors.setdefault(name, ForecastError())
+            error.count += 1
+            error.last = predicted - value
+            error.total_absolute += abs(error.last)
+        self._update(name, timestamp, value)
+
+    def forecast(self, name: str, timestamp: float) -> float:
+        """Returns the predicted rate of a service at a time, never
+        negative, and records it to measure its error."""
+
+        value = max(0.0, self._predict(name, timestamp))
+        pending = self._pending.setdefault(name, deque(maxlen=MAX_PENDING))
+        pending.append((timestamp, value))
+        return value
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Returns, for each service, the number of predictions observed,
+        their mean absolute error and the signed error of the last one."""
+
+        return {name: error.to_dict() for name, error in self._errors.items()}
+
+    @abstractmethod
+    def _update(self, name: str, timestamp: float, value: float) -> None:
+        """Updates the model of a service with an observed rate."""
+
+    @abstractmethod
+    def _predict(self, name: str, timestamp: float) -> float:
+        """Returns the modelled rate of a service at a time."""
+
+
+class LastValueForecaster(RateForecaster):
+    """Predicts the last observed rate, 0 before any observation."""
+
+    def __init__(self):
+        super().__init__()
+        self._last: dict[str, float] = {}
+
+    def _update(self, name: str, timestamp: float, value: float) -> None:
+        self._last[name] = value
+
+    def _predict(self, name: str, timestamp: float) -> float:
+        return self._last.get(name, 0.0)
+
+
+class HoltForecaster(RateForecaster):
+    """Double exponential smoothing (Holt's linear trend), for samples at
+    irregular intervals: the trend is a rate of change per second.
+
+    Example:
+        >>> forecaster = HoltForecaster(alpha=1, beta=1)
+        >>> for t in (0, 10, 20):
+        ...     forecaster.observe("svc", t, 2.0 * t)
+        >>> forecaster.forecast("svc", 25)
+        50.0
+
+    Input:
+    - alpha: Smoothing of the level, in (0, 1].
+    - beta: Smoothing of the trend, in [0, 1]; 0 keeps no trend (EWMA).
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, beta: float = DEFAULT_BETA):
+        super().__init__()
+        self.alpha = alpha
+        self.beta = beta
+        # (time, level, trend) of each service
+        self._state: dict[str, tuple[float, float, float]] = {}
+
+    def _update(self, name: str, timestamp: float, value: float) -> None:
+        state = self._state.get(name)
+        if state is None:
+            self._state[name] = (timestamp, value, 0.0)
+            return
+
+        last_time, level, trend = state
+        elapsed = timestamp - last_time
+        if elapsed <= 0:
+            return
+        new_level = self.alpha * value + (1 - self.alpha) * (level + trend * elapsed)
+        new_trend = (
+            self.beta * (new_level - level) / elapsed + (1 - self.beta) * trend
+        )
+        self._state[name] = (timestamp, new_level, new_trend)
+
+    def _predict(self, name: str, timestamp: float) -> float:
+        state = self._state.get(name)
+        if state is None:
+            return 0.0
+        last_time, level, trend = state
+        return level + trend * max(0.0, timestamp - last_time)
+
+
+class LinearForecaster(RateForecaster):
+    """Extrapolates the least-squares line of the last samples.
+
+    Input:
+    - samples: The number of recent samples fitted.
+    """
+
+    def __init__(self, samples: int = DEFAULT_LINEAR_SAMPLES):
+        super().__init__()
+        self.samples = samples
+        self._rings: dict[str, MetricRing] = {}
+
+    def _update(self, name: str, timestamp: float, value: float) -> None:
+        ring = self._rings.get(name)
+        if ring is None:
+            ring = self._rings[name] = MetricRing(self.samples)
+        ring.append(timestamp, value)
+
+    def _predict(self, name: str, timestamp: float) -> float:
+        ring = self._rings.get(name)
+        if not ring:
+            return 0.0
+        samples = ring.window()
+        mean_time = sum(t for t, _ in samples) / len(samples)
+        return ring.mean() + ring.slope() * (timestamp - mean_time)
+
+
+def create_forecaster(kind: str = NONE) -> RateForecaster:
+    """Returns a forecaster by name, one of `FORECASTERS`.
+
+    Raises:
+    - ValueError: If the name is unknown.
+    """
+
+    if kind == NONE:
+        return LastValueForecaster()
+    if kind == EWMA:
+        return HoltForecaster(beta=0)
+    if kind == HOLT:
+        return HoltForecaster()
+    if kind == LINEAR:
+        return LinearForecaster()
+    msg = f"Unknown forecaster {kind!r}, expected one of {FORECASTERS}"
+    raise ValueError(msg)
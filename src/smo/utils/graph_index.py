@@ -0,0 +1,161 @@
+"""Compiled adjacency of the services of a graph descriptor."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+class GraphIndex:
+    """Index of the services of a graph descriptor and of their connections.
+
+    The index is built once per descriptor, in time linear in the number of
+    services and connection points. Services are identified by their
+    position in the descriptor, which is also the order of the rows of the
+    placement matrices.
+
+    A service "connects to" the services listed in its connection points;
+    connection points that are not services of the graph are ignored. It is
+    co-located with the services listed in the optional `coLocation` of its
+    intent.
+
+    Attributes:
+        ids (list[str]): The service ids, in descriptor order.
+        index (dict[str, int]): The position of each service id.
+        edges (list[list[int]]): For each service, the services it connects to.
+        reverse (list[list[int]]): For each service, the services connecting
+            to it, in descriptor order.
+        colocated (list[set[int]]): For each service, the services it is
+            co-located with, either way.
+
+    Example:
+        >>> index = GraphIndex([
+        ...     {"id": "a", "deployment": {"intent": {"connectionPoints": ["b"]}}},
+        ...     {"id": "b", "deployment": {"intent": {"connectionPoints": []}}},
+        ... ])
+        >>> index.dependency_order()
+        ['b', 'a']
+        >>> index.import_clusters({"a": "cluster1", "b": "cluster2"})
+        {'a': [], 'b': ['cluster1']}
+    """
+
+    def __init__(self, services: list[dict]):
+        self.ids = [service["id"] for service in services]
+        self.index = {name: i for i, name in enumerate(self.ids)}
+        self.edges: list[list[int]] = []
+        self.reverse: list[list[int]] = [[] for _ in self.ids]
+        self.colocated: list[set[int]] = [set() for _ in self.ids]
+
+        for i, service in enumerate(services):
+            intent = service["deployment"]["intent"]
+            for target in intent.get("coLocation", ()):
+                j = self.index.get(target)
+                if j is not None and j != i:
+                    self.colocated[i].add(j)
+                    self.colocated[j].add(i)
+            connection_points = intent["connectionPoints"]
+            targets = []
+            for target in dict.fromkeys(connection_points):
+                j = self.index.get(target)
+                if j is not None:
+                    targets.append(j)
+                    self.reverse[j].append(i)
+            self.edges.append(targets)
+
+    @classmethod
+    def from_descriptor(cls, graph_descriptor: dict) -> GraphIndex:
+        """Returns the index of the services of a graph descriptor."""
+
+        return cls(graph_descriptor["services"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def dependencies(self) -> dict[str, list[str]]:
+        """Returns, for each service, the ids of the services it connects to."""
+
+        return {
+            name: [self.ids[j] for j in targets]
+            for name, targets in zip(self.ids, self.edges, strict=True)
+        }
+
+    def placement_dependencies(self) -> list[int]:
+        """Returns the dependency vector of the placement solvers: one flag
+        per service after the first, 1 if it is co-located with the
+        previous service.
+
+        The solvers only co-locate consecutive services, so co-locations
+        of services further apart in the descriptor are ignored.
+        """
+
+        return [
+            1 if i - 1 in self.colocated[i] else 0 for i in range(1, len(self.ids))
+        ]
+
+    def dependency_order(self) -> list[str]:
+        """Returns the service ids, each after the services it connects to.
+
+        Services that are part of a cycle, or depend on one, come last, in
+        descriptor order.
+        """
+
+        # Self-connections are not dependencies
+        remaining = [
+            sum(1 for j in targets if j != i) for i, targets in enumerate(self.edges)
+        ]
+        ready = deque(i for i, count in enumerate(remaining) if count == 0)
+        order = []
+        while ready:
+            j = ready.popleft()
+            order.append(j)
+            for i in self.reverse[j]:
+                if i == j:
+                    continue
+                remaining[i] -= 1
+                if remaining[i] == 0:
+                    ready.append(i)
+
+        ordered = set(order)
+        order.extend(i for i in range(len(self.ids)) if i not in ordered)
+        return [self.ids[i] for i in order]
+
+    def import_clusters(self, service_placement: Mapping[str, str]) -> dict[str, list]:
+        """Returns, for each service, the clusters of the services connecting
+        to it, where it needs to be imported.
+
+        Input:
+        - service_placement: The cluster of each service id.
+
+        Raises:
+        - KeyError: If a service connecting to another one is not placed.
+        """
+
+        return {
+            name: [service_placement[self.ids[i]] for i in sources]
+            for name, sources in zip(self.ids, self.reverse, strict=True)
+        }
+
+    def cross_cluster_edges(
+        self, service_placement: Mapping[str, str]
+    ) -> list[tuple[str, str]]:
+        """Returns the connections between services placed on different
+        clusters, as (source id, target id) pairs."""
+
+        return [
+            (self.ids[i], self.ids[j])
+            for i, targets in enumerate(self.edges)
+            for j in targets
+            if service_placement[self.ids[i]] != service_placement[self.ids[j]]
+        ]
+
+    def column(self, values: Mapping[str, object]) -> list:
+        """Returns the values of a per-service mapping, in descriptor order.
+
+        Raises:
+        - KeyError: If a service has no value.
+        """
+
+        return [values[name] for name in self.ids]
@@ -0,0 +1,195 @@
+"""Process-wide queue of the Helm commands."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Concurrent Helm commands of the process, unless configured
+DEFAULT_MAX_WORKERS = 4
+
+
+@dataclass(frozen=True)
+class HelmOperation:
+    """A Helm command on a release, as a callable.
+
+    Attributes:
+        release: The name of the Helm release.
+        operation: The kind of command, e.g. "install", "upgrade" or
+            "uninstall". Consecutive pending operations of the same kind on
+            a release are coalesced.
+        fn: The function running the command.
+        args: The positional arguments of `fn`.
+        kwargs: The keyword arguments of `fn`.
+    """
+
+    release: str
+    operation: str
+    fn: Callable[..., object]
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+
+    def __call__(self):
+        return self.fn(*self.args, **self.kwargs)
+
+
+@dataclass
+class _Pending:
+    """A queued operation, and the futures waiting for it."""
+
+    task: HelmOperation
+    futures: list[Future] = field(default_factory=list)
+
+
+class HelmExecutor:
+    """Runs Helm operations on a bounded pool of threads.
+
+    Operations on the same release run one at a time, in submission order,
+    while operations on different releases run concurrently. When an
+    operation is submitted while another one of the same kind is still
+    queued for the release, the new one replaces it: only the latest runs,
+    and the futures of both get its result.
+
+    `submit` has the signature of `Executor.submit` for `HelmOperation`
+    tasks, so the executor can be given to `run_in_dependency_order`.
+
+    Input:
+    - max_workers: The maximum number of concurrent Helm commands.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="smo-helm"
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Queued operations of each release, the head one running if the
+        # release is in `_running`
+        self._queues: dict[str, deque[_Pending]] = {}
+        self._running: set[str] = set()
+        self._closed = False
+        self._stats: dict[str, dict[str, float]] = {}
+
+    def submit(self, task: HelmOperation) -> Future:
+        """Queues a Helm operation.
+
+        Returns:
+        - A future of the result of the operation, or of the later operation
+          that replaced it.
+
+        Raises:
+        - RuntimeError: If the executor was shut down.
+        """
+
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                msg = "Cannot submit Helm operations after shutdown"
+                raise RuntimeError(msg)
+
+            queue = self._queues.setdefault(task.release, deque())
+            # The head of the queue may be running, and cannot be replaced
+            first_pending = 1 if task.release in self._running else 0
+            if len(queue) > first_pending and queue[-1].task.operation == task.operation:
+                queue[-1].task = task
+                queue[-1].futures.append(future)
+                self._stat(task.operation)["coalesced"] += 1
+            else:
+                queue.append(_Pending(task, [future]))
+            self._dispatch(task.release)
+        return future
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Returns, for each kind of operation, the number of operations run,
+        failed and coalesced into a later one, and their total and maximum
+        durations in seconds."""
+
+        with self._lock:
+            return {operation: dict(stats) for operation, stats in self._stats.items()}
+
+    def pending(self) -> int:
+        """Returns the number of operations queued or running."""
+
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Stops accepting operations. The queued ones still run.
+
+        Input:
+        - wait: Wait for the queued operations to finish.
+        """
+
+        with self._lock:
+            self._closed = True
+            if wait:
+                self._idle.wait_for(lambda: not self._queues)
+            if not self._queues:
+                self._pool.shutdown(wait=False)
+
+    def _dispatch(self, release: str) -> None:
+        """Starts the next operation of a release, if it is not busy. Called
+        with the lock held."""
+
+        queue = self._queues.get(release)
+        if release in self._running or not queue:
+            return
+        self._running.add(release)
+        pending = queue[0]
+        self._pool.submit(self._run, release, pending)
+
+    def _run(self, release: str, pending: _Pending) -> None:
+        task = pending.task
+        start = time.perf_counter()
+        try:
+            result = task()
+        except Exception as exception:
+            error, result = exception, None
+        else:
+            error = None
+        duration = time.perf_counter() - start
+
+        with self._lock:
+            stats = self._stat(task.operation)
+            stats["count"] += 1
+            stats["failed"] += error is not None
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+
+            queue = self._queues[release]
+            queue.popleft()
+            self._running.discard(release)
+            if queue:
+                self._dispatch(release)
+            else:
+                del self._queues[release]
+                if not self._queues:
+                    self._idle.notify_all()
+                    if self._closed:
+                        self._pool.shutdown(wait=False)
+
+        for future in pending.futures:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _stat(self, operation: str) -> dict[str, float]:
+        return self._stats.setdefault(
+            operation,
+            {
+                "count": 0,
+                "failed": 0,
+                "coalesced": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+            },
+        )
@@ -0,0 +1,234 @@
+"""Background jobs, with the progress of each of their services."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# Jobs running concurrently, unless configured
+DEFAULT_MAX_WORKERS = 4
+# Finished jobs kept for their status to be queried
+DEFAULT_MAX_FINISHED = 1000
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """A unit of work run in the background.
+
+    Attributes:
+        id: The unique id of the job.
+        kind: What the job does, e.g. "deploy" or "placement".
+        target: The name of the graph the job works on, or the reference of
+            the artifact a deployment pulls.
+        status: "pending", "running", "succeeded" or "failed".
+        services: The progress of each service, as reported by the job.
+        result: The return value of the job, once succeeded.
+        error: The type and message of the exception of a failed job, and
+            the error of each failed service if the exception has an
+            `errors` mapping of them (e.g. `HelmInstallError`).
+        created_at, started_at, finished_at: Timestamps of the job.
+    """
+
+    kind: str
+    target: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = PENDING
+    services: dict[str, str] = field(default_factory=dict)
+    result: object = None
+    error: dict | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    # Set once the job is done
+    _finished: threading.Event = field(
+        default_factory=threading.Event, repr=False, compare=False
+    )
+
+    @property
+    def done(self) -> bool:
+        """True if the job succeeded or failed."""
+
+        return self.status in {SUCCEEDED, FAILED}
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until the job is done, or the timeout expires. Returns
+        True if the job is done."""
+
+        return self._finished.wait(timeout)
+
+    def finish(self, status: str) -> None:
+        """Records the end of the job, called by the job manager."""
+
+        self.status = status
+        self.finished_at = time.time()
+        self._finished.set()
+
+    def update_service(self, name: str, status: str) -> None:
+        """Records the progress of a service, called by the job as it runs."""
+
+        self.services[name] = status
+
+    def to_dict(self) -> dict:
+        """Returns a JSON-serializable representation of the job."""
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "target": self.target,
+            "status": self.status,
+            "services": dict(self.services),
+            "result": self.result,
+            "error": self.error,
+            "created_at": _isoformat(self.created_at),
+            "started_at": _isoformat(self.started_at),
+            "finished_at": _isoformat(self.finished_at),
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded pool of threads, and keeps track of them.
+
+    Jobs on the same target run one at a time, in submission order, so that
+    two operations on a graph never overlap. The most recent finished jobs
+    are kept, up to `max_finished`.
+
+    Input:
+    - max_workers: The maximum number of jobs running concurrently.
+    - max_finished: The number of finished jobs kept.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+    ):
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="smo-jobs"
+        )
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        # Waiting jobs of each target, the head one running if the target
+        # is in `_busy`
+        self._queues: dict[str, deque[tuple[Job, Callable[[], object]]]] = {}
+        self._busy: set[str] = set()
+
+    def submit(
+        self, kind: str, target: str, fn: Callable[..., object], /, *args, **kwargs
+    ) -> Job:
+        """Queues a job calling `fn(*args, progress=..., **kwargs)`.
+
+        `progress` is the `update_service` method of the job, for `fn` to
+        report the progress of each service.
+
+        Returns:
+        - The job, pending.
+        """
+
+        job = Job(kind, target)
+
+        def call():
+            return fn(*args, progress=job.update_service, **kwargs)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._queues.setdefault(target, deque()).append((job, call))
+            self._dispatch(target)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Returns a job by id, or None if unknown or forgotten."""
+
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, target: str | None = None) -> list[Job]:
+        """Returns the known jobs, most recent first, optionally only those
+        of a target."""
+
+        with self._lock:
+            return [
+                job
+                for job in reversed(self._jobs.values())
+                if target is None or job.target == target
+            ]
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Stops the worker threads, once the queued jobs are done if `wait`."""
+
+        self._pool.shutdown(wait=wait)
+
+    def _dispatch(self, target: str) -> None:
+        """Starts the next job of a target, if it is not busy. Called with
+        the lock held."""
+
+        queue = self._queues.get(target)
+        if target in self._busy or not queue:
+            return
+        self._busy.add(target)
+        job, call = queue[0]
+        self._pool.submit(self._run, job, call)
+
+    def _run(self, job: Job, call: Callable[[], object]) -> None:
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            job.result = call()
+        except Exception as exception:
+            logger.exception("Job %s (%s of %s) failed", job.id, job.kind, job.target)
+            job.error = _error_details(exception)
+            job.finish(FAILED)
+        else:
+            job.finish(SUCCEEDED)
+
+        with self._lock:
+            queue = self._queues[job.target]
+            queue.popleft()
+            self._busy.discard(job.target)
+            if queue:
+                self._dispatch(job.target)
+            else:
+                del self._queues[job.target]
+            self._forget_finished()
+
+    def _forget_finished(self) -> None:
+        """Drops the oldest finished jobs beyond `max_finished`. Called with
+        the lock held."""
+
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+def _error_details(exception: Exception) -> dict:
+    error = {"type": type(exception).__name__, "message": str(exception)}
+    services = getattr(exception, "errors", None)
+    if isinstance(services, dict):
+        error["services"] = {
+            name: str(failure) for name, failure in services.items()
+        }
+    return error
+
+
+def _isoformat(timestamp: float | None) -> str | None:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
@@ -2,7 +2,59 @@
 
 from __future__ import annotations
 
-from kubernetes import client, config
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from kubernetes import client, config, watch
+from kubernetes.client.rest import ApiException
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+# Delay between two polls of the API server when no informer is used
+POLL_INTERVAL = 5
+# Server-side timeout of a watch request, after which the watch is resumed
+WATCH_TIMEOUT = 60
+# Delay before listing again after a watch failure
+WATCH_RETRY_DELAY = 5
+
+HTTP_NOT_FOUND = 404
+HTTP_GONE = 410
+
+# Informers shared by all the helpers of the process, keyed by
+# (config_file_path, namespace)
+_informers: dict[tuple[str, str], DeploymentInformer] = {}
+_informers_lock = threading.Lock()
+# Informer-mode helpers shared by the graph operations, same keys
+_helpers: dict[tuple[str, str], KubeHelper] = {}
+
+
+@dataclass(frozen=True)
+class DeploymentSnapshot:
+    """Replica counts and CPU limit of a deployment, read at the same time.
+
+    Attributes:
+        available_replicas: Number of available replicas, None if there is none.
+        desired_replicas: Number of replicas requested in the deployment spec.
+        cpu_limit: CPU limit of the first container, in cores.
+    """
+
+    available_replicas: int | None
+    desired_replicas: int
+    cpu_limit: float
+
+    @classmethod
+    def from_deployment(cls, deployment: client.V1Deployment) -> DeploymentSnapshot:
+        return cls(
+            available_replicas=deployment.status.available_replicas,
+            desired_replicas=deployment.spec.replicas,
+            cpu_limit=parse_cpu_limit(deployment),
+        )
 
 
 class KubeHelper:
@@ -12,16 +64,23 @@ class KubeHelper:
     specifically focusing on deployments within a specified namespace. It allows
     retrieving and modifying deployment details such as replicas and CPU limits.
 
+    In informer mode, deployment reads are served from a local cache kept
+    current by a single list+watch on the namespace, shared by all the
+    helpers using the same kubeconfig and namespace. Deployments missing from
+    the cache are read from the API server.
+
     Input:
     - config_file_path: Path to the Kubernetes configuration file.
     - namespace: The namespace to operate within, default is "default".
+    - informer: If True, serve reads from a watch-backed cache.
     """
 
     namespace: str
     config_file_path: str
     client: client.AppsV1Api
+    informer: DeploymentInformer | None
 
-    def __init__(self, config_file_path, namespace="default"):
+    def __init__(self, config_file_path, namespace="default", informer=False):
         self.namespace = namespace
         self.config_file_path = config_file_path
 
@@ -29,10 +88,18 @@ class KubeHelper:
 
         self.client = client.AppsV1Api()
 
+        self.informer = None
+        if informer:
+            self.informer = get_informer(self.client, config_file_path, namespace)
+
     def get_desired_replicas(self, name):
         """Return the desired number of replicas for the specified
         deployment."""
 
+        deployment = self._cached_deployment(name)
+        if deployment is not None:
+            return deployment.spec.replicas
+
         response = self.client.read_namespaced_deployment_scale(name, self.namespace)
         return response.spec.replicas
 
@@ -40,20 +107,60 @@ class KubeHelper:
         """Return the current number of replicas for the specified
         deployment."""
 
-        response = self.client.read_namespaced_deployment(name, self.namespace)
+        response = self._read_deployment(name)
         return response.status.available_replicas
 
     def get_cpu_limit(self, name):
         """Returns the current CPU limit for the specific deployment."""
 
-        response = self.client.read_namespaced_deployment(name, self.namespace)
-        cpu_lim = response.spec.template.spec.containers[0].resources.limits["cpu"]
-        # If CPU limit is specified in millicores, convert it to cores
-        if "m" in cpu_lim:
-            return float(cpu_lim.replace("m", "")) * 1e-3
-        else:
-            # Convert CPU limit directly to float if in cores
-            return float(cpu_lim)
+        response = self._read_deployment(name)
+        return parse_cpu_limit(response)
+
+    def snapshot(self, names: Iterable[str]) -> dict[str, DeploymentSnapshot]:
+        """Returns the replica counts and CPU limits of several deployments.
+
+        Each deployment is read once. Cached deployments cost no request in
+        informer mode, the others are read by name, so that the cost does
+        not grow with the size of the namespace.
+
+        Returns:
+            A dictionary mapping each deployment name to its snapshot.
+            Deployments that do not exist are left out.
+        """
+
+        deployments = {}
+        for name in dict.fromkeys(names):
+            deployment = self._cached_deployment(name)
+            if deployment is None:
+                deployment = self._read_existing_deployment(name)
+            if deployment is not None:
+                deployments[name] = deployment
+
+        return {
+            name: DeploymentSnapshot.from_deployment(deployment)
+            for name, deployment in deployments.items()
+        }
+
+    def wait_for_replicas(self, names: Iterable[str], timeout=None) -> bool:
+        """Waits until all the given deployments have available replicas.
+
+        In informer mode, this blocks on the cache readiness event instead
+        of polling the API server.
+
+        Returns:
+            True if the replicas are available, False if the timeout expired.
+        """
+
+        names = list(names)
+        if self.informer is not None:
+            return self.informer.wait_for_replicas(names, timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while None in [self.get_replicas(name) for name in names]:
+            if deadline is not None and time.monotonic() + POLL_INTERVAL > deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
 
     def scale_deployment(self, name, replicas):
         """Scales the given application to the desired number of replicas."""
@@ -67,3 +174,197 @@ class KubeHelper:
         except Exception as exception:
             print(str(exception))
             raise
+
+    def _read_deployment(self, name):
+        """Returns a deployment, from the cache if possible."""
+
+        deployment = self._cached_deployment(name)
+        if deployment is not None:
+            return deployment
+        return self.client.read_namespaced_deployment(name, self.namespace)
+
+    def _read_existing_deployment(self, name):
+        """Reads a deployment from the API server, None if it does not
+        exist."""
+
+        try:
+            return self.client.read_namespaced_deployment(name, self.namespace)
+        except ApiException as exception:
+            if exception.status != HTTP_NOT_FOUND:
+                raise
+            return None
+
+    def _cached_deployment(self, name):
+        if self.informer is None:
+            return None
+        return self.informer.get(name)
+
+
+class DeploymentInformer:
+    """Keeps a local cache of the deployments of a namespace.
+
+    A background thread lists the deployments once, then watches them from
+    the listed resource version, and lists again when the watch expires.
+    Threads waiting on the cache are woken up on every change.
+
+    Input:
+    - api: The client used to list and watch deployments.
+    - namespace: The namespace to watch.
+    """
+
+    def __init__(self, api: client.AppsV1Api, namespace: str):
+        self.api = api
+        self.namespace = namespace
+        # Set once the initial list has been loaded
+        self.synced = threading.Event()
+
+        self._deployments: dict[str, client.V1Deployment] = {}
+        self._changed = threading.Condition()
+        self._stopped = threading.Event()
+        self._watch: watch.Watch | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Starts the list+watch thread."""
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"informer-{self.namespace}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the list+watch thread after the current watch request."""
+
+        self._stopped.set()
+        if self._watch is not None:
+            self._watch.stop()
+
+    def get(self, name: str) -> client.V1Deployment | None:
+        """Returns the cached deployment, or None if unknown or not synced
+        yet."""
+
+        if not self.synced.is_set():
+            return None
+        with self._changed:
+            return self._deployments.get(name)
+
+    def wait_for_replicas(self, names: Iterable[str], timeout=None) -> bool:
+        """Waits until all the given deployments have available replicas."""
+
+        names = list(names)
+
+        def available():
+            if not self.synced.is_set():
+                return False
+            for name in names:
+                deployment = self._deployments.get(name)
+                if deployment is None or not deployment.status.available_replicas:
+                    return False
+            return True
+
+        with self._changed:
+            return self._changed.wait_for(available, timeout)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._list_and_watch()
+
+    def _list_and_watch(self) -> None:
+        """Lists the deployments and watches them until the watch fails."""
+
+        try:
+            self._watch_from(self.resync())
+        except ApiException as exception:
+            # An expired watch is recovered from by listing again at once
+            if exception.status != HTTP_GONE:
+                logger.warning("Deployment watch failed: %s", exception)
+                self._stopped.wait(WATCH_RETRY_DELAY)
+        except Exception:
+            logger.exception("Deployment watch failed")
+            self._stopped.wait(WATCH_RETRY_DELAY)
+
+    def resync(self) -> str:
+        """Loads all the deployments and returns the list resource
+        version."""
+
+        response = self.api.list_namespaced_deployment(self.namespace)
+        with self._changed:
+            self._deployments = {
+                deployment.metadata.name: deployment for deployment in response.items
+            }
+            self.synced.set()
+            self._changed.notify_all()
+        return response.metadata.resource_version
+
+    def _watch_from(self, resource_version: str) -> None:
+        """Applies watch events until the watch expires (410 Gone), which
+        triggers a new list."""
+
+        while not self._stopped.is_set():
+            self._watch = watch.Watch()
+            for event in self._watch.stream(
+                self.api.list_namespaced_deployment,
+                self.namespace,
+                resource_version=resource_version,
+                timeout_seconds=WATCH_TIMEOUT,
+            ):
+                self.apply(event["type"], event["object"])
+            # The watch timed out server-side: resume where it stopped
+            resource_version = self._watch.resource_version or resource_version
+
+    def apply(self, event_type: str, deployment: client.V1Deployment) -> None:
+        """Updates the cache from a watch event."""
+
+        if event_type == "BOOKMARK":
+            return
+
+        name = deployment.metadata.name
+        with self._changed:
+            if event_type == "DELETED":
+                self._deployments.pop(name, None)
+            else:
+                self._deployments[name] = deployment
+            self._changed.notify_all()
+
+
+def parse_cpu_limit(deployment: client.V1Deployment) -> float:
+    """Returns the CPU limit of the first container of a deployment, in
+    cores."""
+
+    cpu_lim = deployment.spec.template.spec.containers[0].resources.limits["cpu"]
+    # If CPU limit is specified in millicores, convert it to cores
+    if "m" in cpu_lim:
+        return float(cpu_lim.replace("m", "")) * 1e-3
+    else:
+        # Convert CPU limit directly to float if in cores
+        return float(cpu_lim)
+
+
+def get_informer(
+    api: client.AppsV1Api, config_file_path: str, namespace: str
+) -> DeploymentInformer:
+    """Returns the informer of a namespace, starting it on first use."""
+
+    key = (config_file_path, namespace)
+    with _informers_lock:
+        informer = _informers.get(key)
+        if informer is None:
+            informer = DeploymentInformer(api, namespace)
+            informer.start()
+            _informers[key] = informer
+        return informer
+
+
+def get_kube_helper(config_file_path: str, namespace: str = "default") -> KubeHelper:
+    """Returns the informer-mode helper of a namespace, loading the kubeconfig
+    on first use only."""
+
+    key = (config_file_path, namespace)
+    with _informers_lock:
+        helper = _helpers.get(key)
+    if helper is None:
+        # Outside the lock, which the helper takes to get its informer
+        helper = KubeHelper(config_file_path, namespace, informer=True)
+        with _informers_lock:
+            helper = _helpers.setdefault(key, helper)
+    return helper
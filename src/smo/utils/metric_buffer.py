@@ -0,0 +1,203 @@
+"""In-process history of the metrics of the scaled services.
+
+Each service has a fixed-size ring of (timestamp, value) samples, stored in
+two preallocated arrays of doubles. The scaling controller appends the
+values it queries at each tick, and backfills the rings with a single
+range query on startup, so that windowed aggregates (mean, percentiles,
+trend) are available without querying Prometheus again.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+# Samples kept per service: an hour at the default decision interval
+DEFAULT_CAPACITY = 120
+# Samples needed to fit a trend
+MIN_TREND_SAMPLES = 2
+
+
+class MetricRing:
+    """Fixed-size ring buffer of the samples of a metric.
+
+    Samples are kept in timestamp order: a sample older than the latest one
+    (e.g. from an overlapping backfill) is dropped. Once full, each new
+    sample overwrites the oldest one.
+
+    Input:
+    - capacity: The number of samples kept.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            msg = "Capacity must be at least 1"
+            raise ValueError(msg)
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        # Index of the next sample, and number of samples kept
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[tuple[float, float]]:
+        """Iterates over the samples, oldest first."""
+
+        start = self._head - self._size
+        for i in range(start, self._head):
+            yield self._timestamps[i % self.capacity], self._values[i % self.capacity]
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """Adds a sample, and returns False if it was dropped because it is
+        not newer than the latest one, or not a number."""
+
+        if math.isnan(value) or (self._size and timestamp <= self.latest()[0]):
+            return False
+        self._timestamps[self._head] = timestamp
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def extend(self, samples: Iterable[tuple[float, float]]) -> None:
+        """Adds samples, oldest first."""
+
+        for timestamp, value in samples:
+            self.append(timestamp, value)
+
+    def latest(self) -> tuple[float, float]:
+        """Returns the newest sample.
+
+        Raises:
+        - IndexError: If the ring is empty.
+        """
+
+        if not self._size:
+            msg = "No sample"
+            raise IndexError(msg)
+        i = (self._head - 1) % self.capacity
+        return self._timestamps[i], self._values[i]
+
+    def window(
+        self, seconds: float | None = None, now: float | None = None
+    ) -> list[tuple[float, float]]:
+        """Returns the samples of the last `seconds` seconds before `now`
+        (by default the current time), or all of them, oldest first."""
+
+        if seconds is None:
+            return list(self)
+        if now is None:
+            now = time.time()
+        start = now - seconds
+        return [sample for sample in self if sample[0] >= start]
+
+    def mean(self, seconds: float | None = None, now: float | None = None) -> float:
+        """Returns the mean of the values of a window, NaN if it is empty.
+
+        Example:
+            >>> ring = MetricRing(3)
+            >>> ring.extend([(1, 1.0), (2, 2.0), (3, 3.0), (4, 4.0)])
+            >>> ring.mean()
+            3.0
+        """
+
+        values = [value for _, value in self.window(seconds, now)]
+        return sum(values) / len(values) if values else math.nan
+
+    def percentile(
+        self, q: float, seconds: float | None = None, now: float | None = None
+    ) -> float:
+        """Returns the q-th percentile (0-100) of the values of a window,
+        interpolated linearly, NaN if it is empty.
+
+        Example:
+            >>> ring = MetricRing(10)
+            >>> ring.extend((t, float(t)) for t in range(1, 11))
+            >>> ring.percentile(95)
+            9.55
+        """
+
+        values = sorted(value for _, value in self.window(seconds, now))
+        if not values:
+            return math.nan
+        rank = (len(values) - 1) * q / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+    def slope(self, seconds: float | None = None, now: float | None = None) -> float:
+        """Returns the least-squares trend of the values of a window, per
+        second, 0 if it has less than two samples.
+
+        Example:
+            >>> ring = MetricRing(10)
+            >>> ring.extend([(0, 1.0), (10, 2.0), (20, 3.0)])
+            >>> ring.slope()
+            0.1
+        """
+
+        samples = self.window(seconds, now)
+        if len(samples) < MIN_TREND_SAMPLES:
+            return 0.0
+        n = len(samples)
+        mean_t = sum(t for t, _ in samples) / n
+        mean_v = sum(v for _, v in samples) / n
+        covariance = sum((t - mean_t) * (v - mean_v) for t, v in samples)
+        variance = sum((t - mean_t) ** 2 for t, _ in samples)
+        return covariance / variance if variance else 0.0
+
+
+class MetricBuffer:
+    """The metric rings of several services.
+
+    Input:
+    - capacity: The number of samples kept per service.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._rings: dict[str, MetricRing] = {}
+
+    def ring(self, name: str) -> MetricRing:
+        """Returns the ring of a service, created empty on first use."""
+
+        ring = self._rings.get(name)
+        if ring is None:
+            ring = self._rings[name] = MetricRing(self.capacity)
+        return ring
+
+    def append(self, values: dict[str, float], timestamp: float | None = None) -> None:
+        """Adds a sample for each service, by default at the current time."""
+
+        if timestamp is None:
+            timestamp = time.time()
+        for name, value in values.items():
+            self.ring(name).append(timestamp, value)
+
+    def backfill(self, series: dict[str, Iterable[tuple[float, float]]]) -> None:
+        """Adds the samples of each service, oldest first, e.g. from a range
+        query."""
+
+        for name, samples in series.items():
+            self.ring(name).extend(samples)
+
+    def aggregates(
+        self, name: str, seconds: float | None = None, now: float | None = None
+    ) -> dict[str, float]:
+        """Returns the mean, 95th percentile and slope (per second) of the
+        values of a service over a window."""
+
+        ring = self.ring(name)
+        return {
+            "mean": ring.mean(seconds, now),
+            "p95": ring.percentile(95, seconds, now),
+            "slope": ring.slope(seconds, now),
+        }
@@ -0,0 +1,113 @@
+"""Dependency-ordered execution of tasks on an executor."""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+    from concurrent.futures import Executor, Future
+
+
+class DependencyError(Exception):
+    """Raised for a task that was not run because a dependency failed."""
+
+    def __init__(self, name: str, failed: Iterable[str]):
+        self.name = name
+        self.failed = sorted(failed)
+        super().__init__(
+            f"{name} not run: dependencies {', '.join(self.failed)} failed"
+        )
+
+
+def run_in_dependency_order(
+    tasks: Mapping[str, Callable[[], object]],
+    dependencies: Mapping[str, Iterable[str]],
+    executor: Executor,
+    on_done: Callable[[str, BaseException | None], None] | None = None,
+) -> dict[str, BaseException]:
+    """Runs tasks on an executor, each as soon as its dependencies are done.
+
+    Independent tasks run concurrently, within the limits of the executor.
+    A task whose dependencies failed is not run. Dependencies on names that
+    are not tasks are ignored. If the remaining tasks only depend on each
+    other (a cycle), they are started together.
+
+    Input:
+    - tasks: Callables keyed by task name.
+    - dependencies: For each task name, the names of the tasks it waits for.
+    - executor: The executor running the tasks.
+    - on_done: Optional callback, called from the calling thread with the
+      name and the error (or None) of each task when it finishes.
+
+    Returns:
+    - A dictionary mapping the name of each failed task to its exception.
+
+    Example:
+        >>> from concurrent.futures import ThreadPoolExecutor
+        >>> order = []
+        >>> tasks = {name: (lambda name=name: order.append(name)) for name in "abc"}
+        >>> with ThreadPoolExecutor(max_workers=2) as executor:
+        ...     run_in_dependency_order(tasks, {"a": ["b"], "b": ["c"]}, executor)
+        {}
+        >>> order
+        ['c', 'b', 'a']
+    """
+
+    pending = {
+        name: {
+            dep for dep in dependencies.get(name, ()) if dep in tasks and dep != name
+        }
+        for name in tasks
+    }
+    running: dict[Future, str] = {}
+    succeeded: set[str] = set()
+    errors: dict[str, BaseException] = {}
+
+    def finish(name: str, error: BaseException | None) -> None:
+        if error is None:
+            succeeded.add(name)
+        else:
+            errors[name] = error
+        if on_done is not None:
+            on_done(name, error)
+
+    while pending or running:
+        _skip_failed(pending, errors, finish)
+
+        ready = [name for name, deps in pending.items() if deps <= succeeded]
+        if not ready and not running:
+            # Only cycles are left: break them
+            ready = list(pending)
+        for name in ready:
+            del pending[name]
+            running[executor.submit(tasks[name])] = name
+
+        if not running:
+            continue
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            finish(running.pop(future), future.exception())
+
+    return errors
+
+
+def _skip_failed(
+    pending: dict[str, set[str]],
+    errors: dict[str, BaseException],
+    finish: Callable[[str, BaseException | None], None],
+) -> None:
+    """Removes the pending tasks depending on a failed (or skipped) task,
+    transitively."""
+
+    skipped = True
+    while skipped:
+        skipped = False
+        for name, deps in list(pending.items()):
+            failed = deps & errors.keys()
+            if failed:
+                del pending[name]
+                finish(name, DependencyError(name, failed))
+                skipped = True
@@ -2,7 +2,17 @@
 
 from __future__ import annotations
 
-from gurobipy import GRB, Model, quicksum
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from smo.utils.solver_backend import AUTO, GUROBI, resolve_backend
+
+# Slack on the capacity constraints, as in Gurobi's default feasibility
+# tolerance
+FEASIBILITY_TOLERANCE = 1e-6
 
 
 def swap_placement(service_dict: dict) -> dict:
@@ -68,6 +78,8 @@ def decide_placement(
     replicas,
     current_placement,
     initial_placement=False,
+    backend=AUTO,
+    dependencies=None,
 ):
     """Determines the optimal placement of services across multiple clusters.
 
@@ -81,6 +93,10 @@ def decide_placement(
     current_placement: List of current placement
     initial_placement: If True, doesn't attempt to change the input placement
                        and can leave it the same. Else forces a change.
+    backend: The solver backend, see `smo.utils.solver_backend`
+    dependencies: List of one flag per service after the first. If the flag
+                  of service i is 1, service i is placed on the same cluster
+                  as service i - 1. Defaults to no dependencies.
 
     Returns:
     ---
@@ -90,90 +106,597 @@ def decide_placement(
     Raises:
     ---
     GurobiError: If there is an issue with the Gurobi optimization model
-    ValueError: If input lists have inconsistent lengths
+    ValueError: If input lists have inconsistent lengths, if the backend is
+                not available, or if there is no feasible placement
     """
 
-    num_clusters = len(cluster_capacities)
-    num_nodes = len(cpu_limits)
-
-    model = Model("MultiClusterPlacement")
-
-    # Define decision variables
-    E = [f"E{i}" for i in range(1, num_clusters + 1)]  # List of EC clusters
-    S = [f"s{i}" for i in range(num_nodes)]  # List of application graph nodes
-
-    # Replicas and dependencies
-    d = [0, 0]
-
-    # Assume you have the previous placement as described before
-    y = {
-        f"s{app_node_index}": {
-            cluster: current_placement[app_node_index][cluster_index]
-            for cluster_index, cluster in enumerate(E)
-        }
-        for app_node_index in range(num_nodes)
-    }
-
-    # Define decision variables
-    x = {}
-
-    for s in S:
-        for e in E:
-            x[s, e] = model.addVar(vtype=GRB.BINARY, name=f"x_{s}_{e}")
+    return create_placement_solver(backend).solve(
+        cluster_capacities,
+        cluster_acceleration,
+        cpu_limits,
+        acceleration,
+        replicas,
+        current_placement,
+        initial_placement=initial_placement,
+        dependencies=dependencies,
+    )
 
-    # Update model
-    model.update()
 
-    # Define objective function
-    w_dep = 1  # Deployment cost weight
-    w_re = 1  # Re-optimization cost weight
+def create_placement_solver(backend=AUTO):
+    """Returns a placement solver of the given backend, see
+    `smo.utils.solver_backend`."""
+
+    if resolve_backend(backend) == GUROBI:
+        return GurobiPlacementSolver()
+    return BranchAndBoundPlacementSolver()
+
+
+class PlacementSolver(ABC):
+    """Base class of the placement solvers."""
+
+    @abstractmethod
+    def solve(
+        self,
+        cluster_capacities,
+        cluster_acceleration,
+        cpu_limits,
+        acceleration,
+        replicas,
+        current_placement,
+        initial_placement=False,
+        dependencies=None,
+    ):
+        """Determines the optimal placement of services across multiple
+        clusters; see `decide_placement`."""
+
+
+class GurobiPlacementSolver(PlacementSolver):
+    """Placement model kept alive between placement decisions.
+
+    The model is built on the first solve, and again only when the number of
+    services or clusters changes. Its size, and the time to build it, are
+    linear in the size of the placement matrix. Subsequent solves update the
+    objective, the bounds and the right-hand sides in place with batched
+    attribute updates, replace the constraints whose coefficients changed,
+    and are warm-started from the current placement. Solves are serialized.
+
+    The acceleration constraints only involve one variable each, so they are
+    applied as upper bounds: a service cannot be placed on a cluster without
+    its acceleration. The dependency constraints, placing a service on the
+    same cluster as the previous one, are linearized as
+    x[i, e] == x[i - 1, e] for each cluster e; they are part of the structure
+    of the model, which is built again when they change.
+
+    Attributes:
+        timings (dict): Seconds spent in the last solve building or updating
+            the model ("build") and optimizing it ("solve").
+    """
 
-    # Set objective to minimize the combined deployment and re-optimization costs
-    model.setObjective(
-        quicksum(w_dep * x[s, e] for s in S for e in E)
-        + quicksum(w_re * y[s][e] * (y[s][e] - x[s, e]) for s in S for e in E),
-        GRB.MINIMIZE,
-    )
+    def __init__(self):
+        self.model = None
+        self.timings = {"build": 0.0, "solve": 0.0}
+        self._shape = None
+        self._lock = threading.Lock()
+
+    def solve(
+        self,
+        cluster_capacities,
+        cluster_acceleration,
+        cpu_limits,
+        acceleration,
+        replicas,
+        current_placement,
+        initial_placement=False,
+        dependencies=None,
+    ):
+        num_clusters = len(cluster_capacities)
+        num_nodes = len(cpu_limits)
+        dependencies = _check_inputs(
+            num_nodes, num_clusters, replicas, current_placement, dependencies
+        )
 
-    # Define constraints
-    for s in S:
-        model.addConstr(quicksum(x[s, e] for e in E) == 1, name=f"constraint1_{s}")
+        with self._lock:
+            start = time.perf_counter()
+            if self._shape != (num_nodes, num_clusters, tuple(dependencies)):
+                self._build(num_nodes, num_clusters, dependencies)
+            self._update(
+                cluster_capacities,
+                cluster_acceleration,
+                cpu_limits,
+                acceleration,
+                replicas,
+                current_placement,
+                initial_placement,
+            )
+            self.model.update()
+            built = time.perf_counter()
+
+            self.model.optimize()
+            self.timings = {
+                "build": built - start,
+                "solve": time.perf_counter() - built,
+            }
+            if self.model.SolCount == 0:
+                msg = "No feasible placement"
+                raise ValueError(msg)
+
+            values = self.model.getAttr("X", self._vars)
+            return [
+                [round(value) for value in values[row : row + num_clusters]]
+                for row in range(0, num_nodes * num_clusters, num_clusters)
+            ]
+
+    def _build(self, num_nodes, num_clusters, dependencies):
+        """Creates the variables and constraints, with placeholder data."""
+
+        from gurobipy import GRB, Model, quicksum
+
+        model = Model("MultiClusterPlacement")
+        services = range(num_nodes)
+        clusters = range(num_clusters)
+
+        # x[s, e] is 1 if service s is placed on cluster e. The objective
+        # coefficients and the bounds are set by `_update`.
+        x = model.addVars(num_nodes, num_clusters, vtype=GRB.BINARY, name="x")
+        model.ModelSense = GRB.MINIMIZE
+
+        # Each service is placed on exactly one cluster
+        model.addConstrs(
+            (quicksum(x[s, e] for e in clusters) == 1 for s in services),
+            name="constraint1",
+        )
 
-    change_placement_value = 0 if initial_placement else -1
-    # Define the additional constraints for placement changes
-    model.addConstr(
-        quicksum(y[s][e] * (x[s, e] - y[s][e]) for s in S[1:] for e in E)
-        <= change_placement_value,
-        name="constraint_additional_less_than",
-    )
+        # Dependencies between consecutive services
+        model.addConstrs(
+            (
+                x[s, e] == x[s - 1, e]
+                for s in range(1, num_nodes)
+                if dependencies[s - 1]
+                for e in clusters
+            ),
+            name="dependency",
+        )
 
-    for e in E:
-        model.addConstr(
-            quicksum(
-                x[s, e] * cpu_limits[S.index(s)] * replicas[S.index(s)] for s in S[1:]
-            )
-            <= cluster_capacities[E.index(e)],
-            name=f"constraint2_{e}",
+        # Fixed placement of s0
+        x[0, 0].LB = 1
+
+        self.model = model
+        self._shape = (num_nodes, num_clusters, tuple(dependencies))
+        self._x = x
+        self._vars = [x[s, e] for s in services for e in clusters]
+        # The constraints whose coefficients depend on the data, added by
+        # `_update`, and their coefficients
+        self._change_constraint = None
+        self._change_coefficients = None
+        self._capacity_constraints = []
+        self._loads = None
+
+    def _update(
+        self,
+        cluster_capacities,
+        cluster_acceleration,
+        cpu_limits,
+        acceleration,
+        replicas,
+        current_placement,
+        initial_placement,
+    ):
+        """Loads the data of a placement decision into the model."""
+
+        from gurobipy import GRB, LinExpr
+
+        model = self.model
+        x = self._x
+        num_nodes, num_clusters, _ = self._shape
+        y = current_placement
+
+        # The combined deployment and re-optimization costs,
+        # sum(w_dep * x + w_re * y * (y - x)), expanded as linear coefficients
+        # and a constant
+        w_dep = 1  # Deployment cost weight
+        w_re = 1  # Re-optimization cost weight
+        flat_y = [y[s][e] for s in range(num_nodes) for e in range(num_clusters)]
+        model.ObjCon = sum(w_re * value * value for value in flat_y)
+        model.setAttr("Obj", self._vars, [w_dep - w_re * value for value in flat_y])
+        # Warm start from the current placement
+        model.setAttr("Start", self._vars, flat_y)
+
+        # Acceleration, as upper bounds (s0 is not constrained)
+        model.setAttr(
+            "UB",
+            self._vars,
+            [
+                1 if s == 0 or acceleration[s] <= cluster_acceleration[e] else 0
+                for s in range(num_nodes)
+                for e in range(num_clusters)
+            ],
         )
 
-    for e in E:
-        for s in S[1:]:
-            model.addConstr(
-                x[s, e] * acceleration[S.index(s)] <= cluster_acceleration[E.index(e)],
-                name=f"constraint4_{s}_{e}",
+        # sum(y * (x - y)) <= change_placement_value, for all but s0
+        change_placement_value = 0 if initial_placement else -1
+        coefficients = flat_y[num_clusters:]
+        rhs = change_placement_value + sum(value * value for value in coefficients)
+        if coefficients != self._change_coefficients:
+            if self._change_constraint is not None:
+                model.remove(self._change_constraint)
+            self._change_constraint = model.addLConstr(
+                LinExpr(coefficients, self._vars[num_clusters:]),
+                GRB.LESS_EQUAL,
+                rhs,
+                name="constraint_additional_less_than",
             )
+            self._change_coefficients = coefficients
+        else:
+            self._change_constraint.RHS = rhs
+
+        # Cluster capacities, with the CPU used by each service but s0
+        loads = [cpu_limits[s] * replicas[s] for s in range(1, num_nodes)]
+        if loads != self._loads:
+            model.remove(self._capacity_constraints)
+            self._capacity_constraints = [
+                model.addLConstr(
+                    LinExpr(loads, [x[s, e] for s in range(1, num_nodes)]),
+                    GRB.LESS_EQUAL,
+                    cluster_capacities[e],
+                    name=f"constraint2_{e}",
+                )
+                for e in range(num_clusters)
+            ]
+            self._loads = loads
+        else:
+            model.setAttr("RHS", self._capacity_constraints, list(cluster_capacities))
+
+
+class BranchAndBoundPlacementSolver(PlacementSolver):
+    """Exact placement decision, without a solver.
+
+    Each service is placed on exactly one cluster, so placements are
+    enumerated service by service, in a depth-first search trying the
+    cheapest clusters first. A partial placement is pruned when it exceeds a
+    cluster capacity, when too many services stay in place, or when its cost
+    plus the smallest cost of the remaining services cannot improve on the
+    best placement found so far. The constraints and the objective are those
+    of `GurobiPlacementSolver`.
+
+    Attributes:
+        timings (dict): Seconds spent in the last solve preparing the search
+            ("build") and searching ("solve").
+    """
 
-    for i in range(1, num_nodes):
-        model.addConstr(quicksum(x[S[i], e] * x[S[i - 1], e] for e in E) >= d[i - 1])
+    def __init__(self):
+        self.timings = {"build": 0.0, "solve": 0.0}
+
+    def solve(
+        self,
+        cluster_capacities,
+        cluster_acceleration,
+        cpu_limits,
+        acceleration,
+        replicas,
+        current_placement,
+        initial_placement=False,
+        dependencies=None,
+    ):
+        num_clusters = len(cluster_capacities)
+        num_nodes = len(cpu_limits)
+        dependencies = _check_inputs(
+            num_nodes, num_clusters, replicas, current_placement, dependencies
+        )
+        start = time.perf_counter()
+        y = current_placement
+
+        # Deployment and re-optimization costs of each service on each
+        # cluster (the constant part of the objective is left out)
+        w_dep = 1  # Deployment cost weight
+        w_re = 1  # Re-optimization cost weight
+        costs = [
+            [w_dep - w_re * y[s][e] for e in range(num_clusters)]
+            for s in range(num_nodes)
+        ]
+
+        # s0 is fixed on the first cluster; the other services need a
+        # cluster with their acceleration
+        candidates = [[0]]
+        for s in range(1, num_nodes):
+            allowed = [
+                e
+                for e in range(num_clusters)
+                if acceleration[s] <= cluster_acceleration[e]
+            ]
+            candidates.append(sorted(allowed, key=lambda e, s=s: (costs[s][e], e)))
+
+        # Services other than s0 that may stay where they are
+        change_placement_value = 0 if initial_placement else -1
+        max_stays = change_placement_value + sum(
+            y[s][e] * y[s][e] for s in range(1, num_nodes) for e in range(num_clusters)
+        )
 
-    # Add constraint for fixed placement of s0
-    model.addConstr(x["s0", "E1"] == 1, name="constraint_s0_placement")
+        search = _PlacementSearch(
+            costs,
+            candidates,
+            y,
+            [cpu_limits[s] * replicas[s] for s in range(num_nodes)],
+            list(cluster_capacities),
+            max_stays,
+            [0, *dependencies],
+        )
+        built = time.perf_counter()
+        choices = search.run()
+        self.timings = {"build": built - start, "solve": time.perf_counter() - built}
+        if choices is None:
+            msg = "No feasible placement"
+            raise ValueError(msg)
+
+        placement = [[0] * num_clusters for _ in range(num_nodes)]
+        for s, e in enumerate(choices):
+            placement[s][e] = 1
+        return placement
+
+
+class _PlacementSearch:
+    """Depth-first branch-and-bound of `BranchAndBoundPlacementSolver`.
+
+    `colocated[s]` is true if service s must be on the cluster of s - 1.
+
+    Besides the smallest cost of each remaining service, the bound accounts
+    for overloaded clusters: the remaining services whose cheapest cluster
+    is an overloaded one cannot all be placed there, and moving enough of
+    them elsewhere costs at least the difference with their next cheapest
+    cluster. Co-located services preferring the same cluster move together.
+    The cover is fractional, or solved exactly when the costs are integers.
+    """
 
-    model.optimize()
+    def __init__(
+        self, costs, candidates, current, loads, capacities, max_stays, colocated
+    ):
+        self.costs = costs
+        self.candidates = candidates
+        self.current = current
+        self.loads = loads
+        self.remaining = capacities
+        self.max_stays = max_stays
+        self.colocated = colocated
+
+        # Smallest cost of each service, and of the services from index s
+        # onwards
+        self.cheapest = [
+            min((costs[s][e] for e in candidates[s]), default=0)
+            for s in range(len(costs))
+        ]
+        self.bounds = [0] * (len(costs) + 1)
+        for s in reversed(range(len(costs))):
+            self.bounds[s] = self.bounds[s + 1] + self.cheapest[s]
+
+        # The services with a single cheapest cluster, the cost of moving
+        # them out of it, and the load of the remaining ones on each cluster
+        self.preferred = [None] * len(costs)
+        self.movable = [[] for _ in capacities]
+        self.preferred_load = [0] * len(capacities)
+        for s in range(1, len(costs)):
+            ordered = sorted(costs[s][e] for e in candidates[s])
+            cheapest = [e for e in candidates[s] if costs[s][e] == ordered[0]]
+            if len(cheapest) != 1 or loads[s] <= 0:
+                continue
+            e = cheapest[0]
+            gap = ordered[1] - ordered[0] if len(ordered) > 1 else math.inf
+            self.preferred[s] = e
+            self.movable[e].append((s, loads[s], gap))
+            self.preferred_load[e] += loads[s]
+        self.integral = all(float(cost).is_integer() for row in costs for cost in row)
+
+        # What the cover may move out of each cluster: the co-located
+        # services preferring the same cluster move together, the others
+        # one by one
+        gaps = {s: gap for movable in self.movable for s, _, gap in movable}
+        self.covers = [[] for _ in capacities]
+        head = 1
+        while head < len(costs):
+            end = head + 1
+            while end < len(costs) and colocated[end]:
+                end += 1
+            group = [s for s in range(head, end) if self.preferred[s] is not None]
+            clusters = {self.preferred[s] for s in group}
+            if len(group) == end - head and len(clusters) == 1:
+                self.covers[clusters.pop()].append(
+                    (head, sum(loads[head:end]), sum(gaps[s] for s in group))
+                )
+            else:
+                for s in group:
+                    self.covers[self.preferred[s]].append((s, loads[s], gaps[s]))
+            head = end
+        for movable in self.movable:
+            movable.sort(key=lambda item: item[2] / item[1])
+        self.cover_heads = [[head for head, _, _ in items] for items in self.covers]
+        # Cover costs of the items of a cluster from a position onwards
+        self._cover_tables = {}
+
+        self.best = None
+        self.best_cost = None
+        self.choices = []
+
+    def run(self):
+        """Returns the cluster index of each service in an optimal
+        placement, or None if there is none."""
+
+        if not all(self.candidates):
+            return None
+        if not self.integral:
+            self._visit(0, 0, 0)
+            return self.best
+
+        # With integer costs, look for placements costing at most the root
+        # bound, then one more, and so on: each pass prunes as if the best
+        # placement had been found already
+        worst = sum(
+            max(costs[e] for e in candidates)
+            for costs, candidates in zip(self.costs, self.candidates, strict=True)
+        )
+        limit = self._bound(0, 0)
+        while self.best is None and limit <= worst:
+            self.best_cost = limit + 1
+            self._visit(0, 0, 0)
+            limit += 1
+        return self.best
+
+    def _bound(self, s, cost):
+        """Returns a lower bound of the cost of the placements completing
+        the current partial placement of the services before s."""
+
+        bound = cost + self.bounds[s]
+
+        # The services co-located with the last placed one follow it: their
+        # cost and load are known, and they are not moved in the cover
+        end = s
+        forced = [0] * len(self.remaining)
+        forced_load = 0
+        while end < len(self.costs) and self.colocated[end]:
+            previous = self.choices[-1]
+            forced_load += self.loads[end]
+            if (
+                previous not in self.candidates[end]
+                or forced_load > self.remaining[previous] + FEASIBILITY_TOLERANCE
+            ):
+                return math.inf
+            bound += self.costs[end][previous] - self.cheapest[end]
+            forced[previous] += self.loads[end]
+            if self.preferred[end] is not None:
+                forced[self.preferred[end]] -= self.loads[end]
+            end += 1
+
+        for e, load in enumerate(self.preferred_load):
+            excess = load + forced[e] - self.remaining[e] - FEASIBILITY_TOLERANCE
+            if excess <= 0:
+                continue
+            first = bisect.bisect_left(self.cover_heads[e], end)
+            if self.integral:
+                bound += self._integral_cover(e, first, excess)
+            else:
+                items = sorted(
+                    self.covers[e][first:], key=lambda item: item[2] / item[1]
+                )
+                bound += _fractional_cover(items, excess)
+        return bound
+
+    def _integral_cover(self, e, first, excess):
+        """Returns the smallest cost of moving at least `excess` load out of
+        cluster e with its cover items from position `first` onwards, moved
+        whole. The costs are integers."""
+
+        table = self._cover_tables.get((e, first))
+        if table is None:
+            table = self._cover_tables[e, first] = _cover_table(
+                self.covers[e][first:]
+            )
+        costs, loads = table
+        i = bisect.bisect_left(loads, excess)
+        return costs[i] if i < len(costs) else math.inf
+
+    def _moves_first(self, s, e):
+        """Returns True if cluster e is overloaded, and service s is the
+        first remaining service to move out of it in the bound."""
+
+        excess = self.preferred_load[e] - self.remaining[e] - FEASIBILITY_TOLERANCE
+        if excess <= 0:
+            return False
+        return next(t for t, _, _ in self.movable[e] if t >= s) == s
+
+    def _visit(self, s, cost, stays):
+        bound = self._bound(s, cost)
+        if bound == math.inf or (
+            self.best_cost is not None and bound >= self.best_cost
+        ):
+            return
+        if s == len(self.costs):
+            self.best = list(self.choices)
+            self.best_cost = cost
+            return
+
+        candidates = self.candidates[s]
+        if self.colocated[s]:
+            previous = self.choices[-1]
+            candidates = [previous] if previous in candidates else []
+        # Cheapest first, then the clusters with the most room. If the
+        # preferred cluster is overloaded and the service is the first one
+        # the bound moves out of it, try moving it first.
+        preferred = self.preferred[s]
+        move_first = preferred is not None and self._moves_first(s, preferred)
+        candidates = sorted(
+            candidates,
+            key=lambda e: (
+                move_first and e == preferred,
+                self.costs[s][e],
+                -self.remaining[e],
+            ),
+        )
 
-    placement = [[0] * num_clusters for _ in range(num_nodes)]
-    for service_index, s in enumerate(S):
-        for cluster_index, e in enumerate(E):
-            if int(x[s, e].X) == 1:
-                placement[service_index][cluster_index] = 1
-    return placement
+        if preferred is not None:
+            self.preferred_load[preferred] -= self.loads[s]
+        for e in candidates:
+            # s0 is not part of the change and capacity constraints
+            load = self.loads[s] if s > 0 else 0
+            stay = self.current[s][e] if s > 0 else 0
+            if (
+                stays + stay > self.max_stays
+                or load > self.remaining[e] + FEASIBILITY_TOLERANCE
+            ):
+                continue
+
+            self.remaining[e] -= load
+            self.choices.append(e)
+            self._visit(s + 1, cost + self.costs[s][e], stays + stay)
+            self.choices.pop()
+            self.remaining[e] += load
+        if preferred is not None:
+            self.preferred_load[preferred] += self.loads[s]
+
+
+def _fractional_cover(items, excess):
+    """Returns the smallest cost of moving `excess` load with the given
+    (head, load, cost) items, sorted by cost per load, when they can be
+    moved partially."""
+
+    moves = 0
+    for _, load, gap in items:
+        if load >= excess:
+            return moves + gap * excess / load
+        moves += gap
+        excess -= load
+    return math.inf
+
+
+def _cover_table(items):
+    """Returns the total costs of moving some of the given (head, load,
+    cost) items whole, and the largest load moved at each of these costs,
+    both increasing."""
+
+    moved = {0: 0}
+    for _, load, gap in items:
+        if gap == math.inf:
+            continue
+        for cost, total in list(moved.items()):
+            if moved.get(cost + gap, -1) < total + load:
+                moved[cost + gap] = total + load
+
+    costs, loads = [], []
+    for cost in sorted(moved):
+        if not loads or moved[cost] > loads[-1]:
+            costs.append(cost)
+            loads.append(moved[cost])
+    return costs, loads
+
+
+def _check_inputs(num_nodes, num_clusters, replicas, current_placement, dependencies):
+    """Checks the lengths of the inputs of a placement decision, and returns
+    the dependencies, defaulting to none."""
+
+    if dependencies is None:
+        dependencies = [0] * max(num_nodes - 1, 0)
+    if (
+        len(replicas) != num_nodes
+        or len(current_placement) != num_nodes
+        or any(len(row) != num_clusters for row in current_placement)
+        or len(dependencies) != max(num_nodes - 1, 0)
+    ):
+        msg = "Inconsistent lengths of the placement inputs"
+        raise ValueError(msg)
+    return [1 if dependency else 0 for dependency in dependencies]
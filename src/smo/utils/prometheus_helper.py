@@ -1,8 +1,33 @@
 from __future__ import annotations
 
+import json
 import math
+import threading
+import time
+from typing import TYPE_CHECKING, ClassVar
 
 import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# Values returned when Prometheus has no sample for a service
+DEFAULT_LATENCY = 30
+DEFAULT_REQUEST_RATE = 0.0
+DEFAULT_CPU_UTIL = 0
+# Labels the CPU utilizations are grouped by: those of current cAdvisor and
+# kube-state-metrics versions, and the legacy ones of older cAdvisors
+CONTAINER_LABELS = "pod, container, pod_name, container_name"
+
+# Maximum number of keep-alive connections kept open to Prometheus
+DEFAULT_POOL_SIZE = 10
+# (connect, read) timeouts of a single request, in seconds
+DEFAULT_TIMEOUT = (3.05, 5)
+# Overall budget of a call, in seconds
+DEFAULT_TOTAL_TIMEOUT = 10
+# Bytes of the response body read between two checks of the deadline
+CHUNK_SIZE = 64 * 1024
 
 
 class PrometheusHelper:
@@ -12,81 +37,332 @@ class PrometheusHelper:
     related to service latency, request rate, and CPU utilization. It constructs
     Prometheus query strings and processes the results.
 
+    The `get_*s` methods fetch a metric for several services with a single
+    query (using a `service=~"a|b|c"` matcher) and return a dictionary keyed
+    by service name.
+
+    All instances share a single `requests.Session`, whose keep-alive
+    connection pool is reused by every scaling loop of the process. The pool
+    size is set with `configure_pool`, and `connection_stats` reports how
+    many requests reused an already open connection.
+
     Attributes:
         prometheus_host: The URL or IP address of the Prometheus server.
         time_window: The time duration for which metrics are queried.
         time_unit: The unit of time for the time window (default is seconds "s").
+        timeout: (connect, read) timeout of a single request, in seconds.
+        total_timeout: Deadline of a whole call, in seconds, when the caller
+            does not provide one.
     """
 
-    def __init__(self, prometheus_host, time_window, time_unit="s"):
+    _session: ClassVar[requests.Session | None] = None
+    _session_lock: ClassVar[threading.Lock] = threading.Lock()
+    _pool_size: ClassVar[int] = DEFAULT_POOL_SIZE
+
+    def __init__(
+        self,
+        prometheus_host,
+        time_window,
+        time_unit="s",
+        *,
+        timeout=DEFAULT_TIMEOUT,
+        total_timeout=DEFAULT_TOTAL_TIMEOUT,
+    ):
         self.prometheus_host = prometheus_host
         self.time_window = time_window
         self.time_unit = time_unit
+        self.timeout = timeout
+        self.total_timeout = total_timeout
+
+    @classmethod
+    def configure_pool(cls, pool_size: int) -> None:
+        """Sets the size of the shared connection pool.
+
+        The current session, if any, is closed and replaced on next use.
+        """
+
+        with cls._session_lock:
+            cls._pool_size = pool_size
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
+
+    @classmethod
+    def session(cls) -> requests.Session:
+        """Returns the process-wide session, creating it on first use."""
+
+        with cls._session_lock:
+            if cls._session is None:
+                session = requests.Session()
+                # A single host is queried, so one pool of `_pool_size`
+                # connections is enough
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=cls._pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls._session = session
+            return cls._session
+
+    @classmethod
+    def connection_stats(cls) -> dict[str, int]:
+        """Returns the request and connection counters of the shared pool.
+
+        `reused` is the number of requests that were sent over an already
+        open keep-alive connection.
+        """
+
+        num_requests = 0
+        num_connections = 0
+        if cls._session is not None:
+            for adapter in set(cls._session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        num_requests += pool.num_requests
+                        num_connections += pool.num_connections
+
+        return {
+            "requests": num_requests,
+            "connections": num_connections,
+            "reused": max(num_requests - num_connections, 0),
+        }
 
     def get_latency(self, name):
         """Return the latency of a service."""
 
+        return self.get_latencies([name])[name]
+
+    def get_request_rate(self, name):
+        """Return the request completion rate of the service."""
+
+        return self.get_request_rates([name])[name]
+
+    def get_cpu_util(self, name):
+        """Returns the CPU utilizations percentage of the service."""
+
+        return self.get_cpu_utils([name])[name]
+
+    def get_latencies(
+        self, names: Iterable[str], deadline: float | None = None
+    ) -> dict[str, float]:
+        """Return the latency of each service, using a single query."""
+
+        names = list(names)
+        matcher = _service_matcher(names)
         prometheus_latency_metric_query = (
             "(sum(rate(flask_http_request_duration_seconds_sum"
-            '{{service="{0}"}}[{1}{2}])) by (service))'
+            '{{service=~"{0}"}}[{1}{2}])) by (service))'
             "/(sum(rate(flask_http_request_duration_seconds_count"
-            '{{service="{0}"}}[{1}{2}])) by (service))'.format(
-                name, self.time_window, self.time_unit
+            '{{service=~"{0}"}}[{1}{2}])) by (service))'.format(
+                matcher, self.time_window, self.time_unit
             )
         )
 
-        # Get latency
-        latency = self._query(prometheus_latency_metric_query)
-        if math.isnan(latency):
-            latency = 30
-        return latency
+        # Get latencies
+        latencies = self._query_vector(
+            prometheus_latency_metric_query, "service", deadline
+        )
+        return _with_defaults(names, latencies, DEFAULT_LATENCY)
 
-    def get_request_rate(self, name):
-        """Return the request completion rate of the service."""
+    def get_request_rates(
+        self, names: Iterable[str], deadline: float | None = None
+    ) -> dict[str, float]:
+        """Return the request completion rate of each service, using a single
+        query."""
 
-        prometheus_request_rate_metric_query = (
-            f'sum(rate(flask_http_request_total{{service="{name}"}}'
-            f"[{self.time_window}{self.time_unit}]))by(service)"
+        names = list(names)
+
+        # Get arrival rates
+        request_rates = self._query_vector(
+            self._request_rate_query(names), "service", deadline
         )
+        return _with_defaults(names, request_rates, DEFAULT_REQUEST_RATE)
 
-        # Get arrival rate
-        request_rate = self._query(prometheus_request_rate_metric_query)
-        if math.isnan(request_rate):
-            request_rate = 0.0
-        return request_rate
+    def get_request_rate_history(
+        self,
+        names: Iterable[str],
+        duration: float,
+        step: float,
+        end: float | None = None,
+        deadline: float | None = None,
+    ) -> dict[str, list[tuple[float, float]]]:
+        """Return the request completion rate of each service over the last
+        `duration` seconds before `end` (by default now), one sample every
+        `step` seconds, using a single range query.
 
-    def get_cpu_util(self, name):
-        """Returns the CPU utilizations percentage of the service."""
+        Returns:
+        - The (timestamp, rate) samples of each service, oldest first, empty
+          for services without samples.
+        """
+
+        names = list(names)
+        query = self._request_rate_query(names)
+        if end is None:
+            end = time.time()
+
+        history = {name: [] for name in names}
+        for result in self._fetch_range(query, end - duration, end, step, deadline):
+            name = result["metric"].get("service", "")
+            if name in history and not history[name]:
+                history[name] = [
+                    (float(timestamp), float(value))
+                    for timestamp, value in result["values"]
+                    if not math.isnan(float(value))
+                ]
+        return history
 
+    def get_cpu_utils(
+        self, names: Iterable[str], deadline: float | None = None
+    ) -> dict[str, float]:
+        """Return the CPU utilization percentage of each service, using a
+        single query.
+
+        Container metrics carry no `service` label, so each series is
+        attributed to the service whose name prefixes its container name,
+        from the `container` label of current cAdvisor versions, or the
+        legacy `container_name` one. A series without either belongs to the
+        only service queried, if there is one.
+        """
+
+        names = list(names)
+        matcher = _service_matcher(names)
         cpu_util_metric_query = (
             "round(100 *sum(rate(container_cpu_usage_seconds_total"
-            '{{container=~"{0}.*"}}[40s])) by (pod_name, container_name)'
-            '/sum(kube_pod_container_resource_limits{{container=~"{0}.*",resource="cpu"}})'
-            "by (pod_name, container_name))".format(name)
+            '{{container=~"({0}).*"}}[40s])) by ({1})'
+            '/sum(kube_pod_container_resource_limits{{container=~"({0}).*",resource="cpu"}})'
+            "by ({1}))".format(matcher, CONTAINER_LABELS)
         )
 
-        # Get cpu_util
-        cpu_util = self._query(cpu_util_metric_query)
-        if math.isnan(cpu_util):
-            cpu_util = 0
-        return cpu_util
+        # Longest names first, so that "svc-a" does not capture "svc-ab" containers
+        by_length = sorted(names, key=len, reverse=True)
+        service_utils = {}
+        for result in self._fetch(cpu_util_metric_query, deadline):
+            metric = result["metric"]
+            container = metric.get("container") or metric.get("container_name")
+            value = float(result["value"][1])
+            if container is None:
+                if len(names) == 1:
+                    service_utils.setdefault(names[0], value)
+                continue
+            for name in by_length:
+                if container.startswith(name):
+                    service_utils.setdefault(name, value)
+                    break
+        return _with_defaults(names, service_utils, DEFAULT_CPU_UTIL)
+
+    def _request_rate_query(self, names: list[str]) -> str:
+        return (
+            f'sum(rate(flask_http_request_total{{service=~"{_service_matcher(names)}"}}'
+            f"[{self.time_window}{self.time_unit}]))by(service)"
+        )
 
-    def _query(self, query_name: str):
+    def _query(self, query_name: str, deadline: float | None = None):
         """Helper function that fetches the desired metric from the prometheus
         endpoint."""
 
-        prometheus_endpoint = f"{self.prometheus_host}/api/v1/query"
-        response = requests.get(
-            prometheus_endpoint,
-            params={
-                "query": query_name,
-            },
-            timeout=5,
-        )
-
-        # Parse the JSON response and extract the result
-        results = response.json()["data"]["result"]
+        results = self._fetch(query_name, deadline)
         if len(results) > 0:
             return float(results[0]["value"][1])
         else:
             return float("NaN")
+
+    def _query_vector(
+        self, query_name: str, label: str, deadline: float | None = None
+    ) -> dict[str, float]:
+        """Fetches an instant vector and returns its values keyed by `label`.
+
+        When several series share the same label value, the first one
+        wins, like in `_query`.
+        """
+
+        values = {}
+        for result in self._fetch(query_name, deadline):
+            key = result["metric"].get(label, "")
+            values.setdefault(key, float(result["value"][1]))
+        return values
+
+    def _fetch(self, query_name: str, deadline: float | None = None) -> list[dict]:
+        """Runs an instant query and returns the raw result list.
+
+        `deadline` is a `time.monotonic()` timestamp shared by all the
+        queries of a caller (e.g. a scaling tick). It bounds the whole call:
+        the request timeouts are shortened so that connecting and waiting
+        for the response do not outlive it, and the body is read in chunks,
+        checking the deadline after each one, so that a slowly trickling
+        response is abandoned too.
+
+        Raises:
+            requests.Timeout: If the deadline passed before the response was
+                read.
+        """
+
+        return self._get("query", {"query": query_name}, deadline)
+
+    def _fetch_range(
+        self,
+        query_name: str,
+        start: float,
+        end: float,
+        step: float,
+        deadline: float | None = None,
+    ) -> list[dict]:
+        """Runs a range query and returns the raw result list, see `_fetch`."""
+
+        params = {"query": query_name, "start": start, "end": end, "step": step}
+        return self._get("query_range", params, deadline)
+
+    def _get(self, api: str, params: dict, deadline: float | None) -> list[dict]:
+        if deadline is None:
+            deadline = time.monotonic() + self.total_timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            msg = "Prometheus query deadline exceeded"
+            raise requests.Timeout(msg)
+        connect_timeout, read_timeout = self.timeout
+
+        prometheus_endpoint = f"{self.prometheus_host}/api/v1/{api}"
+        response = self.session().get(
+            prometheus_endpoint,
+            params=params,
+            timeout=(min(connect_timeout, remaining), min(read_timeout, remaining)),
+            stream=True,
+        )
+        # The read timeout applies to each socket read, not to the body
+        with response:
+            chunks = []
+            for chunk in response.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    msg = "Prometheus query deadline exceeded"
+                    raise requests.Timeout(msg)
+
+        # Parse the JSON response and extract the result
+        return json.loads(b"".join(chunks))["data"]["result"]
+
+
+def _service_matcher(names: Iterable[str]) -> str:
+    r"""Builds the regex alternation used to match several services.
+
+    Service names are DNS labels, so the dot is the only regex
+    metacharacter they can contain. The backslash is doubled because the
+    regex is embedded in a PromQL string literal.
+
+    Example:
+        >>> _service_matcher(["a", "b.c"])
+        'a|b\\\\.c'
+    """
+
+    return "|".join(name.replace(".", "\\\\.") for name in names)
+
+
+def _with_defaults(
+    names: Iterable[str], values: dict[str, float], default: float
+) -> dict[str, float]:
+    """Returns the value of each service, replacing missing and NaN values
+    with `default`."""
+
+    result = {}
+    for name in names:
+        value = values.get(name, float("NaN"))
+        result[name] = default if math.isnan(value) else value
+    return result
@@ -0,0 +1,157 @@
+"""In-process queue of the re-placement requests of the scaling loops.
+
+When the services of a graph do not fit in a cluster anymore, its scaler
+requests a re-placement of the graph. Several clusters of a graph may
+request it at the same moment, and a scaler keeps requesting it at every
+tick until it is done, so the requests are debounced and coalesced: a
+graph is re-placed once for all the requests received until its
+re-placement starts, or while it runs.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# Seconds a re-placement waits for the requests of the other clusters
+DEFAULT_DEBOUNCE = 1.0
+# Re-placements of different graphs running at the same time
+DEFAULT_MAX_WORKERS = 2
+
+
+class ReplacementQueue:
+    """Runs the re-placements requested for graphs, at most one at a time
+    per graph.
+
+    A request is handled `debounce` seconds after it is received. Requests
+    for a graph whose re-placement is already queued or running are
+    coalesced into it: the running re-placement starts new scalers, and
+    the requests of the old ones are stale.
+
+    The methods are thread-safe, so that scalers can request re-placements
+    from any thread.
+
+    Input:
+    - handler: Re-places a graph, given its name. Runs on a worker thread.
+    - debounce: Seconds between the first request for a graph and its
+      re-placement.
+    - max_workers: The maximum number of graphs re-placed at the same time.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str], object],
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        self.handler = handler
+        self.debounce = debounce
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="smo-replacement"
+        )
+        self._condition = threading.Condition()
+        # Time at which each queued graph is due
+        self._due: dict[str, float] = {}
+        self._running: set[str] = set()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self._stats = {"requested": 0, "coalesced": 0, "run": 0, "failed": 0}
+
+    def request(self, graph_name: str) -> bool:
+        """Requests the re-placement of a graph.
+
+        Returns:
+        - True if a re-placement was queued, False if the request was
+          coalesced into a queued or running one, or the queue is shut down.
+        """
+
+        with self._condition:
+            if self._closed:
+                return False
+            self._stats["requested"] += 1
+            if graph_name in self._due or graph_name in self._running:
+                self._stats["coalesced"] += 1
+                return False
+
+            self._due[graph_name] = time.monotonic() + self.debounce
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._dispatch, name="smo-replacement-queue", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+            return True
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of requests received, coalesced into another
+        one, and of re-placements run and failed."""
+
+        with self._condition:
+            return dict(self._stats)
+
+    def pending(self) -> int:
+        """Returns the number of graphs queued or being re-placed."""
+
+        with self._condition:
+            return len(self._due) + len(self._running)
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Drops the queued requests and stops the worker threads, after the
+        running re-placements if `wait`."""
+
+        with self._condition:
+            self._closed = True
+            self._due.clear()
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._pool.shutdown(wait=wait)
+
+    def _dispatch(self) -> None:
+        """Starts the re-placements as they come due, until shutdown."""
+
+        while True:
+            with self._condition:
+                ready = self._wait_ready()
+                if ready is None:
+                    return
+                for graph_name in ready:
+                    del self._due[graph_name]
+                    self._running.add(graph_name)
+            for graph_name in ready:
+                self._pool.submit(self._run, graph_name)
+
+    def _wait_ready(self) -> list[str] | None:
+        """Waits for graphs to come due and returns them, or None on
+        shutdown. Called with the lock held."""
+
+        while not self._closed:
+            now = time.monotonic()
+            ready = [name for name, due in self._due.items() if due <= now]
+            if ready:
+                return ready
+            timeout = min(self._due.values()) - now if self._due else None
+            self._condition.wait(timeout)
+        return None
+
+    def _run(self, graph_name: str) -> None:
+        try:
+            self.handler(graph_name)
+        except Exception:
+            logger.exception("Re-placement of graph %s failed", graph_name)
+            failed = True
+        else:
+            failed = False
+        with self._condition:
+            self._running.discard(graph_name)
+            self._stats["run"] += 1
+            self._stats["failed"] += failed
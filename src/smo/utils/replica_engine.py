@@ -0,0 +1,479 @@
+"""Replica decision engines.
+
+An engine decides the number of replicas of the services of a cluster, given
+their request rates. `FastPathReplicaEngine` solves the common case exactly
+without a solver; `GurobiReplicaEngine` solves the full MIP, and
+`BranchAndBoundReplicaEngine` solves it exactly without dependencies;
+`FallbackReplicaEngine` chains the fast path with one of them, which is the
+default.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from smo.utils.solver_backend import AUTO, GUROBI, resolve_backend
+
+# Weights of the objective function (adjust as needed)
+W_UTIL = 0.4
+W_TRANS = 0.4
+# W_PENALTY = 0.2
+
+# Gurobi's default feasibility tolerance, applied to the fast path constraints
+# so that both engines agree on borderline request rates
+FEASIBILITY_TOLERANCE = 1e-6
+
+
+@dataclass
+class ReplicaProblem:
+    """Inputs of a replica decision.
+
+    Attributes:
+        request_rates: List of incoming rates of requests
+        previous_replicas: List of previous replicas
+        cpu_limits: List of CPU limits
+        acceleration: List of acceleration flags
+        alpha: Coefficient of the equation y = a * x + b
+               where x is the number of replicas and y is the
+               maximum number of requests the service can handle
+        beta: Coefficient in the same equation as alpha mentioned above
+        cluster_capacity: Cluster CPU capacity in cores
+        cluster_acceleration: Acceleration enabled for cluster flag
+        maximum_replicas: Maximum number of replicas allowed for each service
+    """
+
+    request_rates: list[float]
+    previous_replicas: list[int]
+    cpu_limits: list[float]
+    acceleration: list[int]
+    alpha: list[float]
+    beta: list[float]
+    cluster_capacity: float
+    cluster_acceleration: int
+    maximum_replicas: list[int]
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.previous_replicas)
+
+    def objective(self, replicas: list[int]) -> float:
+        """Returns the cost of a solution, as minimized by the engines."""
+
+        max_util_cost = self.max_util_cost()
+        return W_UTIL * sum(
+            replicas[s] * self.cpu_limits[s] / max_util_cost
+            for s in range(self.num_nodes)
+        ) + W_TRANS * sum(
+            abs(self.previous_replicas[s] - replicas[s]) / self.maximum_replicas[s]
+            for s in range(self.num_nodes)
+        )
+
+    def max_util_cost(self) -> float:
+        """Max utilization cost, used for normalization."""
+
+        return max(
+            self.maximum_replicas[s] * self.cpu_limits[s] for s in range(self.num_nodes)
+        )
+
+
+class ReplicaEngine(ABC):
+    """Base class of the replica decision engines."""
+
+    @abstractmethod
+    def decide(self, problem: ReplicaProblem) -> list[int] | None:
+        """Returns the optimal replicas of each service, or None if the
+        problem is infeasible."""
+
+
+class FastPathReplicaEngine(ReplicaEngine):
+    """Exact, solver-free replica decision for the common case.
+
+    The objective is separable: each service pays a utilization cost linear
+    in its replicas, plus a transition cost linear in the distance to its
+    previous replicas. Each service's optimum over
+    [minimal replicas, maximum replicas] is therefore either its previous
+    replicas (clamped to the bounds) or its minimal replicas, depending on
+    which cost dominates. If these optima fit in the cluster CPU budget
+    together, they are the optimal solution. If even the minimal replicas do
+    not fit, the problem is infeasible.
+
+    Otherwise (the budget binds), optimality cannot be proven without a
+    solver: `try_decide` reports it and `decide` raises.
+    """
+
+    def decide(self, problem: ReplicaProblem) -> list[int] | None:
+        proven, solution = self.try_decide(problem)
+        if not proven:
+            msg = "The fast path cannot prove optimality for this problem"
+            raise ValueError(msg)
+        return solution
+
+    def try_decide(self, problem: ReplicaProblem) -> tuple[bool, list[int] | None]:
+        """Tries to solve the problem without a solver.
+
+        Returns:
+            A (proven, solution) tuple. If `proven` is True, `solution` is
+            optimal, or None if the problem is infeasible. If it is False, a
+            solver is needed.
+        """
+
+        num_nodes = problem.num_nodes
+        if any(
+            problem.alpha[s] <= 0 or problem.cpu_limits[s] <= 0
+            for s in range(num_nodes)
+        ):
+            return False, None
+
+        if any(
+            problem.acceleration[s] > problem.cluster_acceleration
+            for s in range(num_nodes)
+        ):
+            return True, None
+
+        max_util_cost = problem.max_util_cost()
+        minimal = []
+        optimal = []
+        for s in range(num_nodes):
+            # Smallest replica count satisfying alpha * r + beta >= rate
+            lower, upper = _replica_bounds(problem, s)
+            if lower > upper:
+                return True, None
+
+            util_cost = W_UTIL * problem.cpu_limits[s] / max_util_cost
+            trans_cost = W_TRANS / problem.maximum_replicas[s]
+            if util_cost < trans_cost:
+                # Staying close to the previous replicas is worth the CPU
+                best = min(max(problem.previous_replicas[s], lower), upper)
+            else:
+                best = lower
+            minimal.append(lower)
+            optimal.append(best)
+
+        capacity = problem.cluster_capacity + FEASIBILITY_TOLERANCE
+        if _cpu(problem, optimal) <= capacity:
+            return True, optimal
+        if _cpu(problem, minimal) > capacity:
+            return True, None
+        return False, None
+
+
+class GurobiReplicaEngine(ReplicaEngine):
+    """Replica decision solved as a MIP with Gurobi.
+
+    The engine keeps its model alive between decisions. The model is only
+    built again when the number of services changes; otherwise, the
+    right-hand sides, coefficients and bounds are updated in place from the
+    new problem, and the solve is warm-started from the previous replicas.
+    An engine should therefore be used by one scaling loop at a time.
+
+    Attributes:
+        timings (dict): Seconds spent in the last decision building or
+            updating the model ("build") and optimizing it ("solve").
+    """
+
+    def __init__(self):
+        self.model = None
+        self.timings = {"build": 0.0, "solve": 0.0}
+        self._num_nodes = None
+
+    def decide(self, problem: ReplicaProblem) -> list[int] | None:
+        # The acceleration constraints only involve constants
+        if any(
+            problem.acceleration[s] > problem.cluster_acceleration
+            for s in range(problem.num_nodes)
+        ):
+            return None
+
+        start = time.perf_counter()
+        if self._num_nodes != problem.num_nodes:
+            self._build(problem.num_nodes)
+        self._update(problem)
+        self.model.update()
+        built = time.perf_counter()
+
+        # Solve the model
+        self.model.optimize()
+        self.timings = {"build": built - start, "solve": time.perf_counter() - built}
+
+        from gurobipy import GRB
+
+        # Check the solution status
+        if self.model.status == GRB.Status.OPTIMAL:
+            solution = [int(r.X) for r in self._r_current.values()]
+            return solution
+        else:
+            return None
+
+    def _build(self, num_nodes: int) -> None:
+        """Creates the variables and constraints, with placeholder data."""
+
+        from gurobipy import GRB, Model, quicksum
+
+        # Create a Gurobi model
+        model = Model("AutoScalingOptimization")
+
+        # Define decision variables. The lower and upper bounds of the
+        # replicas are the variable bounds.
+        r_current = {}
+        # to define the scaling (transformation) cost with absolute of difference
+        abs_diff = {}
+
+        for s in range(num_nodes):
+            r_current[s] = model.addVar(vtype=GRB.INTEGER, lb=1, name=f"r_{s}_current")
+            abs_diff[s] = model.addVar(vtype=GRB.INTEGER, name=f"abs_diff_{s}")
+
+        # Update model
+        model.update()
+
+        # Absolute difference constraints, the previous replicas being the
+        # right-hand sides
+        abs_diff_pos = {}
+        abs_diff_neg = {}
+        for s in range(num_nodes):
+            abs_diff_pos[s] = model.addConstr(
+                abs_diff[s] + r_current[s] >= 0, name=f"abs_diff_pos_{s}"
+            )
+            abs_diff_neg[s] = model.addConstr(
+                abs_diff[s] - r_current[s] >= 0, name=f"abs_diff_neg_{s}"
+            )
+
+        # Constraints
+        cluster_cpu = model.addConstr(
+            quicksum(r_current[s] for s in range(num_nodes)) <= 0,
+            name="cluster_cpu_limit_constraint",
+        )
+        service_rate = {}
+        for s in range(num_nodes):
+            # alpha * r >= rate - beta
+            service_rate[s] = model.addConstr(
+                r_current[s] >= 0, name=f"constraint_service_rate_{s}"
+            )
+
+        model.ModelSense = GRB.MINIMIZE
+
+        self.model = model
+        self._num_nodes = num_nodes
+        self._r_current = r_current
+        self._abs_diff = abs_diff
+        self._abs_diff_pos = abs_diff_pos
+        self._abs_diff_neg = abs_diff_neg
+        self._cluster_cpu = cluster_cpu
+        self._service_rate = service_rate
+
+    def _update(self, problem: ReplicaProblem) -> None:
+        """Loads the data of a problem into the model."""
+
+        model = self.model
+        # Max values for normalization
+        max_util_cost = problem.max_util_cost()
+        max_trans_cost = problem.maximum_replicas
+
+        for s in range(problem.num_nodes):
+            r_current = self._r_current[s]
+            abs_diff = self._abs_diff[s]
+            previous = problem.previous_replicas[s]
+
+            # Objective function
+            r_current.Obj = W_UTIL * problem.cpu_limits[s] / max_util_cost
+            abs_diff.Obj = W_TRANS / max_trans_cost[s]
+
+            r_current.UB = problem.maximum_replicas[s]
+            self._abs_diff_pos[s].RHS = previous
+            self._abs_diff_neg[s].RHS = -previous
+            model.chgCoeff(self._cluster_cpu, r_current, problem.cpu_limits[s])
+            model.chgCoeff(self._service_rate[s], r_current, problem.alpha[s])
+            self._service_rate[s].RHS = problem.request_rates[s] - problem.beta[s]
+
+            # Warm start from the previous replicas
+            start = min(max(previous, 1), problem.maximum_replicas[s])
+            r_current.Start = start
+            abs_diff.Start = abs(previous - start)
+
+        self._cluster_cpu.RHS = problem.cluster_capacity
+
+
+class BranchAndBoundReplicaEngine(ReplicaEngine):
+    """Exact replica decision, without a solver.
+
+    Starting from the minimal replicas of each service, adding a replica
+    only pays off when it moves the service towards its previous replicas
+    and saves more transition cost than it costs in utilization (see
+    `FastPathReplicaEngine`). Each such service offers a number of replica
+    steps of equal CPU cost and equal saving, and choosing them within the
+    CPU budget left by the minimal replicas is a bounded knapsack problem.
+    It is solved by a depth-first branch-and-bound, trying the services
+    with the best saving per CPU first, and pruning with the bound of the
+    fractional knapsack.
+
+    Attributes:
+        timings (dict): Seconds spent in the last decision preparing the
+            search ("build") and searching ("solve").
+    """
+
+    def __init__(self):
+        self.timings = {"build": 0.0, "solve": 0.0}
+
+    def decide(self, problem: ReplicaProblem) -> list[int] | None:
+        start = time.perf_counter()
+        if any(
+            problem.acceleration[s] > problem.cluster_acceleration
+            for s in range(problem.num_nodes)
+        ):
+            return None
+
+        max_util_cost = problem.max_util_cost()
+        replicas = []
+        steps = []
+        for s in range(problem.num_nodes):
+            lower, upper = _replica_bounds(problem, s)
+            if lower > upper:
+                return None
+            replicas.append(lower)
+
+            util_cost = W_UTIL * problem.cpu_limits[s] / max_util_cost
+            trans_cost = W_TRANS / problem.maximum_replicas[s]
+            count = min(problem.previous_replicas[s], upper) - lower
+            if count > 0 and util_cost < trans_cost:
+                steps.append(
+                    _ReplicaSteps(
+                        s, count, problem.cpu_limits[s], trans_cost - util_cost
+                    )
+                )
+
+        # Steps using no CPU are always worth taking
+        free_steps = [step for step in steps if step.cpu <= 0]
+        for step in free_steps:
+            replicas[step.service] += step.count
+        budget = (
+            problem.cluster_capacity + FEASIBILITY_TOLERANCE - _cpu(problem, replicas)
+        )
+        if budget < 0:
+            return None
+
+        search = _KnapsackSearch([step for step in steps if step.cpu > 0], budget)
+        built = time.perf_counter()
+        for step, count in search.run():
+            replicas[step.service] += count
+        self.timings = {"build": built - start, "solve": time.perf_counter() - built}
+        return replicas
+
+
+@dataclass
+class _ReplicaSteps:
+    """Replicas worth adding to a service: up to `count`, each using `cpu`
+    and saving `saving` in the objective."""
+
+    service: int
+    count: int
+    cpu: float
+    saving: float
+
+
+class _KnapsackSearch:
+    """Depth-first branch-and-bound of `BranchAndBoundReplicaEngine`."""
+
+    def __init__(self, steps: list[_ReplicaSteps], budget: float):
+        self.steps = sorted(
+            steps, key=lambda step: step.saving / step.cpu, reverse=True
+        )
+        self.budget = budget
+        self.best: list[int] = []
+        self.best_saving = -math.inf
+        self.counts: list[int] = []
+
+    def run(self) -> list[tuple[_ReplicaSteps, int]]:
+        """Returns the number of replicas to add to each service."""
+
+        self._visit(0, 0.0, self.budget)
+        return list(zip(self.steps, self.best, strict=True))
+
+    def _bound(self, i: int, budget: float) -> float:
+        """Returns the saving of the fractional knapsack of the steps from
+        index i onwards, an upper bound of their best saving."""
+
+        saving = 0.0
+        for step in self.steps[i:]:
+            cpu = step.cpu * step.count
+            if cpu > budget:
+                return saving + step.saving * budget / step.cpu
+            saving += step.saving * step.count
+            budget -= cpu
+        return saving
+
+    def _visit(self, i: int, saving: float, budget: float) -> None:
+        if saving + self._bound(i, budget) <= self.best_saving + FEASIBILITY_TOLERANCE:
+            return
+        if i == len(self.steps):
+            self.best = list(self.counts)
+            self.best_saving = saving
+            return
+
+        step = self.steps[i]
+        most = min(step.count, math.floor(budget / step.cpu))
+        for count in range(most, -1, -1):
+            self.counts.append(count)
+            self._visit(i + 1, saving + count * step.saving, budget - count * step.cpu)
+            self.counts.pop()
+
+
+class FallbackReplicaEngine(ReplicaEngine):
+    """Uses the fast path, and a solver only when the fast path cannot prove
+    optimality.
+
+    Input:
+    - fallback: The engine used when the fast path is not conclusive. Defaults
+      to the exact engine of the "auto" backend.
+    """
+
+    def __init__(self, fallback: ReplicaEngine | None = None):
+        self.fast_path = FastPathReplicaEngine()
+        self.fallback = fallback if fallback is not None else exact_engine()
+
+    def decide(self, problem: ReplicaProblem) -> list[int] | None:
+        proven, solution = self.fast_path.try_decide(problem)
+        if proven:
+            return solution
+        return self.fallback.decide(problem)
+
+
+def exact_engine(backend: str = AUTO) -> ReplicaEngine:
+    """Returns the exact engine of the given backend, see
+    `smo.utils.solver_backend`."""
+
+    if resolve_backend(backend) == GUROBI:
+        return GurobiReplicaEngine()
+    return BranchAndBoundReplicaEngine()
+
+
+def create_replica_engine(backend: str = AUTO) -> ReplicaEngine:
+    """Returns the default engine: the fast path, falling back to the exact
+    engine of the given backend."""
+
+    return FallbackReplicaEngine(fallback=exact_engine(backend))
+
+
+def _replica_bounds(problem: ReplicaProblem, s: int) -> tuple[int, int]:
+    """Returns the range of replicas of service s satisfying its request
+    rate, within its bounds."""
+
+    lower = 1
+    upper = problem.maximum_replicas[s]
+    # alpha * r + beta >= rate, with the solver's feasibility tolerance
+    slack = problem.request_rates[s] - problem.beta[s] - FEASIBILITY_TOLERANCE
+    alpha = problem.alpha[s]
+    if alpha > 0:
+        lower = max(lower, math.ceil(slack / alpha))
+    elif alpha < 0:
+        upper = min(upper, math.floor(slack / alpha))
+    elif slack > 0:
+        return 1, 0
+    return lower, upper
+
+
+def _cpu(problem: ReplicaProblem, replicas: list[int]) -> float:
+    """Returns the CPU used by the given replicas."""
+
+    return sum(problem.cpu_limits[s] * replicas[s] for s in range(problem.num_nodes))
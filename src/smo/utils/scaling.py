@@ -2,37 +2,44 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import time
+from typing import TYPE_CHECKING
 
 import requests
 from devtools import debug
-from gurobipy import GRB, Model, quicksum
 
-from .kube_helper import KubeHelper
+from .actuation import Cooldown, ReplicaActuator
+from .forecast import LastValueForecaster, RateForecaster
+from .kube_helper import KubeHelper, get_kube_helper
+from .metric_buffer import DEFAULT_CAPACITY, MetricBuffer
 from .prometheus_helper import PrometheusHelper
+from .replica_engine import (FallbackReplicaEngine, ReplicaEngine,
+                             ReplicaProblem)
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# Share of the decision interval the Prometheus queries of a tick may take,
+# the rest being left to the decision and its actuation
+QUERY_BUDGET = 0.5
 
-def scaling_loop(
-    graph_name,
-    acceleration,
-    alpha,
-    beta,
-    cluster_capacity,
-    cluster_acceleration,
-    maximum_replicas,
-    managed_services,
-    decision_interval,
-    config_file_path,
-    prometheus_host,
-    stop_event,
-) -> None:
-    """Runs the scaling algorithm periodically.
 
-    The function continuously monitors and adjusts the number of replicas for a
-    list of managed services based on request rates and predefined scaling parameters.
+class ClusterScaler:
+    """Scaling state of the services of a graph placed on one cluster.
+
+    The scaler holds the parameters of the scaling algorithm and the replicas
+    decided at the previous tick. Its coroutines never block the event loop:
+    Kubernetes and Prometheus calls, as well as the solver, run in the
+    loop's executor, and the calls made for different services run
+    concurrently.
 
     Input:
     - graph_name: Name of the graph used for determining the scaling logic.
+    - cluster: Name of the cluster hosting the managed services.
     - acceleration: The acceleration factor for scaling decisions.
     - alpha: A scaling parameter that influences decision making.
     - beta: A scaling parameter that influences decision making.
@@ -43,82 +50,269 @@ def scaling_loop(
     - decision_interval: The interval (in seconds) between scaling decisions.
     - config_file_path: Path to the Kubernetes configuration file.
     - prometheus_host: Host address of the Prometheus server.
-    - stop_event: An event to signal stopping of the scaling loop.
+    - engine: The replica decision engine, by default the fast path with an
+      exact fallback of the "auto" solver backend.
+    - history_capacity: The number of request rate samples kept per service
+      in `rate_history`.
+    - forecaster: Predicts the request rates the replicas are decided for,
+      by default the last measured rates.
+    - startup_delay: Seconds before the replicas decided at a tick are
+      ready: the rates are forecast for that time.
+    - cooldowns: The cooldown of each service between two scalings, see
+      `ReplicaActuator`; none by default.
+    - request_placement: Requests the re-placement of the graph, given its
+      name, when its services do not fit in the cluster anymore. Must not
+      block, e.g. `ReplacementQueue.request`.
     """
 
-    # Initialize helpers for Kubernetes and Prometheus
-    kube_helper = KubeHelper(config_file_path)
-    prometheus_helper = PrometheusHelper(prometheus_host, decision_interval)
+    def __init__(
+        self,
+        graph_name,
+        cluster,
+        acceleration,
+        alpha,
+        beta,
+        cluster_capacity,
+        cluster_acceleration,
+        maximum_replicas,
+        managed_services,
+        decision_interval,
+        config_file_path,
+        prometheus_host,
+        engine: ReplicaEngine | None = None,
+        history_capacity: int = DEFAULT_CAPACITY,
+        forecaster: RateForecaster | None = None,
+        startup_delay: float = 0,
+        cooldowns: dict[str, Cooldown] | None = None,
+        request_placement: Callable[[str], object] | None = None,
+    ):
+        self.graph_name = graph_name
+        self.cluster = cluster
+        self.acceleration = acceleration
+        self.alpha = alpha
+        self.beta = beta
+        self.cluster_capacity = cluster_capacity
+        self.cluster_acceleration = cluster_acceleration
+        self.maximum_replicas = maximum_replicas
+        self.managed_services = managed_services
+        self.decision_interval = decision_interval
+        self.config_file_path = config_file_path
+        self.prometheus_host = prometheus_host
+        self.engine = engine if engine is not None else FallbackReplicaEngine()
+
+        # Special handling for 'image-compression-vo' service, which is scaled
+        # according to the request rate of 'noise-reduction'
+        self.metric_services = [
+            "noise-reduction" if service == "image-compression-vo" else service
+            for service in managed_services
+        ]
 
-    # Ensure initial replica counts are available for all services
-    while True:
-        previous_replicas = [
-            kube_helper.get_replicas(service) for service in managed_services
+        self.kube_helper: KubeHelper | None = None
+        self.prometheus_helper = PrometheusHelper(prometheus_host, decision_interval)
+        self.previous_replicas: list[int] = []
+        self.cpu_limits: list[float] = []
+        # Request rates of the metric services, one sample per tick
+        self.rate_history = MetricBuffer(history_capacity)
+        self.forecaster = (
+            forecaster if forecaster is not None else LastValueForecaster()
+        )
+        self.startup_delay = startup_delay
+        self.cooldowns = cooldowns
+        self.actuator: ReplicaActuator | None = None
+        self.request_placement = request_placement
+        # Set by `stop`, from the event loop
+        self.stopped = False
+
+    async def initialize(self) -> None:
+        """Waits until replica counts are available for all services, then
+        reads their CPU limits."""
+
+        # Loading the kubeconfig reads files, so keep it off the event loop.
+        # The helper, and its informer cache serving the deployment reads,
+        # are shared with the other scalers and the graph operations.
+        self.kube_helper = await asyncio.to_thread(
+            get_kube_helper, self.config_file_path
+        )
+        # Ensure initial replica counts are available for all services. The
+        # wait blocks on the informer instead of polling the API server, and
+        # is bounded so that the executor thread is released regularly.
+        ready = False
+        while not ready:
+            ready = await asyncio.to_thread(
+                self.kube_helper.wait_for_replicas,
+                self.managed_services,
+                self.decision_interval,
+            )
+
+        # Retrieve current replicas and CPU limits for managed services,
+        # reading each deployment once. The replicas are those of the specs,
+        # which the actuator compares the decisions with, rather than those
+        # available, which lag behind during a rollout.
+        snapshot = await asyncio.to_thread(
+            self.kube_helper.snapshot, self.managed_services
+        )
+        self.previous_replicas = [
+            snapshot[service].desired_replicas for service in self.managed_services
         ]
-        if None in previous_replicas:
-            # Wait and retry if any replica count is unavailable
-            time.sleep(5)
+        self.cpu_limits = [
+            snapshot[service].cpu_limit for service in self.managed_services
+        ]
+        # The replicas applied must fit the cluster as those decided do
+        self.actuator = ReplicaActuator(
+            self.kube_helper.scale_deployment,
+            self.observe_replicas,
+            self.cooldowns,
+            cpu_limits=dict(zip(self.managed_services, self.cpu_limits, strict=True)),
+            capacity=self.cluster_capacity,
+        )
+        if self.stopped:
+            self.actuator.stop()
+
+        await self.backfill_history()
+
+    async def backfill_history(self) -> None:
+        """Fills the rate history with a single range query, covering as many
+        decision intervals as it holds. The scaling works without history,
+        so a failure is only logged."""
+
+        try:
+            history = await asyncio.to_thread(
+                self.prometheus_helper.get_request_rate_history,
+                set(self.metric_services),
+                self.rate_history.capacity * self.decision_interval,
+                self.decision_interval,
+                deadline=self.query_deadline(),
+            )
+        except (requests.RequestException, KeyError, ValueError):
+            logger.warning(
+                "Could not backfill the request rates of graph %s on cluster %s",
+                self.graph_name,
+                self.cluster,
+                exc_info=True,
+            )
         else:
-            break
-
-    # Retrieve current CPU limits for managed services
-    previous_replicas = [
-        kube_helper.get_replicas(service) for service in managed_services
-    ]
-    cpu_limits = [kube_helper.get_cpu_limit(service) for service in managed_services]
-
-    # Main scaling loop - runs until stop_event is set
-    while not stop_event.is_set():
-        request_rates = []
-        for service in managed_services:
-            # Special handling for 'image-compression-vo' service
-            if service == "image-compression-vo":
-                request_rates.append(
-                    prometheus_helper.get_request_rate("noise-reduction")
-                )
-            else:
-                request_rates.append(prometheus_helper.get_request_rate(service))
+            self.rate_history.backfill(history)
+            # Warm up the forecaster, oldest samples first
+            for service, samples in history.items():
+                for timestamp, rate in samples:
+                    self.forecaster.observe(service, timestamp, rate)
+
+    def query_deadline(self) -> float:
+        """Returns the `time.monotonic()` deadline of the Prometheus queries
+        started now, so that they do not hold up the next tick."""
+
+        return time.monotonic() + QUERY_BUDGET * self.decision_interval
+
+    def observe_replicas(self, names: list[str]) -> dict[str, int]:
+        """Returns the replicas of the deployment specs of services, from the
+        informer cache."""
+
+        snapshot = self.kube_helper.snapshot(names)
+        return {
+            name: deployment.desired_replicas for name, deployment in snapshot.items()
+        }
+
+    def stats(self) -> dict[str, dict]:
+        """Returns the errors of the rate forecasts of each metric service,
+        see `RateForecaster.stats`, and the counters of the actuation of the
+        decisions, see `ReplicaActuator.stats`, empty until initialized."""
+
+        return {
+            "forecast": self.forecaster.stats(),
+            "actuation": self.actuator.stats() if self.actuator is not None else {},
+        }
+
+    def stop(self) -> None:
+        """Stops the scaler: its running tick ends without scaling or
+        re-placing the services, and the patches it has not started are
+        skipped."""
+
+        self.stopped = True
+        if self.actuator is not None:
+            self.actuator.stop()
+
+    async def tick(self) -> list[int] | None:
+        """Runs one decision cycle and returns the replicas of the services
+        after actuation, or None if the services do not fit in the cluster
+        anymore or the scaler is stopped."""
+
+        if self.stopped:
+            return None
+
+        # Fetch the request rates of all managed services with a single query
+        service_rates = await asyncio.to_thread(
+            self.prometheus_helper.get_request_rates,
+            set(self.metric_services),
+            self.query_deadline(),
+        )
+        now = time.time()
+        self.rate_history.append(service_rates, now)
+
+        # Size the replicas for the rates expected once they are ready
+        forecasts = {}
+        for service, rate in service_rates.items():
+            self.forecaster.observe(service, now, rate)
+            forecasts[service] = self.forecaster.forecast(
+                service, now + self.startup_delay
+            )
+        request_rates = [forecasts[service] for service in self.metric_services]
 
         debug(
             request_rates,
-            previous_replicas,
-            cpu_limits,
-            acceleration,
-            alpha,
-            beta,
-            cluster_capacity,
-            cluster_acceleration,
-            maximum_replicas,
+            self.previous_replicas,
+            self.cpu_limits,
+            self.acceleration,
+            self.alpha,
+            self.beta,
+            self.cluster_capacity,
+            self.cluster_acceleration,
+            self.maximum_replicas,
         )
 
         # Determine new replicas based on decision criteria
-        new_replicas = decide_replicas(
+        new_replicas = await asyncio.to_thread(
+            decide_replicas,
             request_rates,
-            previous_replicas,
-            cpu_limits,
-            acceleration,
-            alpha,
-            beta,
-            cluster_capacity,
-            cluster_acceleration,
-            maximum_replicas,
+            self.previous_replicas,
+            self.cpu_limits,
+            self.acceleration,
+            self.alpha,
+            self.beta,
+            self.cluster_capacity,
+            self.cluster_acceleration,
+            self.maximum_replicas,
+            self.engine,
         )
 
+        if self.stopped:
+            # Stopped while deciding, e.g. to move the services elsewhere
+            return None
         if new_replicas is None:
-            # TODO: don't hardcode the URL
-            requests.get(f"http://localhost:8000/graph/{graph_name}/placement")
+            # The services do not fit: the graph must be re-placed, which
+            # replaces this scaler. Requests of the other clusters of the
+            # graph are coalesced into the same re-placement.
+            if self.request_placement is None:
+                logger.warning(
+                    "No feasible replicas for graph %s on %s",
+                    self.graph_name,
+                    self.cluster,
+                )
+            else:
+                self.request_placement(self.graph_name)
         else:
-            for idx, replicas in enumerate(new_replicas):
-                kube_helper.scale_deployment(managed_services[idx], replicas)
+            # Patch only the deployments whose replicas change, concurrently
+            applied = await self.actuator.apply(
+                dict(zip(self.managed_services, new_replicas, strict=True))
+            )
+            new_replicas = [applied[service] for service in self.managed_services]
 
         # TODO: use logging
         debug(new_replicas)
 
         # Update previous replicas for the next iteration
-        previous_replicas = new_replicas
-
-        # Pause before the next decision cycle
-        time.sleep(decision_interval)
+        if new_replicas is not None:
+            self.previous_replicas = new_replicas
+        return new_replicas
 
 
 def decide_replicas(
@@ -131,6 +325,7 @@ def decide_replicas(
     cluster_capacity,
     cluster_acceleration,
     maximum_replicas,
+    engine: ReplicaEngine | None = None,
 ) -> list[int] | None:
     """Determines the optimal number of replicas for each service to handle
     incoming request rates.
@@ -148,6 +343,8 @@ def decide_replicas(
     cluster_capacity: Cluster CPU capacity in cores
     cluster_acceleration: Acceleration enabled for cluster flag
     maximum_replicas: Maximum number of replicas allowed for each service
+    engine: The replica decision engine; by default, the solver-free fast
+            path with an exact fallback of the "auto" solver backend
 
     Returns
     ---
@@ -159,81 +356,18 @@ def decide_replicas(
     ValueError: If the input lists are inconsistent in length.
     """
 
-    # Define the number of application nodes
-    num_nodes = len(previous_replicas)
-
-    # Create a Gurobi model
-    model = Model("AutoScalingOptimization")
-
-    # Define decision variables
-    r_current = {}
-    r_prev = {}
-    # to define the scaling (transformation) cost with absolute of difference
-    abs_diff = {}
-
-    for s in range(num_nodes):
-        r_current[s] = model.addVar(vtype=GRB.INTEGER, name=f"r_{s}_current")
-        r_prev[s] = previous_replicas[s]
-        abs_diff[s] = model.addVar(vtype=GRB.INTEGER, name=f"abs_diff_{s}")
-
-    # Update model
-    model.update()
-
-    # Absolute difference constraints
-    for s in range(num_nodes):
-        model.addConstr(
-            abs_diff[s] >= r_prev[s] - r_current[s], name=f"abs_diff_pos_{s}"
-        )
-        model.addConstr(
-            abs_diff[s] >= -(r_prev[s] - r_current[s]), name=f"abs_diff_neg_{s}"
-        )
-
-    # Example weights (adjust as needed)
-    w_util = 0.4
-    w_trans = 0.4
-    # w_penalty = 0.2
-
-    # Max values for normalization
-    max_util_cost = max(maximum_replicas[s] * cpu_limits[s] for s in range(num_nodes))
-    max_trans_cost = maximum_replicas
-
-    # Objective function
-    model.setObjective(
-        w_util
-        * quicksum(
-            r_current[s] * cpu_limits[s] / max_util_cost for s in range(num_nodes)
-        )
-        + w_trans * quicksum(abs_diff[s] / max_trans_cost[s] for s in range(num_nodes)),
-        # w_penalty * penalty_term,
-        GRB.MINIMIZE,
+    if engine is None:
+        engine = FallbackReplicaEngine()
+
+    problem = ReplicaProblem(
+        request_rates=request_rates,
+        previous_replicas=previous_replicas,
+        cpu_limits=cpu_limits,
+        acceleration=acceleration,
+        alpha=alpha,
+        beta=beta,
+        cluster_capacity=cluster_capacity,
+        cluster_acceleration=cluster_acceleration,
+        maximum_replicas=maximum_replicas,
     )
-
-    # Constraints
-    model.addConstr(
-        quicksum(cpu_limits[s] * r_current[s] for s in range(num_nodes))
-        <= cluster_capacity,
-        name="cluster_cpu_limit_constraint",
-    )
-    # Constraints
-    for s in range(num_nodes):
-        model.addConstr(
-            acceleration[s] <= cluster_acceleration, name=f"constraint_acceleration_{s}"
-        )
-        model.addConstr(
-            alpha[s] * r_current[s] + beta[s] >= request_rates[s],
-            name=f"constraint_service_rate_{s}",
-        )
-        model.addConstr(1 <= r_current[s], name=f"lower_bound_replicas{s}")
-        model.addConstr(
-            r_current[s] <= maximum_replicas[s], name=f"upper_bound_replicas_{s}"
-        )
-
-    # Solve the model
-    model.optimize()
-
-    # Check the solution status
-    if model.status == GRB.Status.OPTIMAL:
-        solution = [int(r.X) for r in r_current.values()]
-        return solution
-    else:
-        return None
+    return engine.decide(problem)
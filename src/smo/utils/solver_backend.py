@@ -0,0 +1,54 @@
+"""Selection of the optimization backend of the placement and replica
+decisions.
+
+Two backends are available: "gurobi", which solves the MIP models with
+Gurobi (and needs `gurobipy` and a license), and "python", an exact,
+dependency-free branch-and-bound. "auto" picks Gurobi when `gurobipy` is
+installed, and the Python backend otherwise.
+"""
+
+from __future__ import annotations
+
+from importlib.util import find_spec
+
+AUTO = "auto"
+GUROBI = "gurobi"
+PYTHON = "python"
+
+BACKENDS = (AUTO, GUROBI, PYTHON)
+
+
+def gurobi_available() -> bool:
+    """Returns True if `gurobipy` can be imported, without importing it."""
+
+    return find_spec("gurobipy") is not None
+
+
+def resolve_backend(backend: str = AUTO) -> str:
+    """Returns the concrete backend to use for the configured one.
+
+    Input:
+    - backend: One of "auto", "gurobi" or "python".
+
+    Returns:
+    - "gurobi" or "python".
+
+    Raises:
+    - ValueError: If the backend is unknown, or if it is "gurobi" and
+      `gurobipy` is not installed.
+
+    Example:
+        >>> resolve_backend("python")
+        'python'
+    """
+
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        msg = f"Unknown solver backend {backend!r}, expected one of {BACKENDS}"
+        raise ValueError(msg)
+    if backend == AUTO:
+        return GUROBI if gurobi_available() else PYTHON
+    if backend == GUROBI and not gurobi_available():
+        msg = "The gurobi solver backend requires gurobipy to be installed"
+        raise ValueError(msg)
+    return backend
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from smo.utils import scaling
+from smo.utils.actuation import Cooldown, ReplicaActuator
+from smo.utils.replica_engine import ReplicaEngine
+from smo.utils.scaling import ClusterScaler
+
+
+class FakeCluster:
+    def __init__(self, replicas):
+        self.replicas = dict(replicas)
+        self.patches = []
+        self.now = 0.0
+
+    def scale(self, name, replicas):
+        if name == "broken":
+            raise ConnectionError
+        self.patches.append((name, replicas))
+        self.replicas[name] = replicas
+
+    def observe(self, names):
+        return {name: self.replicas[name] for name in names if name in self.replicas}
+
+    def actuator(self, cooldowns=None, cpu_limits=None, capacity=None):
+        return ReplicaActuator(
+            self.scale,
+            self.observe,
+            cooldowns,
+            lambda: self.now,
+            cpu_limits=cpu_limits,
+            capacity=capacity,
+        )
+
+
+def test_only_changes_are_patched():
+    cluster = FakeCluster({"a": 1, "b": 2, "c": 3})
+    actuator = cluster.actuator()
+
+    applied = asyncio.run(actuator.apply({"a": 1, "b": 3, "c": 3, "new": 1}))
+
+    assert applied == {"a": 1, "b": 3, "c": 3, "new": 1}
+    assert sorted(cluster.patches) == [("b", 3), ("new", 1)]
+    assert actuator.stats() == {
+        "patched": 2,
+        "unchanged": 2,
+        "cooling_down": 0,
+        "trimmed": 0,
+        "failed": 0,
+        "stopped": 0,
+    }
+
+
+def test_cooldowns_hold_back_changes():
+    cluster = FakeCluster({"a": 1, "broken": 1})
+    actuator = cluster.actuator({"a": Cooldown(up=10, down=60)})
+
+    asyncio.run(actuator.apply({"a": 2}))
+    cluster.now = 30
+    # Too soon to scale back down, not to scale up again
+    assert asyncio.run(actuator.apply({"a": 1})) == {"a": 2}
+    assert asyncio.run(actuator.apply({"a": 3})) == {"a": 3}
+    cluster.now = 100
+    assert asyncio.run(actuator.apply({"a": 1, "broken": 2})) == {"a": 1, "broken": 1}
+
+    assert cluster.patches == [("a", 2), ("a", 3), ("a", 1)]
+    stats = actuator.stats()
+    assert (stats["cooling_down"], stats["failed"]) == (1, 1)
+
+
+def test_scale_ups_are_trimmed_to_the_capacity():
+    cluster = FakeCluster({"a": 1, "b": 3, "c": 1, "d": 1})
+    actuator = cluster.actuator(
+        {"b": Cooldown(down=60)},
+        cpu_limits={"a": 1, "b": 1, "c": 1, "d": 1},
+        capacity=10,
+    )
+    # b was just scaled up, and cannot be scaled down yet
+    asyncio.run(actuator.apply({"b": 4}))
+    cluster.patches.clear()
+
+    # Decided for 1 + 2 + 4 + 3 = 10 cores, b holding 2 more
+    applied = asyncio.run(actuator.apply({"a": 1, "b": 2, "c": 4, "d": 3}))
+
+    # The scale ups give back a replica each in turn
+    assert applied == {"a": 1, "b": 4, "c": 3, "d": 2}
+    assert sum(applied.values()) == actuator.capacity
+    assert sorted(cluster.patches) == [("c", 3), ("d", 2)]
+    stats = actuator.stats()
+    assert (stats["cooling_down"], stats["trimmed"]) == (1, 2)
+
+
+def test_stopped_actuator_does_not_patch():
+    cluster = FakeCluster({"a": 1, "b": 1})
+    actuator = cluster.actuator()
+
+    actuator.stop()
+
+    assert asyncio.run(actuator.apply({"a": 2, "b": 1, "new": 1})) == {
+        "a": 1,
+        "b": 1,
+        "new": 1,
+    }
+    assert cluster.patches == []
+    stats = actuator.stats()
+    assert (stats["patched"], stats["stopped"]) == (0, 2)
+
+
+def test_scaler_starts_from_the_desired_replicas(monkeypatch):
+    class RollingOutHelper:
+        """A deployment scaled to 3 replicas, 1 of them available so far."""
+
+        def scale_deployment(self, name, replicas):
+            pass
+
+        def wait_for_replicas(self, names, timeout):
+            return True
+
+        def snapshot(self, names):
+            return {
+                name: SimpleNamespace(
+                    available_replicas=1, desired_replicas=3, cpu_limit=0.5
+                )
+                for name in names
+            }
+
+    async def no_history(self):
+        pass
+
+    monkeypatch.setattr(scaling, "get_kube_helper", lambda _: RollingOutHelper())
+    monkeypatch.setattr(ClusterScaler, "backfill_history", no_history)
+    scaler = ClusterScaler(
+        "graph", "cluster", [1], [1], [1], 4, 1, [5], ["svc"], 30, "kubeconfig", ""
+    )
+    asyncio.run(scaler.initialize())
+
+    # The decisions start from the replicas the actuator compares them with
+    assert scaler.previous_replicas == list(scaler.observe_replicas(["svc"]).values())
+    assert scaler.stats() == {"forecast": {}, "actuation": scaler.actuator.stats()}
+
+
+def test_scaler_stopped_while_deciding_does_not_scale(monkeypatch):
+    patches = []
+    placements = []
+
+    class Helper:
+        def scale_deployment(self, name, replicas):
+            patches.append((name, replicas))
+
+        def wait_for_replicas(self, names, timeout):
+            return True
+
+        def snapshot(self, names):
+            return {
+                name: SimpleNamespace(
+                    available_replicas=1, desired_replicas=1, cpu_limit=0.5
+                )
+                for name in names
+            }
+
+    class StoppingEngine(ReplicaEngine):
+        """Stops the scaler while deciding, like a concurrent re-placement."""
+
+        def decide(self, problem):
+            scaler.stop()
+            return [3]
+
+    async def no_history(self):
+        pass
+
+    monkeypatch.setattr(scaling, "get_kube_helper", lambda _: Helper())
+    monkeypatch.setattr(ClusterScaler, "backfill_history", no_history)
+    scaler = ClusterScaler(
+        "graph",
+        "cluster",
+        [1],
+        [1],
+        [1],
+        4,
+        1,
+        [5],
+        ["svc"],
+        30,
+        "kubeconfig",
+        "",
+        engine=StoppingEngine(),
+        request_placement=placements.append,
+    )
+    monkeypatch.setattr(
+        scaler.prometheus_helper,
+        "get_request_rates",
+        lambda services, deadline: dict.fromkeys(services, 10.0),
+    )
+    asyncio.run(scaler.initialize())
+
+    assert asyncio.run(scaler.tick()) is None
+    assert (patches, placements) == ([], [])
+    assert scaler.previous_replicas == [1]
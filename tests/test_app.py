@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from http import HTTPStatus
+
 from smo.flask.app import create_app
 
 
@@ -18,3 +20,22 @@ class TestConfig:
 
 def test_app():
     create_app(config=TestConfig)
+
+
+def test_stats():
+    app = create_app(config=TestConfig)
+
+    response = app.test_client().get("/stats")
+
+    assert response.status_code == HTTPStatus.OK
+    stats = response.get_json()
+    assert set(stats["prometheus"]) == {"requests", "connections", "reused"}
+    # No Helm operation has run on the new executor
+    assert stats["helm"] == {}
+    assert isinstance(stats["scaling"], dict)
+    assert stats["replacement"] == {
+        "requested": 0,
+        "coalesced": 0,
+        "run": 0,
+        "failed": 0,
+    }
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import subprocess
+
+import pytest
+import yaml
+
+from smo.utils.artifact_cache import ArtifactCache
+
+
+class FakeRegistry:
+    """Serves artifacts from memory, counting the pulls."""
+
+    def __init__(self):
+        self.artifacts = {}
+        self.pulls = []
+
+    def add(self, artifact_ref, graph_id, padding=0):
+        self.artifacts[artifact_ref] = {
+            "descriptor.yaml": yaml.safe_dump({"hdaGraph": {"id": graph_id}}),
+            "templates/padding.txt": "x" * padding,
+        }
+
+    def pull(self, artifact_ref, destination):
+        self.pulls.append(artifact_ref)
+        if artifact_ref not in self.artifacts:
+            raise subprocess.CalledProcessError(1, ["hdarctl", "pull", artifact_ref])
+        for name, content in self.artifacts[artifact_ref].items():
+            file = destination / name
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(content)
+
+
+@pytest.fixture
+def registry():
+    registry = FakeRegistry()
+    registry.add("registry/graph:1.0", "graph")
+    return registry
+
+
+def test_cache_hit_skips_pull(tmp_path, registry):
+    cache = ArtifactCache(tmp_path, pull=registry.pull)
+
+    first = cache.get("registry/graph:1.0")
+    second = cache.get("registry/graph:1.0")
+
+    assert registry.pulls == ["registry/graph:1.0"]
+    assert second == first
+    assert second.descriptor == {"hdaGraph": {"id": "graph"}}
+    assert (second.chart_path / "descriptor.yaml").is_file()
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_refresh_pulls_again(tmp_path, registry):
+    cache = ArtifactCache(tmp_path, pull=registry.pull)
+    cache.get("registry/graph:1.0")
+
+    # The tag now points to a new version
+    registry.add("registry/graph:1.0", "graph-v2")
+    assert cache.descriptor("registry/graph:1.0")["hdaGraph"]["id"] == "graph"
+    assert (
+        cache.descriptor("registry/graph:1.0", refresh=True)["hdaGraph"]["id"]
+        == "graph-v2"
+    )
+    assert cache.descriptor("registry/graph:1.0")["hdaGraph"]["id"] == "graph-v2"
+    assert registry.pulls == ["registry/graph:1.0"] * 2
+
+
+def test_same_content_is_stored_once(tmp_path, registry):
+    registry.add("registry/graph@sha256:abc", "graph")
+    cache = ArtifactCache(tmp_path, pull=registry.pull)
+
+    tagged = cache.get("registry/graph:1.0")
+    pinned = cache.get("registry/graph@sha256:abc")
+
+    assert tagged.digest == pinned.digest
+    assert len(list((tmp_path / "blobs").iterdir())) == 1
+
+
+def test_lru_eviction(tmp_path, registry):
+    for name in ("a", "b", "c"):
+        registry.add(f"registry/{name}:1.0", name, padding=1000)
+    cache = ArtifactCache(tmp_path, max_bytes=2500, pull=registry.pull)
+
+    cache.get("registry/a:1.0")
+    cache.get("registry/b:1.0")
+    # a is now more recently used than b
+    cache.get("registry/a:1.0")
+    cache.get("registry/c:1.0")
+
+    assert cache.stats["evictions"] == 1
+    assert cache.size <= cache.max_bytes
+    registry.pulls.clear()
+    cache.get("registry/a:1.0")
+    cache.get("registry/b:1.0")
+    assert registry.pulls == ["registry/b:1.0"]
+
+
+def test_cache_survives_restart(tmp_path, registry):
+    ArtifactCache(tmp_path, pull=registry.pull).get("registry/graph:1.0")
+
+    cache = ArtifactCache(tmp_path, pull=registry.pull)
+
+    assert cache.descriptor("registry/graph:1.0") == {"hdaGraph": {"id": "graph"}}
+    assert registry.pulls == ["registry/graph:1.0"]
+
+
+def test_failed_pull_is_not_cached(tmp_path, registry):
+    cache = ArtifactCache(tmp_path, pull=registry.pull)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        cache.get("registry/missing:1.0")
+
+    assert list((tmp_path / "tmp").iterdir()) == []
+    assert cache.size == 0
+
+
+def test_max_age_expires_tags_only(tmp_path, registry):
+    registry.add("registry/graph@sha256:abc", "graph")
+    cache = ArtifactCache(tmp_path, max_age=0, pull=registry.pull)
+
+    for _ in range(2):
+        cache.get("registry/graph:1.0")
+        cache.get("registry/graph@sha256:abc")
+
+    assert registry.pulls == [
+        "registry/graph:1.0",
+        "registry/graph@sha256:abc",
+        "registry/graph:1.0",
+    ]
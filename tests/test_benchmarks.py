@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import importlib
+import json
+from pathlib import Path
+
+import pytest
+
+from smo.utils.placement import create_placement_solver
+
+BENCHMARKS_DIR = Path(__file__).parents[1] / "benchmarks"
+
+
+@pytest.fixture
+def suite(monkeypatch):
+    # The suite imports its sibling modules by name, like when run as a script
+    monkeypatch.syspath_prepend(str(BENCHMARKS_DIR))
+    return importlib.import_module("suite")
+
+
+def test_largest_placement_is_solved(suite):
+    synthetic = importlib.import_module("synthetic")
+    num_services, num_clusters = max(suite.PLACEMENT_SIZES)
+    # A fleet where moving a co-located pair out of an overloaded cluster
+    # cannot be seen by a cover of the services one by one
+    problem = synthetic.placement_problem(num_services, num_clusters, seed=3)
+    solver = create_placement_solver("python")
+
+    placement = solver.solve(**problem, initial_placement=True)
+    assert placement == problem["current_placement"]
+    problem = synthetic.drift_placement_problem(problem, seed=3)
+    assert solver.solve(**problem, initial_placement=False) != placement
+
+
+def test_committed_baseline_is_comparable(suite):
+    baseline = json.loads((BENCHMARKS_DIR / "baseline.json").read_text())
+    results = {
+        "meta": suite.results_meta("python", 1, suite.calibrate(1)),
+        "results": baseline["results"],
+    }
+
+    # Recorded with the backend `make bench` runs, and a calibration
+    assert suite.baseline_mismatches(results, baseline) == []
+    assert baseline["meta"]["calibration"] > 0
+    recorded = {
+        (row["problem"], row["services"], row["clusters"])
+        for row in baseline["results"]
+    }
+    sizes = {("placement", *size) for size in suite.PLACEMENT_SIZES} | {
+        ("replicas", size, 1) for size in suite.REPLICA_SIZES
+    }
+    assert sizes <= recorded
+
+
+def test_baseline_is_scaled_to_the_machine(suite):
+    row = {"problem": "placement", "services": 3, "clusters": 2}
+    baseline = {
+        "meta": {"backend": "python", "calibration": 0.01},
+        "results": [{**row, "cold_total": 0.01, "warm_total": 0.01}],
+    }
+    # Twice as slow a machine, twice as slow decisions
+    slower = {
+        "meta": {"backend": "python", "calibration": 0.02},
+        "results": [{**row, "cold_total": 0.02, "warm_total": 0.05}],
+    }
+
+    assert suite.compare(slower, baseline, tolerance=0.5) == [
+        "placement 3x2 warm_total: 20.00 ms (scaled) -> 50.00 ms"
+    ]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from smo.utils.controller import ScalingController
+
+
+class FakeScaler:
+    def __init__(self, graph_name, cluster):
+        self.graph_name = graph_name
+        self.cluster = cluster
+        self.decision_interval = 0.01
+        self.ticks = 0
+        self.ticked = threading.Event()
+        self.stopped = False
+
+    async def initialize(self):
+        pass
+
+    def stop(self):
+        self.stopped = True
+
+    def stats(self):
+        return {"ticks": self.ticks}
+
+    async def tick(self):
+        self.ticks += 1
+        self.ticked.set()
+
+
+def test_schedule_and_stop():
+    controller = ScalingController(max_workers=2)
+    scalers = [FakeScaler("graph", "cluster1"), FakeScaler("graph", "cluster2")]
+    other = FakeScaler("other", "cluster1")
+    try:
+        controller.schedule("graph", scalers)
+        controller.schedule("other", [other])
+        for scaler in [*scalers, other]:
+            assert scaler.ticked.wait(timeout=5)
+        assert controller.running("graph") == len(scalers)
+
+        status = controller.status()
+        assert sorted(status) == ["graph", "other"]
+        assert sorted(status["graph"]) == ["cluster1", "cluster2"]
+        assert status["other"]["cluster1"]["ticks"] > 0
+
+        # Stopping a graph leaves the loops of the other graphs alone
+        controller.stop("graph")
+        ticks = [scaler.ticks for scaler in scalers]
+        assert controller.running("graph") == 0
+        assert controller.running("other") == 1
+
+        other.ticked.clear()
+        assert other.ticked.wait(timeout=5)
+        assert [scaler.ticks for scaler in scalers] == ticks
+    finally:
+        controller.shutdown()
+
+
+class BlockedScaler(FakeScaler):
+    """Ticks in a thread until released, like a Kubernetes patch."""
+
+    def __init__(self, graph_name, cluster):
+        super().__init__(graph_name, cluster)
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def patch(self):
+        self.ticked.set()
+        self.release.wait(timeout=5)
+        self.finished.set()
+
+    async def tick(self):
+        await asyncio.to_thread(self.patch)
+
+
+def test_stop_waits_for_running_ticks():
+    controller = ScalingController(max_workers=2)
+    scaler = BlockedScaler("graph", "cluster1")
+    try:
+        controller.schedule("graph", [scaler])
+        assert scaler.ticked.wait(timeout=5)
+
+        stopping = threading.Thread(target=controller.stop, args=("graph",))
+        stopping.start()
+        stopping.join(timeout=0.1)
+        # The scaler is told to stop, and its tick is not abandoned in the
+        # executor thread
+        assert stopping.is_alive()
+        assert scaler.stopped
+        scaler.release.set()
+        stopping.join(timeout=5)
+        assert not stopping.is_alive()
+        assert scaler.finished.is_set()
+        assert controller.running("graph") == 0
+    finally:
+        scaler.release.set()
+        controller.shutdown()
+
+
+class SlowScaler(FakeScaler):
+    """Counts the ticks running at the same time."""
+
+    active = 0
+    max_active = 0
+
+    async def tick(self):
+        SlowScaler.active += 1
+        SlowScaler.max_active = max(SlowScaler.max_active, SlowScaler.active)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            SlowScaler.active -= 1
+        await super().tick()
+
+
+class FailingScaler(FakeScaler):
+    async def tick(self):
+        await super().tick()
+        raise ConnectionError
+
+
+def test_ticks_are_bounded_and_failures_retried():
+    max_concurrent_ticks = 4
+    controller = ScalingController(max_concurrent_ticks=max_concurrent_ticks)
+    scalers = [SlowScaler(f"graph-{i}", "cluster1") for i in range(50)]
+    failing = FailingScaler("failing", "cluster1")
+    try:
+        for scaler in scalers:
+            controller.schedule(scaler.graph_name, [scaler])
+        controller.schedule("failing", [failing])
+        for scaler in scalers:
+            assert scaler.ticked.wait(timeout=5)
+        assert 0 < SlowScaler.max_active <= max_concurrent_ticks
+
+        # A failed tick is retried at the next interval
+        failing.ticked.clear()
+        assert failing.ticked.wait(timeout=5)
+        assert controller.running("failing") == 1
+
+        # Rescheduling a graph replaces its scaler of the same cluster
+        replacement = FakeScaler("graph-0", "cluster1")
+        controller.schedule("graph-0", [replacement])
+        assert replacement.ticked.wait(timeout=5)
+        assert controller.running("graph-0") == 1
+    finally:
+        controller.shutdown()
+
+
+class FlakyScaler(FakeScaler):
+    def __init__(self, graph_name, cluster, failures):
+        super().__init__(graph_name, cluster)
+        self.failures = failures
+
+    async def initialize(self):
+        await super().initialize()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError
+
+
+def test_failed_initialization_is_retried():
+    controller = ScalingController(retry_delay=0.01)
+    scaler = FlakyScaler("graph", "cluster1", failures=3)
+    try:
+        controller.schedule("graph", [scaler])
+        assert scaler.ticked.wait(timeout=5)
+        assert scaler.failures == 0
+        assert controller.running("graph") == 1
+    finally:
+        controller.shutdown()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+
+from smo.config import Config
+from smo.utils.forecast import (FORECASTERS, HOLT, LINEAR, NONE,
+                                LastValueForecaster, RateForecaster,
+                                create_forecaster)
+
+STEP = 30
+HORIZON = 20
+
+
+def replay(forecaster, rates):
+    """Observes the rates one step apart, forecasting each time the rate
+    HORIZON seconds later."""
+
+    for i, rate in enumerate(rates):
+        forecaster.observe("svc", i * STEP, rate)
+        forecaster.forecast("svc", i * STEP + HORIZON)
+    return forecaster.stats()["svc"]
+
+
+def test_trend_forecasters_lead_a_ramp():
+    ramp = [10.0 + 5 * i for i in range(20)]
+    reactive = replay(create_forecaster(NONE), ramp)
+
+    for kind in (HOLT, LINEAR):
+        stats = replay(create_forecaster(kind), ramp)
+        assert stats["mean_absolute_error"] < reactive["mean_absolute_error"]
+    # Each forecast is checked against the next observation
+    assert reactive["count"] == len(ramp) - 1
+    # Always behind on a ramp
+    assert reactive["last_error"] < 0
+
+
+def test_forecasts_are_never_negative():
+    for kind in FORECASTERS:
+        forecaster = create_forecaster(kind)
+        for i, rate in enumerate([50.0, 20.0, 0.0]):
+            forecaster.observe("svc", i * STEP, rate)
+        assert forecaster.forecast("svc", 10 * STEP) >= 0
+        assert forecaster.forecast("unknown", 0) == 0
+
+
+def test_unknown_forecaster():
+    with pytest.raises(ValueError, match="Unknown forecaster"):
+        create_forecaster("arima")
+
+
+def test_last_rates_are_used_by_default():
+    assert Config().FORECASTER == NONE
+    assert isinstance(create_forecaster(), LastValueForecaster)
+
+
+def test_incomplete_forecaster_cannot_be_instantiated():
+    class IncompleteForecaster(RateForecaster):
+        def _update(self, name, timestamp, value):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteForecaster()
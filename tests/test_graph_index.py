@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import random
+
+from smo.services.graph_service import create_service_imports
+from smo.utils.graph_index import GraphIndex
+
+
+def make_services(connections):
+    return [
+        {"id": name, "deployment": {"intent": {"connectionPoints": targets}}}
+        for name, targets in connections.items()
+    ]
+
+
+def quadratic_imports(services, service_placement):
+    # The pairwise scan that GraphIndex replaces
+    imports = {service["id"]: [] for service in services}
+    for service in services:
+        connection_points = service["deployment"]["intent"]["connectionPoints"]
+        for other_service in services:
+            if other_service["id"] in connection_points:
+                imports[other_service["id"]].append(service_placement[service["id"]])
+    return imports
+
+
+def test_import_clusters_match_pairwise_scan():
+    rng = random.Random(0)
+    names = [f"s{i}" for i in range(50)]
+    services = make_services(
+        {name: rng.sample([*names, "external"], rng.randint(0, 4)) for name in names}
+    )
+    service_placement = {name: rng.choice(["c1", "c2", "c3"]) for name in names}
+
+    assert create_service_imports(services, service_placement) == quadratic_imports(
+        services, service_placement
+    )
+
+
+def test_dependency_order():
+    index = GraphIndex(
+        make_services(
+            {
+                "frontend": ["api", "cache"],
+                "api": ["db", "api"],
+                "db": [],
+                "cache": [],
+                "a": ["b"],
+                "b": ["a"],
+            }
+        )
+    )
+
+    assert index.dependency_order() == ["db", "cache", "api", "frontend", "a", "b"]
+    assert index.dependencies()["frontend"] == ["api", "cache"]
+
+
+def test_cross_cluster_edges():
+    index = GraphIndex(make_services({"a": ["b", "c"], "b": ["c"], "c": []}))
+
+    edges = index.cross_cluster_edges({"a": "c1", "b": "c1", "c": "c2"})
+
+    assert edges == [("a", "c"), ("b", "c")]
+    assert index.column({"a": 1, "b": 2, "c": 3}) == [1, 2, 3]
+
+
+def test_placement_dependencies():
+    services = make_services({"a": [], "b": ["a"], "c": [], "d": []})
+    services[1]["deployment"]["intent"]["coLocation"] = ["a"]
+    # Either service may declare the co-location, services further apart
+    # cannot be co-located by the solvers
+    services[2]["deployment"]["intent"]["coLocation"] = ["d", "a", "external"]
+
+    assert GraphIndex(services).placement_dependencies() == [1, 0, 1]
+    assert GraphIndex(make_services({"a": []})).placement_dependencies() == []
@@ -0,0 +1,505 @@
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+import yaml
+from sqlalchemy import event, text
+from werkzeug.exceptions import BadRequest
+
+from smo.extensions import db
+from smo.flask.app import create_app
+from smo.models import Graph, Service
+from smo.services import graph_service
+from smo.services.graph_service import (HelmInstallError,
+                                        configure_replacement_queue,
+                                        deploy_graph, request_replacement,
+                                        start_graph, stop_graph,
+                                        trigger_placement)
+
+
+class TestConfig:
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    KARMADA_KUBECONFIG = "karmada-apiserver.config"
+
+
+def make_service(name, connection_points):
+    return {
+        "id": name,
+        "artifact": {
+            "ociImage": f"oci://registry/{name}",
+            "ociConfig": {"implementer": "HELM", "type": "App"},
+            "valuesOverwrite": {},
+        },
+        "deployment": {"intent": {"connectionPoints": connection_points}},
+    }
+
+
+def make_descriptor():
+    return {
+        "id": "image-detection-graph",
+        "services": [
+            make_service("image-compression-vo", ["noise-reduction"]),
+            make_service("noise-reduction", ["image-detection"]),
+            make_service("image-detection", []),
+        ],
+    }
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(graph_service, "spawn_scaling_processes", lambda *args: None)
+    app = create_app(config=TestConfig)
+    with app.app_context():
+        yield app
+        db.drop_all()
+
+
+@pytest.fixture
+def helm(monkeypatch):
+    calls = {"install": [], "commands": [], "uninstall": [], "fail": set()}
+
+    def install(name, artifact_ref, values_overwrite, command, kubeconfig=None):
+        if name in calls["fail"]:
+            raise subprocess.CalledProcessError(1, ["helm", command, name])
+        calls["install"].append(name)
+        calls["commands"].append((command, name))
+
+    def uninstall(services):
+        calls["uninstall"].extend(service.name for service in services)
+
+    monkeypatch.setattr(graph_service, "helm_install_artifact", install)
+    monkeypatch.setattr(graph_service, "helm_uninstall_graph", uninstall)
+    return calls
+
+
+def test_deploy_graph_single_commit(app, helm):
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(db.session, "after_commit", count_commit)
+    try:
+        deploy_graph("project", make_descriptor())
+    finally:
+        event.remove(db.session, "after_commit", count_commit)
+
+    assert len(commits) == 1
+    # Dependencies are installed before the services connecting to them
+    assert helm["install"] == [
+        "image-detection",
+        "noise-reduction",
+        "image-compression-vo",
+    ]
+    graph = db.session.query(Graph).one()
+    assert {service.status for service in graph.services} == {"Deployed"}
+
+
+def test_deploy_graph_failure_is_atomic(app, helm):
+    helm["fail"].add("noise-reduction")
+
+    with pytest.raises(HelmInstallError) as exc_info:
+        deploy_graph("project", make_descriptor())
+
+    assert sorted(exc_info.value.errors) == ["image-compression-vo", "noise-reduction"]
+    assert helm["uninstall"] == ["image-detection"]
+    assert db.session.query(Graph).count() == 0
+    assert db.session.query(Service).count() == 0
+
+
+def test_start_graph_resumes_after_failure(app, helm):
+    deploy_graph("project", make_descriptor())
+    stop_graph("image-detection-graph")
+    helm["commands"].clear()
+    helm["fail"].add("noise-reduction")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        start_graph("image-detection-graph")
+    helm["fail"].clear()
+
+    assert start_graph("image-detection-graph") == [
+        "noise-reduction",
+        "image-detection",
+    ]
+    assert helm["commands"] == [
+        ("install", "image-compression-vo"),
+        ("install", "noise-reduction"),
+        ("install", "image-detection"),
+    ]
+    graph = db.session.query(Graph).one()
+    assert graph.status == "Running"
+    assert not any(service.needs_apply for service in graph.services)
+
+
+def test_trigger_placement_skips_unchanged_services(app, helm, monkeypatch):
+    class FakeKubeHelper:
+        def snapshot(self, names):
+            return {name: SimpleNamespace(available_replicas=1) for name in names}
+
+    monkeypatch.setattr(graph_service, "get_kube_helper", lambda _: FakeKubeHelper())
+    deploy_graph("project", make_descriptor())
+    helm["commands"].clear()
+
+    # Re-placement moves image-detection, the values of the services
+    # connecting to it are unchanged
+    assert trigger_placement("image-detection-graph") == ["image-detection"]
+    assert helm["commands"] == [("upgrade", "image-detection")]
+
+    service = db.session.query(Service).filter_by(name="noise-reduction").one()
+    service.applied_hash = None
+    assert trigger_placement("image-detection-graph") == [
+        "noise-reduction",
+        "image-detection",
+    ]
+
+    # A stopped graph is not re-placed, which would install its services
+    stop_graph("image-detection-graph")
+    helm["commands"].clear()
+    with pytest.raises(BadRequest):
+        trigger_placement("image-detection-graph")
+    assert helm["commands"] == []
+
+
+def test_trigger_placement_counts_missing_replicas_as_none(app, helm, monkeypatch):
+    class FakeKubeHelper:
+        def snapshot(self, names):
+            # image-detection is not deployed yet, noise-reduction has no
+            # available replica
+            return {
+                "image-compression-vo": SimpleNamespace(available_replicas=1),
+                "noise-reduction": SimpleNamespace(available_replicas=None),
+            }
+
+    monkeypatch.setattr(graph_service, "get_kube_helper", lambda _: FakeKubeHelper())
+    deploy_graph("project", make_descriptor())
+    name = "image-detection-graph"
+    replicas = []
+    solver = graph_service.placement_solvers[name]
+    solve = solver.solve
+
+    def record_solve(*args, **kwargs):
+        replicas.append(args[4])
+        return solve(*args, **kwargs)
+
+    monkeypatch.setattr(solver, "solve", record_solve)
+    trigger_placement(name)
+    assert replicas == [[1, 0, 0]]
+    graph_service.graph_placements.clear()
+
+
+def test_trigger_placement_keeps_colocated_services(app, helm, monkeypatch):
+    class FakeKubeHelper:
+        def snapshot(self, names):
+            return {name: SimpleNamespace(available_replicas=1) for name in names}
+
+    monkeypatch.setattr(graph_service, "get_kube_helper", lambda _: FakeKubeHelper())
+    descriptor = make_descriptor()
+    intent = descriptor["services"][2]["deployment"]["intent"]
+    intent["coLocation"] = ["noise-reduction"]
+    deploy_graph("project", descriptor)
+
+    # Moving image-detection moves noise-reduction with it
+    assert trigger_placement("image-detection-graph") == [
+        "noise-reduction",
+        "image-detection",
+    ]
+    clusters = {
+        service.name: service.cluster_affinity for service in db.session.query(Service)
+    }
+    assert clusters["noise-reduction"] == clusters["image-detection"]
+    assert clusters["image-compression-vo"] != clusters["image-detection"]
+    graph_service.graph_placements.clear()
+
+
+def test_previous_placement_is_kept_per_graph(app, helm, monkeypatch):
+    class FakeKubeHelper:
+        def snapshot(self, names):
+            return {name: SimpleNamespace(available_replicas=1) for name in names}
+
+    monkeypatch.setattr(graph_service, "get_kube_helper", lambda _: FakeKubeHelper())
+    deploy_graph("project", make_descriptor())
+    name = "image-detection-graph"
+    placement = graph_service.graph_placements[name]
+    # The placement of another graph does not replace it
+    graph_service.graph_placements["other-graph"] = [[0, 1]]
+
+    previous = []
+    solver = graph_service.placement_solvers[name]
+    solve = solver.solve
+
+    def record_solve(*args, **kwargs):
+        previous.append(args[5])
+        return solve(*args, **kwargs)
+
+    monkeypatch.setattr(solver, "solve", record_solve)
+    trigger_placement(name)
+    assert previous == [placement]
+
+    # Without a previous placement, e.g. after a restart, it is rebuilt from
+    # the cluster affinities of the services
+    placement = graph_service.graph_placements.pop(name)
+    trigger_placement(name)
+    assert previous[1] == placement
+    graph_service.graph_placements.clear()
+
+
+def test_failed_placement_restarts_scalers(app, helm, monkeypatch):
+    class FakeKubeHelper:
+        def snapshot(self, names):
+            return {name: SimpleNamespace(available_replicas=1) for name in names}
+
+    spawned = []
+    monkeypatch.setattr(graph_service, "get_kube_helper", lambda _: FakeKubeHelper())
+    monkeypatch.setattr(
+        graph_service,
+        "spawn_scaling_processes",
+        lambda name, cluster_placement: spawned.append(cluster_placement),
+    )
+    deploy_graph("project", make_descriptor())
+    placement = spawned.pop()
+    helm["fail"].add("image-detection")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        trigger_placement("image-detection-graph")
+
+    # The scalers are restarted where the services still are
+    assert spawned == [placement]
+
+
+def test_replacement_skips_stopped_graphs(app, helm, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(
+        graph_service, "submit_job", lambda *args: submitted.append(args)
+    )
+    deploy_graph("project", make_descriptor())
+    stop_graph("image-detection-graph")
+
+    configure_replacement_queue(app, debounce=0)
+    queue = graph_service.replacement_queue
+    try:
+        assert request_replacement("image-detection-graph")
+        for _ in range(500):
+            if not queue.pending():
+                break
+            time.sleep(0.01)
+        assert queue.stats()["run"] == 1
+        assert queue.stats()["failed"] == 0
+        assert submitted == []
+    finally:
+        queue.shutdown()
+
+
+def test_deploy_route_runs_in_background(app, helm):
+    client = app.test_client()
+    response = client.post(
+        "/graph/project/project", json=yaml.safe_dump({"hdaGraph": make_descriptor()})
+    )
+
+    assert response.status_code == HTTPStatus.ACCEPTED
+    job = response.get_json()
+    assert job["kind"] == "deploy"
+    for _ in range(500):
+        job = client.get(response.headers["Location"]).get_json()
+        if job["status"] not in {"pending", "running"}:
+            break
+        time.sleep(0.01)
+
+    assert job["status"] == "succeeded"
+    assert job["services"] == dict.fromkeys(
+        ["image-compression-vo", "noise-reduction", "image-detection"], "installed"
+    )
+    # The deployed graph cannot be deployed again
+    response = client.post(
+        "/graph/project/project", json=yaml.safe_dump({"hdaGraph": make_descriptor()})
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/jobs/unknown").status_code == HTTPStatus.NOT_FOUND
+
+
+def test_deploy_route_pulls_artifacts_in_background(app, helm, monkeypatch):
+    pulled = []
+    release = threading.Event()
+
+    def pull(project, artifact_ref, refresh=False):
+        assert release.wait(timeout=5)
+        pulled.append((artifact_ref, refresh))
+        return {"hdaGraph": make_descriptor()}
+
+    monkeypatch.setattr(graph_service, "get_descriptor_from_artifact", pull)
+    client = app.test_client()
+    response = client.post(
+        "/graph/project/project", json={"artifact": "oci://registry/graph"}
+    )
+
+    # Accepted before the artifact is pulled
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.get_json()["target"] == "oci://registry/graph"
+    release.set()
+    for _ in range(500):
+        job = client.get(response.headers["Location"]).get_json()
+        if job["status"] not in {"pending", "running"}:
+            break
+        time.sleep(0.01)
+
+    assert job["status"] == "succeeded"
+    assert pulled == [("oci://registry/graph", False)]
+    assert db.session.query(Graph).one().name == "image-detection-graph"
+
+    response = client.post("/graph/project/project", json={"artifact": ""})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_failed_deploy_job_reports_service_errors(app, helm):
+    helm["fail"].add("image-detection")
+    client = app.test_client()
+    response = client.post(
+        "/graph/project/project", json=yaml.safe_dump({"hdaGraph": make_descriptor()})
+    )
+
+    for _ in range(500):
+        job = client.get(response.headers["Location"]).get_json()
+        if job["status"] not in {"pending", "running"}:
+            break
+        time.sleep(0.01)
+
+    assert job["status"] == "failed"
+    assert job["error"]["type"] == "HelmInstallError"
+    assert "image-detection" in job["error"]["services"]
+
+
+QUERIES_PER_PAGE = 3
+
+
+def test_project_graphs_are_paginated(app):
+    for i in range(5):
+        graph = Graph(name=f"graph-{i}", project="project", graph_descriptor={})
+        graph.services.append(Service(name=f"service-{i}", status="Deployed"))
+        db.session.add(graph)
+    db.session.add(Graph(name="other", project="other-project"))
+    db.session.commit()
+    db.session.expire_all()
+
+    queries = []
+
+    def count_query(*args):
+        queries.append(args)
+
+    event.listen(db.engine, "before_cursor_execute", count_query)
+    try:
+        client = app.test_client()
+        names = []
+        url = "/graph/project/project?limit=2&view=summary"
+        while url:
+            queries.clear()
+            response = client.get(url)
+            # The validators, the graphs, then all their services
+            assert len(queries) == QUERIES_PER_PAGE
+            page = response.get_json()
+            assert all("hdaGraph" not in graph for graph in page)
+            names.extend(graph["name"] for graph in page)
+            link = response.headers.get("Link")
+            url = link and link[1 : link.index(">")]
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_query)
+
+    assert names == [f"graph-{i}" for i in range(5)]
+    full = client.get("/graph/project/project?limit=1").get_json()
+    assert full[0]["hdaGraph"] == {}
+    assert full[0]["services"][0]["name"] == "service-0"
+    response = client.get("/graph/project/project?limit=0")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_graph_etag_changes_on_every_mutation(app, helm):
+    deploy_graph("project", make_descriptor())
+    client = app.test_client()
+    name = "image-detection-graph"
+
+    response = client.get(f"/graph/{name}")
+    etags = [response.headers["ETag"]]
+    assert response.last_modified is not None
+    page_etag = client.get("/graph/project/project").headers["ETag"]
+
+    queries = []
+
+    def count_query(*args):
+        queries.append(args)
+
+    event.listen(db.engine, "before_cursor_execute", count_query)
+    try:
+        response = client.get(f"/graph/{name}", headers={"If-None-Match": etags[0]})
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.data == b""
+        # Only the version of the graph is read
+        assert len(queries) == 1
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_query)
+    response = client.get(
+        "/graph/project/project", headers={"If-None-Match": page_etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    # Another view of the same graphs is another representation
+    response = client.get(
+        "/graph/project/project?view=summary", headers={"If-None-Match": page_etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    # The query is validated before the ETag is compared
+    response = client.get(
+        "/graph/project/project?view=bad", headers={"If-None-Match": page_etag}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def move_service(name):
+        # Through a service only, as the scaling processes do
+        service = db.session.query(Service).filter_by(name="noise-reduction").one()
+        service.cluster_affinity = "cluster-2"
+        db.session.commit()
+
+    for operation in (stop_graph, start_graph, move_service):
+        operation(name)
+        db.session.expire_all()
+        response = client.get(f"/graph/{name}", headers={"If-None-Match": etags[-1]})
+        assert response.status_code == HTTPStatus.OK
+        etags.append(response.headers["ETag"])
+
+    assert len(set(etags)) == len(etags)
+    response = client.get(
+        "/graph/project/project", headers={"If-None-Match": page_etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_find_graphs_and_services_by_artifact_and_cluster(app):
+    for i, (artifact, cluster) in enumerate([("a", "c1"), ("b", "c2"), ("a", "c2")]):
+        graph = Graph(name=f"graph-{i}", project="project", graph_descriptor={})
+        graph.services.append(
+            Service(name=f"service-{i}", artifact_ref=artifact, cluster_affinity=cluster)
+        )
+        db.session.add(graph)
+    db.session.commit()
+    client = app.test_client()
+
+    graphs = client.get("/graphs?artifact=a").get_json()
+    assert [graph["name"] for graph in graphs] == ["graph-0", "graph-2"]
+    assert client.get("/graphs").status_code == HTTPStatus.BAD_REQUEST
+
+    services = client.get("/services?cluster=c2").get_json()
+    assert [(s["name"], s["graph"]) for s in services] == [
+        ("service-1", "graph-1"),
+        ("service-2", "graph-2"),
+    ]
+    services = client.get("/services?cluster=c2&artifact=a").get_json()
+    assert [s["name"] for s in services] == ["service-2"]
+    # Containment queries on the values need the JSONB of PostgreSQL
+    response = client.get('/services?values={"image": {}}')
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    plan = db.session.execute(
+        text("EXPLAIN QUERY PLAN SELECT id FROM service WHERE cluster_affinity = 'c2'")
+    ).all()
+    assert "ix_service_cluster_affinity" in str(plan)
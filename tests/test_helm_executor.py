@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import subprocess
+import threading
+
+import pytest
+
+from smo.utils.helm_executor import HelmExecutor, HelmOperation
+
+
+class FakeHelm:
+    """Records the commands run, the first one blocking until released."""
+
+    def __init__(self):
+        self.runs = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def run(self, release, values):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.started.set()
+        self.gate.wait(timeout=5)
+        with self._lock:
+            self.active -= 1
+            self.runs.append((release, values))
+        if values == "broken":
+            raise subprocess.CalledProcessError(1, ["helm", "upgrade", release])
+        return values
+
+    def operation(self, release, operation, values):
+        return HelmOperation(release, operation, self.run, (release, values))
+
+
+@pytest.fixture
+def helm():
+    return FakeHelm()
+
+
+def test_queued_upgrades_are_coalesced(helm):
+    executor = HelmExecutor(max_workers=2)
+    first = executor.submit(helm.operation("api", "upgrade", "v1"))
+    assert helm.started.wait(timeout=5)
+
+    # Queued while v1 runs: only the latest one runs
+    queued = [executor.submit(helm.operation("api", "upgrade", v)) for v in "234"]
+    helm.gate.set()
+
+    assert first.result(timeout=5) == "v1"
+    assert [future.result(timeout=5) for future in queued] == ["4"] * 3
+    assert helm.runs == [("api", "v1"), ("api", "4")]
+    stats = executor.stats()["upgrade"]
+    assert (stats["count"], stats["coalesced"]) == (2, 2)
+    executor.shutdown()
+
+
+def test_operations_of_other_kinds_run_in_order(helm):
+    executor = HelmExecutor(max_workers=2)
+    executor.submit(helm.operation("api", "install", "v1"))
+    assert helm.started.wait(timeout=5)
+
+    futures = [
+        executor.submit(helm.operation("api", "upgrade", "v2")),
+        executor.submit(helm.operation("api", "uninstall", None)),
+    ]
+    helm.gate.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert helm.runs == [("api", "v1"), ("api", "v2"), ("api", None)]
+    # A single release never runs two commands at once
+    assert helm.max_active == 1
+    executor.shutdown()
+
+
+def test_releases_run_concurrently_within_bound(helm):
+    helm.gate.set()
+    executor = HelmExecutor(max_workers=2)
+    barrier = threading.Barrier(2, timeout=5)
+    futures = [
+        executor.submit(HelmOperation(release, "install", barrier.wait))
+        for release in ("api", "db")
+    ]
+    for future in futures:
+        future.result(timeout=5)
+    executor.shutdown()
+
+    executor = HelmExecutor(max_workers=1)
+    futures = [
+        executor.submit(helm.operation(release, "install", "v1"))
+        for release in ("api", "db", "web")
+    ]
+    for future in futures:
+        future.result(timeout=5)
+    assert helm.max_active == 1
+    executor.shutdown()
+
+
+def test_failure_is_reported_to_coalesced_futures(helm):
+    executor = HelmExecutor(max_workers=1)
+    executor.submit(helm.operation("api", "upgrade", "v1"))
+    assert helm.started.wait(timeout=5)
+    queued = [
+        executor.submit(helm.operation("api", "upgrade", values))
+        for values in ("v2", "broken")
+    ]
+    helm.gate.set()
+
+    for future in queued:
+        with pytest.raises(subprocess.CalledProcessError):
+            future.result(timeout=5)
+    assert executor.stats()["upgrade"]["failed"] == 1
+
+    executor.shutdown()
+    assert executor.pending() == 0
+    with pytest.raises(RuntimeError):
+        executor.submit(helm.operation("api", "upgrade", "v3"))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from smo.utils.jobs import FAILED, SUCCEEDED, JobManager
+
+
+def wait_done(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if job.done:
+            return
+        time.sleep(0.01)
+    msg = f"Job {job.id} not done"
+    raise AssertionError(msg)
+
+
+def test_job_reports_progress_and_result():
+    manager = JobManager(max_workers=2)
+
+    def deploy(names, progress):
+        for name in names:
+            progress(name, "installed")
+        return names
+
+    job = manager.submit("deploy", "graph", deploy, ["a", "b"])
+    wait_done(job)
+
+    assert job.status == SUCCEEDED
+    assert job.result == ["a", "b"]
+    assert job.to_dict()["services"] == {"a": "installed", "b": "installed"}
+    assert manager.get(job.id) is job
+    manager.shutdown()
+
+
+def test_jobs_of_a_graph_run_in_order():
+    manager = JobManager(max_workers=4)
+    gate = threading.Event()
+    order = []
+
+    def operation(name, progress):
+        if name == "first":
+            gate.wait(timeout=5)
+        order.append(name)
+
+    jobs = [
+        manager.submit(name, "graph", operation, name) for name in ("first", "second")
+    ]
+    other = manager.submit("other", "other-graph", operation, "other")
+    wait_done(other)
+    gate.set()
+    for job in jobs:
+        wait_done(job)
+
+    # The other graph was not held up by the first one
+    assert order == ["other", "first", "second"]
+    assert [job.kind for job in manager.jobs("graph")] == ["second", "first"]
+    manager.shutdown()
+
+
+def test_failed_job_and_retention():
+    manager = JobManager(max_workers=1, max_finished=2)
+
+    def fail(progress):
+        progress("a", "failed")
+        msg = "helm failed"
+        raise RuntimeError(msg)
+
+    failed = manager.submit("deploy", "graph", fail)
+    wait_done(failed)
+
+    assert failed.status == FAILED
+    assert failed.error == {"type": "RuntimeError", "message": "helm failed"}
+    assert failed.to_dict()["finished_at"] is not None
+
+    stopped = [manager.submit("stop", "graph", lambda progress: None) for _ in "ab"]
+    for job in stopped:
+        wait_done(job)
+    assert manager.get(failed.id) is None
+    assert manager.jobs() == stopped[::-1]
+    manager.shutdown()
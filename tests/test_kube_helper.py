@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+from types import SimpleNamespace
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from smo.utils import kube_helper
+from smo.utils.kube_helper import (DeploymentInformer, DeploymentSnapshot,
+                                   KubeHelper)
+
+
+def make_deployment(name, available_replicas=None, cpu="500m"):
+    container = client.V1Container(
+        name=name, resources=client.V1ResourceRequirements(limits={"cpu": cpu})
+    )
+    return client.V1Deployment(
+        metadata=client.V1ObjectMeta(name=name),
+        spec=client.V1DeploymentSpec(
+            replicas=1,
+            selector=client.V1LabelSelector(),
+            template=client.V1PodTemplateSpec(
+                spec=client.V1PodSpec(containers=[container])
+            ),
+        ),
+        status=client.V1DeploymentStatus(available_replicas=available_replicas),
+    )
+
+
+class FakeApi:
+    def __init__(self, deployments):
+        self.deployments = deployments
+        self.calls = []
+
+    def list_namespaced_deployment(self, namespace):
+        self.calls.append("list")
+        return client.V1DeploymentList(
+            items=self.deployments,
+            metadata=client.V1ListMeta(resource_version="1"),
+        )
+
+    def read_namespaced_deployment(self, name, namespace):
+        self.calls.append("read")
+        for deployment in self.deployments:
+            if deployment.metadata.name == name:
+                return deployment
+        raise ApiException(status=kube_helper.HTTP_NOT_FOUND)
+
+
+def make_helper(monkeypatch, deployments):
+    monkeypatch.setattr(kube_helper.config, "load_kube_config", lambda **kw: None)
+    helper = KubeHelper("kubeconfig")
+    helper.client = FakeApi(deployments)
+    return helper
+
+
+def test_snapshot_reads_missing_deployments(monkeypatch):
+    helper = make_helper(
+        monkeypatch,
+        [
+            make_deployment("svc-a", 2, cpu="500m"),
+            make_deployment("svc-b", None, cpu="2"),
+            make_deployment("other", 1),
+        ],
+    )
+
+    snapshot = helper.snapshot(["svc-a", "svc-b", "missing"])
+
+    assert snapshot == {
+        "svc-a": DeploymentSnapshot(
+            available_replicas=2, desired_replicas=1, cpu_limit=0.5
+        ),
+        "svc-b": DeploymentSnapshot(
+            available_replicas=None, desired_replicas=1, cpu_limit=2.0
+        ),
+    }
+    # Only the requested deployments are read, not the whole namespace
+    assert helper.client.calls == ["read", "read", "read"]
+
+
+def test_snapshot_serves_cached_deployments(monkeypatch):
+    cached = make_deployment("svc-a", 2)
+    helper = make_helper(monkeypatch, [make_deployment("svc-b", 1)])
+    helper.informer = SimpleNamespace(
+        get=lambda name: cached if name == "svc-a" else None
+    )
+
+    assert helper.snapshot(["svc-a", "svc-b"]).keys() == {"svc-a", "svc-b"}
+    assert helper.client.calls == ["read"]
+
+
+def test_informer_cache():
+    informer = DeploymentInformer(FakeApi([make_deployment("svc-a", 1)]), "default")
+
+    # Reads are not served before the initial list
+    assert informer.get("svc-a") is None
+
+    informer.resync()
+    assert informer.get("svc-a").status.available_replicas == 1
+
+    scaled = make_deployment("svc-a", 2)
+    informer.apply("MODIFIED", scaled)
+    assert informer.get("svc-a") is scaled
+
+    informer.apply("DELETED", scaled)
+    assert informer.get("svc-a") is None
+
+
+def test_informer_wait_for_replicas():
+    informer = DeploymentInformer(FakeApi([make_deployment("svc-a")]), "default")
+    informer.resync()
+
+    assert not informer.wait_for_replicas(["svc-a"], timeout=0)
+
+    timer = threading.Timer(
+        0.05, informer.apply, ("MODIFIED", make_deployment("svc-a", 1))
+    )
+    timer.start()
+    assert informer.wait_for_replicas(["svc-a"], timeout=5)
+    timer.join()
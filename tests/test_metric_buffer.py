@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from smo.utils.metric_buffer import MetricBuffer, MetricRing
+
+
+def test_ring_overwrites_oldest_samples():
+    ring = MetricRing(3)
+    ring.extend((t, float(t)) for t in range(5))
+
+    assert list(ring) == [(2, 2.0), (3, 3.0), (4, 4.0)]
+    assert ring.latest() == (4, 4.0)
+    # Stale and missing samples are dropped
+    assert not ring.append(4, 9.0)
+    assert not ring.append(5, math.nan)
+    assert len(ring) == ring.capacity
+
+
+def test_windowed_aggregates():
+    ring = MetricRing(100)
+    ring.extend((t, 2.0 * t) for t in range(0, 100, 10))
+
+    assert ring.window(25, now=90) == [(70, 140.0), (80, 160.0), (90, 180.0)]
+    assert ring.mean(25, now=90) == pytest.approx(160.0)
+    assert ring.slope() == pytest.approx(2.0)
+    assert ring.percentile(50) == pytest.approx(90.0)
+    assert math.isnan(ring.mean(5, now=1000))
+    with pytest.raises(IndexError):
+        MetricRing(1).latest()
+
+
+def test_buffer_backfill_then_append():
+    buffer = MetricBuffer(capacity=4)
+    buffer.backfill({"svc-a": [(0, 1.0), (10, 2.0)], "svc-b": []})
+    buffer.append({"svc-a": 3.0, "svc-b": 5.0}, timestamp=20)
+    # Overlaps the backfilled samples
+    buffer.append({"svc-a": 7.0}, timestamp=10)
+
+    assert list(buffer.ring("svc-a")) == [(0, 1.0), (10, 2.0), (20, 3.0)]
+    aggregates = buffer.aggregates("svc-a")
+    assert aggregates["mean"] == pytest.approx(2.0)
+    assert aggregates["slope"] == pytest.approx(0.1)
+    assert buffer.aggregates("svc-b")["p95"] == pytest.approx(5.0)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from smo.utils.parallel import DependencyError, run_in_dependency_order
+
+
+def test_independent_tasks_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    tasks = dict.fromkeys(["a", "b", "c"], barrier.wait)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        errors = run_in_dependency_order(tasks, {}, executor)
+
+    assert errors == {}
+
+
+def test_failure_skips_dependents():
+    done = []
+
+    def fail():
+        msg = "helm failed"
+        raise RuntimeError(msg)
+
+    tasks = {
+        "db": fail,
+        "api": lambda: done.append("api"),
+        "frontend": lambda: done.append("frontend"),
+        "worker": lambda: done.append("worker"),
+    }
+    # frontend -> api -> db, worker is independent
+    dependencies = {"api": ["db"], "frontend": ["api", "external"]}
+    finished = []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        errors = run_in_dependency_order(
+            tasks,
+            dependencies,
+            executor,
+            on_done=lambda name, error: finished.append(name),
+        )
+
+    assert done == ["worker"]
+    assert sorted(errors) == ["api", "db", "frontend"]
+    assert isinstance(errors["db"], RuntimeError)
+    assert isinstance(errors["frontend"], DependencyError)
+    assert errors["frontend"].failed == ["api"]
+    assert sorted(finished) == sorted(tasks)
+
+
+def test_cycles_are_broken():
+    done = []
+    tasks = {name: (lambda name=name: done.append(name)) for name in ["a", "b"]}
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        errors = run_in_dependency_order(tasks, {"a": ["b"], "b": ["a"]}, executor)
+
+    assert errors == {}
+    assert sorted(done) == ["a", "b"]
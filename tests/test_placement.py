@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import random
+
+import pytest
+
 from smo.utils import constant as c
-from smo.utils.placement import (convert_placement, decide_placement,
+from smo.utils.placement import (BranchAndBoundPlacementSolver,
+                                 GurobiPlacementSolver, PlacementSolver,
+                                 convert_placement, decide_placement,
                                  swap_placement)
 
 
@@ -50,3 +56,150 @@ def test_decide_placement():
     )
     expected = [[1, 0], [1, 0], [1, 0]]
     assert placement == expected
+
+
+def test_placement_solver_reuses_model():
+    solver = GurobiPlacementSolver()
+    placement = c.INITIAL_PLACEMENT
+    initial_placement = True
+
+    for replicas in ([1, 1, 1], [2, 1, 1], [3, 2, 1], [1, 1, 1]):
+        args = (
+            c.CLUSTER_CAPACITY_LIST,
+            c.CLUSTER_ACCELERATION_LIST,
+            c.CPU_LIMITS_LIST,
+            c.ACCELERATION_LIST,
+            replicas,
+            placement,
+        )
+        model = solver.model
+        new_placement = solver.solve(*args, initial_placement=initial_placement)
+
+        assert model is None or solver.model is model
+        assert new_placement == decide_placement(
+            *args, initial_placement=initial_placement
+        )
+        placement = new_placement
+        initial_placement = False
+
+
+@pytest.mark.parametrize(
+    "solver", [GurobiPlacementSolver(), BranchAndBoundPlacementSolver()]
+)
+def test_placement_solver_timings(solver):
+    solver.solve(
+        c.CLUSTER_CAPACITY_LIST,
+        c.CLUSTER_ACCELERATION_LIST,
+        c.CPU_LIMITS_LIST,
+        c.ACCELERATION_LIST,
+        [1, 1, 1],
+        c.INITIAL_PLACEMENT,
+        initial_placement=True,
+    )
+
+    assert set(solver.timings) == {"build", "solve"}
+    assert all(duration >= 0 for duration in solver.timings.values())
+
+
+def placement_cost(placement, current_placement):
+    return sum(
+        placement[s][e] * (1 - current_placement[s][e])
+        for s in range(len(placement))
+        for e in range(len(placement[s]))
+    )
+
+
+def test_branch_and_bound_placement_matches_gurobi():
+    rng = random.Random(1)
+    branch_and_bound = BranchAndBoundPlacementSolver()
+
+    feasible_count = 0
+    for _ in range(100):
+        num_nodes = rng.randint(2, 6)
+        num_clusters = rng.randint(2, 4)
+        current_placement = [[0] * num_clusters for _ in range(num_nodes)]
+        for row in current_placement:
+            row[rng.randrange(num_clusters)] = 1
+        args = (
+            [rng.choice([1, 2, 4, 8]) for _ in range(num_clusters)],
+            [rng.randint(0, 1) for _ in range(num_clusters)],
+            [rng.choice([0.5, 1, 2]) for _ in range(num_nodes)],
+            [rng.choice([0, 0, 1]) for _ in range(num_nodes)],
+            [rng.randint(1, 3) for _ in range(num_nodes)],
+            current_placement,
+        )
+        initial_placement = rng.choice([True, False, False])
+        dependencies = [rng.randint(0, 1) for _ in range(num_nodes - 1)]
+
+        try:
+            placement = branch_and_bound.solve(
+                *args, initial_placement=initial_placement, dependencies=dependencies
+            )
+        except ValueError:
+            placement = None
+        if placement is None:
+            # Gurobi finds no solution either
+            with pytest.raises(ValueError, match="No feasible placement"):
+                decide_placement(
+                    *args,
+                    initial_placement=initial_placement,
+                    backend="gurobi",
+                    dependencies=dependencies,
+                )
+            continue
+
+        feasible_count += 1
+        expected = decide_placement(
+            *args,
+            initial_placement=initial_placement,
+            backend="gurobi",
+            dependencies=dependencies,
+        )
+        assert placement_cost(placement, current_placement) == placement_cost(
+            expected, current_placement
+        )
+
+    assert feasible_count > 0
+
+
+def test_decide_placement_python_backend():
+    placement = decide_placement(
+        c.CLUSTER_CAPACITY_LIST,
+        c.CLUSTER_ACCELERATION_LIST,
+        c.CPU_LIMITS_LIST,
+        c.ACCELERATION_LIST,
+        c.REPLICAS_LIST,
+        c.INITIAL_PLACEMENT,
+        initial_placement=True,
+        backend="python",
+    )
+    assert placement == [[1, 0], [1, 0], [1, 0]]
+
+
+@pytest.mark.parametrize("backend", ["gurobi", "python"])
+def test_dependencies_colocate_services(backend):
+    num_nodes = 6
+    current_placement = [[1, 0]] + [[0, 1]] * (num_nodes - 1)
+
+    placement = decide_placement(
+        [100, 100],
+        [0, 0],
+        [1] * num_nodes,
+        [0] * num_nodes,
+        [1] * num_nodes,
+        current_placement,
+        initial_placement=True,
+        backend=backend,
+        dependencies=[1, 0, 0, 0, 1],
+    )
+
+    # s1 follows s0 on the first cluster, s5 stays with s4
+    assert placement == [[1, 0], [1, 0], [0, 1], [0, 1], [0, 1], [0, 1]]
+
+
+def test_incomplete_solver_cannot_be_instantiated():
+    class IncompleteSolver(PlacementSolver):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteSolver()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import time
+
+import pytest
+import requests
+
+from smo.utils import prometheus_helper
+from smo.utils.prometheus_helper import PrometheusHelper
+
+
+class FakeResponse:
+    def __init__(self, results, chunk_delay=0.0):
+        self.results = results
+        self.chunk_delay = chunk_delay
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def iter_content(self, chunk_size):
+        body = json.dumps({"data": {"result": self.results}}).encode()
+        for start in range(0, len(body), chunk_size):
+            time.sleep(self.chunk_delay)
+            yield body[start : start + chunk_size]
+
+
+def fake_get(results, queries, chunk_delay=0.0):
+    def get(session, url, params, timeout, stream):
+        queries.append(params["query"])
+        return FakeResponse(results, chunk_delay)
+
+    return get
+
+
+def test_get_request_rates(monkeypatch):
+    queries = []
+    results = [
+        {"metric": {"service": "svc-a"}, "value": [0, "1.5"]},
+        {"metric": {"service": "svc-b"}, "value": [0, "NaN"]},
+    ]
+    monkeypatch.setattr(requests.Session, "get", fake_get(results, queries))
+
+    helper = PrometheusHelper("http://prometheus", 30)
+    rates = helper.get_request_rates(["svc-a", "svc-b", "svc-c"])
+
+    assert rates == {"svc-a": 1.5, "svc-b": 0.0, "svc-c": 0.0}
+    assert len(queries) == 1
+    assert 'service=~"svc-a|svc-b|svc-c"' in queries[0]
+
+
+def test_get_latencies_defaults(monkeypatch):
+    monkeypatch.setattr(requests.Session, "get", fake_get([], []))
+
+    helper = PrometheusHelper("http://prometheus", 30)
+
+    assert helper.get_latencies(["svc-a"]) == {"svc-a": 30}
+    assert helper.get_latency("svc-a") == prometheus_helper.DEFAULT_LATENCY
+
+
+def test_get_cpu_utils_by_container_prefix(monkeypatch):
+    results = [
+        {"metric": {"container_name": "svc-ab-main"}, "value": [0, "80"]},
+        {"metric": {"container_name": "svc-a-main"}, "value": [0, "20"]},
+    ]
+    monkeypatch.setattr(requests.Session, "get", fake_get(results, []))
+
+    helper = PrometheusHelper("http://prometheus", 30)
+
+    assert helper.get_cpu_utils(["svc-a", "svc-ab"]) == {"svc-a": 20, "svc-ab": 80}
+
+
+def test_get_cpu_utils_by_container_label(monkeypatch):
+    results = [
+        {"metric": {"pod": "svc-a-1", "container": "svc-a"}, "value": [0, "35"]},
+        {"metric": {"pod": "svc-b-1", "container": "svc-b"}, "value": [0, "50"]},
+    ]
+    monkeypatch.setattr(requests.Session, "get", fake_get(results, []))
+
+    helper = PrometheusHelper("http://prometheus", 30)
+    assert helper.get_cpu_utils(["svc-a", "svc-b"]) == {"svc-a": 35, "svc-b": 50}
+
+    # An unlabelled series belongs to the only service queried
+    monkeypatch.setattr(
+        requests.Session, "get", fake_get([{"metric": {}, "value": [0, "12"]}], [])
+    )
+    assert helper.get_cpu_utils(["svc-a"]) == {"svc-a": 12}
+
+
+def test_get_request_rate_history(monkeypatch):
+    queries = []
+    results = [
+        {
+            "metric": {"service": "svc-a"},
+            "values": [[100, "1.5"], [130, "NaN"], [160, "2"]],
+        },
+    ]
+    monkeypatch.setattr(requests.Session, "get", fake_get(results, queries))
+
+    helper = PrometheusHelper("http://prometheus", 30)
+    history = helper.get_request_rate_history(["svc-a", "svc-b"], 60, 30, end=160)
+
+    assert history == {"svc-a": [(100, 1.5), (160, 2.0)], "svc-b": []}
+    assert len(queries) == 1
+
+
+def test_deadline_exceeded(monkeypatch):
+    queries = []
+    monkeypatch.setattr(requests.Session, "get", fake_get([], queries))
+
+    helper = PrometheusHelper("http://prometheus", 30)
+    with pytest.raises(requests.Timeout):
+        helper.get_request_rates(["svc-a"], deadline=time.monotonic() - 1)
+
+    assert queries == []
+
+
+def test_deadline_bounds_slow_responses(monkeypatch):
+    # A large response trickling in, each chunk within the read timeout
+    results = [
+        {"metric": {"service": f"svc-{i}"}, "value": [0, "1.0"]} for i in range(10000)
+    ]
+    monkeypatch.setattr(
+        requests.Session, "get", fake_get(results, [], chunk_delay=0.05)
+    )
+
+    helper = PrometheusHelper("http://prometheus", 30)
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        helper.get_request_rates(["svc-0"], deadline=start + 0.1)
+    assert time.monotonic() - start < 1
+
+
+def test_shared_session():
+    PrometheusHelper.configure_pool(4)
+
+    session = PrometheusHelper("http://a", 30).session()
+
+    assert PrometheusHelper("http://b", 60).session() is session
+    assert PrometheusHelper.connection_stats() == {
+        "requests": 0,
+        "connections": 0,
+        "reused": 0,
+    }
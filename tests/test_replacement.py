@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from smo.utils.replacement import ReplacementQueue
+
+CLUSTERS = 8
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return
+        time.sleep(0.01)
+    msg = "Condition not met"
+    raise AssertionError(msg)
+
+
+def test_requests_are_coalesced_per_graph():
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def replace(name):
+        calls.append(name)
+        started.set()
+        release.wait(timeout=5)
+
+    queue = ReplacementQueue(replace, debounce=0.05)
+    try:
+        # Every cluster of the graph requests it at the same tick
+        threads = [
+            threading.Thread(target=queue.request, args=("graph",))
+            for _ in range(CLUSTERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert started.wait(timeout=5)
+
+        # Requests made while the re-placement runs are coalesced too
+        assert not queue.request("graph")
+        release.set()
+        wait_for(lambda: queue.pending() == 0)
+        assert calls == ["graph"]
+        assert queue.stats() == {
+            "requested": CLUSTERS + 1,
+            "coalesced": CLUSTERS,
+            "run": 1,
+            "failed": 0,
+        }
+
+        # Once done, a new request re-places the graph again
+        assert queue.request("graph")
+        wait_for(lambda: queue.pending() == 0)
+        assert calls == ["graph", "graph"]
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_graphs_are_replaced_independently():
+    calls = []
+
+    def replace(name):
+        calls.append(name)
+        if name == "failing":
+            raise ConnectionError
+
+    queue = ReplacementQueue(replace, debounce=0)
+    try:
+        assert queue.request("failing")
+        assert queue.request("graph")
+        wait_for(lambda: queue.pending() == 0)
+        assert sorted(calls) == ["failing", "graph"]
+        assert queue.stats()["failed"] == 1
+    finally:
+        queue.shutdown()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from smo.utils import constant as c
+from smo.utils.replica_engine import (BranchAndBoundReplicaEngine,
+                                      FallbackReplicaEngine,
+                                      FastPathReplicaEngine,
+                                      GurobiReplicaEngine, ReplicaEngine,
+                                      ReplicaProblem, create_replica_engine)
+from smo.utils.scaling import decide_replicas
+
+SERVICES = c.SERVICES
+
+
+def make_problem(request_rates, previous_replicas, cluster_capacity=4):
+    return ReplicaProblem(
+        request_rates=request_rates,
+        previous_replicas=previous_replicas,
+        cpu_limits=[c.CPU_LIMITS[s] for s in SERVICES],
+        acceleration=[c.ACCELERATION[s] for s in SERVICES],
+        alpha=[c.ALPHA[s] for s in SERVICES],
+        beta=[c.BETA[s] for s in SERVICES],
+        cluster_capacity=cluster_capacity,
+        cluster_acceleration=0,
+        maximum_replicas=[c.MAXIMUM_REPLICAS[s] for s in SERVICES],
+    )
+
+
+def test_fast_path_matches_gurobi():
+    rng = random.Random(42)
+    fast_path = FastPathReplicaEngine()
+    gurobi = GurobiReplicaEngine()
+
+    proven_count = 0
+    for _ in range(50):
+        problem = make_problem(
+            [rng.uniform(0, 80), rng.uniform(0, 2), rng.uniform(0, 6)],
+            [rng.randint(1, 3) for _ in SERVICES],
+            cluster_capacity=rng.choice([2, 4, 6]),
+        )
+        proven, solution = fast_path.try_decide(problem)
+        if not proven:
+            continue
+        proven_count += 1
+
+        expected = gurobi.decide(problem)
+        if expected is None:
+            assert solution is None
+        else:
+            assert problem.objective(solution) == pytest.approx(
+                problem.objective(expected)
+            )
+
+    assert proven_count > 0
+
+
+def test_gurobi_engine_reuses_model():
+    rng = random.Random(7)
+    engine = GurobiReplicaEngine()
+
+    for _ in range(20):
+        problem = make_problem(
+            [rng.uniform(0, 80), rng.uniform(0, 2), rng.uniform(0, 6)],
+            [rng.randint(1, 3) for _ in SERVICES],
+            cluster_capacity=rng.choice([2, 3, 4]),
+        )
+        model = engine.model
+        solution = engine.decide(problem)
+
+        assert model is None or engine.model is model
+        expected = GurobiReplicaEngine().decide(problem)
+        if expected is None:
+            assert solution is None
+        else:
+            assert problem.objective(solution) == pytest.approx(
+                problem.objective(expected)
+            )
+
+
+def test_branch_and_bound_matches_gurobi():
+    rng = random.Random(3)
+    branch_and_bound = BranchAndBoundReplicaEngine()
+    gurobi = GurobiReplicaEngine()
+
+    feasible_count = 0
+    for _ in range(100):
+        problem = make_problem(
+            [rng.uniform(0, 80), rng.uniform(0, 2), rng.uniform(0, 6)],
+            [rng.randint(1, 3) for _ in SERVICES],
+            cluster_capacity=rng.choice([1, 2, 3, 4, 6]),
+        )
+        solution = branch_and_bound.decide(problem)
+        expected = gurobi.decide(problem)
+
+        if expected is None:
+            assert solution is None
+        else:
+            feasible_count += 1
+            assert problem.objective(solution) == pytest.approx(
+                problem.objective(expected)
+            )
+
+    assert feasible_count > 0
+
+
+def test_python_backend():
+    engine = create_replica_engine("python")
+    problem = make_problem([10, 0, 0], [3, 3, 3], cluster_capacity=3)
+
+    assert isinstance(engine.fallback, BranchAndBoundReplicaEngine)
+    assert problem.objective(engine.decide(problem)) == pytest.approx(
+        problem.objective(GurobiReplicaEngine().decide(problem))
+    )
+
+
+def test_fast_path_defers_when_budget_binds():
+    # The previous replicas are worth keeping, but do not fit anymore
+    problem = make_problem([10, 0, 0], [3, 3, 3], cluster_capacity=3)
+
+    proven, _ = FastPathReplicaEngine().try_decide(problem)
+
+    assert not proven
+    assert FallbackReplicaEngine().decide(problem) == GurobiReplicaEngine().decide(
+        problem
+    )
+
+
+def test_decide_replicas_infeasible():
+    # image-compression-vo would need more than its maximum replicas
+    assert (
+        decide_replicas(
+            [200, 0, 0],
+            [1, 1, 1],
+            [c.CPU_LIMITS[s] for s in SERVICES],
+            [c.ACCELERATION[s] for s in SERVICES],
+            [c.ALPHA[s] for s in SERVICES],
+            [c.BETA[s] for s in SERVICES],
+            c.CLUSTER_CAPACITY["netmode-cluster"],
+            0,
+            [c.MAXIMUM_REPLICAS[s] for s in SERVICES],
+        )
+        is None
+    )
+
+
+def test_incomplete_engine_cannot_be_instantiated():
+    class IncompleteEngine(ReplicaEngine):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteEngine()
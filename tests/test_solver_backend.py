@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+from smo.utils.solver_backend import resolve_backend
+
+
+def test_resolve_backend():
+    assert resolve_backend("python") == "python"
+    assert resolve_backend("auto") in {"gurobi", "python"}
+    with pytest.raises(ValueError, match="Unknown solver backend"):
+        resolve_backend("cplex")
+
+
+def test_gurobipy_is_imported_lazily():
+    code = (
+        "import sys\n"
+        "import smo.utils.placement, smo.utils.scaling\n"
+        "assert 'gurobipy' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)